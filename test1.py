@@ -1,153 +1,24 @@
-import heapq
-from collections import defaultdict, Counter
 import tkinter as tk
 from tkinter import ttk, messagebox
 import ast
 
+from text_compression.huffman import huffman_encode
+from text_compression.shannon_fano import shannon_fano_encode
+from text_compression.lz77 import lz77_encode, lz77_decode
+from text_compression.bwt import bwt_transform, bwt_rotations
+from text_compression.mtf import mtf_encode, zero_run_encode
+from text_compression.pipeline import PIPELINES, build_pipeline
+from text_compression.rle import run_length_encoding
+from text_compression.background import BackgroundJob, truncate
 
-# BWT Transform
-def bwt_transform(s):
-    """Apply Burrows-Wheeler Transform to the input string."""
-    s = s + '$'
-    rotations = [s[i:] + s[:i] for i in range(len(s))]
-    rotations_sorted = sorted(rotations)
-    bwt_output = ''.join([rotation[-1] for rotation in rotations_sorted])
-    return bwt_output, rotations, rotations_sorted
-
-
-# BWT Inverse
-def bwt_inverse(bwt_str):
-    """Reconstruct the original string from the BWT output."""
-    table = [''] * len(bwt_str)
-    for _ in range(len(bwt_str)):
-        table = sorted([bwt_str[i] + table[i] for i in range(len(bwt_str))])
-    for row in table:
-        if row.endswith('$'):
-            return row.rstrip('$')
-
-
-# Run-Length Encoding
-def run_length_encoding(s):
-    """Apply Run-Length Encoding to the input string."""
-    if not s:
-        return ""
-    compressed = []
-    count = 1
-    for i in range(1, len(s)):
-        if s[i] == s[i - 1]:
-            count += 1
-        else:
-            compressed.append(s[i - 1] + str(count))
-            count = 1
-    compressed.append(s[-1] + str(count))
-    return ''.join(compressed)
-
-
-# Huffman Coding
-class HuffmanNode:
-    """Class to represent a node in the Huffman tree."""
-
-    def __init__(self, char, freq):
-        self.char = char
-        self.freq = freq
-        self.left = None
-        self.right = None
-
-    def __lt__(self, other):
-        return self.freq < other.freq
-
-
-def build_huffman_tree(freq_map):
-    """Build the Huffman tree from the frequency map."""
-    heap = [HuffmanNode(char, freq) for char, freq in freq_map.items()]
-    heapq.heapify(heap)
-    while len(heap) > 1:
-        left = heapq.heappop(heap)
-        right = heapq.heappop(heap)
-        merged = HuffmanNode(None, left.freq + right.freq)
-        merged.left = left
-        merged.right = right
-        heapq.heappush(heap, merged)
-    return heap[0]
-
-
-def build_huffman_codes(node, prefix="", code_map=None):
-    """Build Huffman codes by traversing the Huffman tree."""
-    if code_map is None:
-        code_map = {}
-    if node:
-        if node.char is not None:
-            code_map[node.char] = prefix
-        build_huffman_codes(node.left, prefix + "0", code_map)
-        build_huffman_codes(node.right, prefix + "1", code_map)
-    return code_map
-
-
-def huffman_encode(s):
-    """Encode the input string using Huffman coding."""
-    if not s:
-        return "", {}
-    freq_map = Counter(s)
-    huffman_tree = build_huffman_tree(freq_map)
-    huffman_codes = build_huffman_codes(huffman_tree)
-    encoded_output = ''.join([huffman_codes[char] for char in s])
-    return encoded_output, huffman_codes, freq_map
-
-
-# Shannon-Fano Coding
-def shannon_fano_encode(s):
-    """Encode the input string using Shannon-Fano coding."""
-    if not s:
-        return "", {}
-
-    # Calculate character frequencies
-    freq_map = Counter(s)
-    sorted_chars = sorted(freq_map.keys(), key=lambda x: freq_map[x], reverse=True)
-
-    # Build Shannon-Fano codes
-    def build_shannon_fano_codes(characters, prefix=""):
-        if len(characters) == 1:
-            return {characters[0]: prefix}
-        mid = len(characters) // 2
-        left_codes = build_shannon_fano_codes(characters[:mid], prefix + "0")
-        right_codes = build_shannon_fano_codes(characters[mid:], prefix + "1")
-        return {**left_codes, **right_codes}
-
-    shannon_fano_codes = build_shannon_fano_codes(sorted_chars)
-    encoded_output = ''.join([shannon_fano_codes[char] for char in s])
-    return encoded_output, shannon_fano_codes, freq_map
-
-
-# LZ77 Compression
-def lz77_encode(s):
-    """Apply LZ77 Compression to the input string."""
-    encoded = []
-    buffer_size = 100
-    i = 0
-    while i < len(s):
-        match = (0, 0, s[i])
-        for j in range(max(0, i - buffer_size), i):
-            k = 0
-            while i + k < len(s) and s[j + k] == s[i + k]:
-                k += 1
-            if k > match[1]:
-                match = (i - j, k, s[i + k] if i + k < len(s) else '')
-        encoded.append(match)
-        i += match[1] + 1
-    return encoded
-
-
-def lz77_decode(encoded_data):
-    """Decode LZ77-encoded data."""
-    decoded = []
-    for item in encoded_data:
-        offset, length, char = item
-        if length > 0:
-            start = len(decoded) - offset
-            for i in range(length):
-                decoded.append(decoded[start + i])
-        decoded.append(char)
-    return ''.join(decoded)
+# Rotations are only listed for inputs small enough to read
+ROTATION_DISPLAY_LIMIT = 64
+
+# Milliseconds between checks for results from the worker thread
+POLL_INTERVAL_MS = 50
+
+# Sections yielded by CompressionApp.encode_steps
+ENCODE_STEP_COUNT = 7
 
 
 # Tkinter UI
@@ -184,9 +55,20 @@ class CompressionApp:
         self.input_entry = ttk.Entry(self.input_frame, width=50)
         self.input_entry.pack(padx=10, pady=10)
 
-        # Process Button
-        self.process_button = ttk.Button(self.input_frame, text="Process", command=self.process_input)
-        self.process_button.pack(pady=10)
+        # Process and Cancel Buttons
+        self.button_frame = ttk.Frame(self.input_frame)
+        self.button_frame.pack(pady=10)
+        self.process_button = ttk.Button(self.button_frame, text="Process", command=self.process_input)
+        self.process_button.pack(side="left", padx=5)
+        self.cancel_button = ttk.Button(self.button_frame, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
+        # Progress of the running job
+        self.progress_bar = ttk.Progressbar(self.input_frame, mode="determinate", length=300)
+        self.progress_bar.pack(padx=10, pady=5)
+        self.status_label = ttk.Label(self.input_frame, text="")
+        self.status_label.pack(padx=10, pady=5)
+        self.job = None
 
         # Output Frame
         self.output_frame = ttk.LabelFrame(root, text="Output")
@@ -212,7 +94,7 @@ class CompressionApp:
             self.decode_example_label.pack_forget()
 
     def process_input(self):
-        """Process the input string and display the results."""
+        """Start processing the input string on a worker thread."""
         input_string = self.input_entry.get()
         if not input_string:
             messagebox.showerror("Error", "Please enter a string.")
@@ -222,58 +104,120 @@ class CompressionApp:
         self.explanation_text.delete(1.0, tk.END)
 
         if self.mode_var.get() == "encode":
-            # Encoding Mode
-            self.explanation_text.insert(tk.END, "=== Encoding Mode ===\n")
-
-            # Step 1: BWT
-            self.explanation_text.insert(tk.END, "=== Burrows-Wheeler Transform (BWT) ===\n")
-            bwt_result, rotations, rotations_sorted = bwt_transform(input_string)
-            self.explanation_text.insert(tk.END, f"Rotations:\n{rotations}\n")
-            self.explanation_text.insert(tk.END, f"Sorted Rotations:\n{rotations_sorted}\n")
-            self.explanation_text.insert(tk.END, f"BWT Output: {bwt_result}\n\n")
-
-            # Step 2: Run-Length Encoding (RLE)
-            self.explanation_text.insert(tk.END, "=== Run-Length Encoding (RLE) ===\n")
-            rle_result = run_length_encoding(bwt_result)
-            self.explanation_text.insert(tk.END, f"RLE Output: {rle_result}\n\n")
-
-            # Step 3: Huffman Coding
-            self.explanation_text.insert(tk.END, "=== Huffman Coding ===\n")
-            huffman_encoded, huffman_codes, freq_map = huffman_encode(input_string)
-            self.explanation_text.insert(tk.END, f"Frequency Map: {freq_map}\n")
-            self.explanation_text.insert(tk.END, f"Huffman Codes: {huffman_codes}\n")
-            self.explanation_text.insert(tk.END, f"Encoded Output: {huffman_encoded}\n\n")
-
-            # Step 4: Shannon-Fano Coding
-            self.explanation_text.insert(tk.END, "=== Shannon-Fano Coding ===\n")
-            shannon_fano_encoded, shannon_fano_codes, freq_map = shannon_fano_encode(input_string)
-            self.explanation_text.insert(tk.END, f"Frequency Map: {freq_map}\n")
-            self.explanation_text.insert(tk.END, f"Shannon-Fano Codes: {shannon_fano_codes}\n")
-            self.explanation_text.insert(tk.END, f"Encoded Output: {shannon_fano_encoded}\n\n")
-
-            # Step 5: LZ77 Compression
-            self.explanation_text.insert(tk.END, "=== LZ77 Compression ===\n")
-            lz77_encoded = lz77_encode(input_string)
-            self.explanation_text.insert(tk.END, f"Encoded Output: {lz77_encoded}\n\n")
-
+            steps, total = self.encode_steps(input_string), ENCODE_STEP_COUNT
+        else:
+            steps, total = self.decode_steps(input_string), 1
+        self.job = BackgroundJob(steps, total).start()
+        self.progress_bar.config(maximum=total, value=0)
+        self.status_label.config(text="Working...")
+        self.process_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.root.after(POLL_INTERVAL_MS, self.poll_job)
+
+    def cancel_job(self):
+        """Stop the running job after its current step."""
+        if self.job is not None and not self.job.finished:
+            self.job.cancel()
+            self.status_label.config(text="Cancelling after the current step...")
+
+    def poll_job(self):
+        """Show the sections the worker has finished and check again until it is done."""
+        for section in self.job.poll():
+            self.explanation_text.insert(tk.END, section)
+        self.progress_bar.config(value=self.job.done)
+        if not self.job.finished:
+            self.root.after(POLL_INTERVAL_MS, self.poll_job)
+            return
+        if self.job.error is not None:
+            self.status_label.config(text=f"Error: {self.job.error}")
+        elif self.job.cancelled:
+            self.status_label.config(text="Cancelled.")
+        else:
+            self.status_label.config(text="Done.")
+        self.process_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+
+    def encode_steps(self, input_string):
+        """Yield the explanation text of each encoding step; runs on the worker thread."""
+        # Step 1: BWT
+        section = "=== Encoding Mode ===\n"
+        section += "=== Burrows-Wheeler Transform (BWT) ===\n"
+        bwt_result, primary_index = bwt_transform(input_string)
+        if len(input_string) <= ROTATION_DISPLAY_LIMIT:
+            rotations, rotations_sorted = bwt_rotations(input_string)
+            section += f"Rotations:\n{rotations}\n"
+            section += f"Sorted Rotations:\n{rotations_sorted}\n"
         else:
-            # Decoding Mode
-            self.explanation_text.insert(tk.END, "=== Decoding Mode ===\n")
-            self.explanation_text.insert(tk.END, "Decoding is only supported for LZ77 compression.\n")
-
-            try:
-                # Validate input format
-                encoded_data = ast.literal_eval(input_string)
-                if not isinstance(encoded_data, list) or not all(
-                        isinstance(item, tuple) and len(item) == 3 for item in encoded_data):
-                    raise ValueError("Invalid input format.")
-
-                # Decode LZ77
-                decoded_string = lz77_decode(encoded_data)
-                self.explanation_text.insert(tk.END, f"Decoded String: {decoded_string}\n\n")
-            except Exception as e:
-                self.explanation_text.insert(tk.END, f"Error: {e}\n")
-                self.explanation_text.insert(tk.END, "Please ensure the input is in the correct format.\n\n")
+            section += f"Rotations: not shown for inputs over {ROTATION_DISPLAY_LIMIT} characters\n"
+        section += f"BWT Output: {truncate(bwt_result)}\n"
+        section += f"Primary Index: {primary_index}\n\n"
+        yield section
+
+        # Step 2: Run-Length Encoding (RLE)
+        section = "=== Run-Length Encoding (RLE) ===\n"
+        rle_result = run_length_encoding(bwt_result)
+        section += f"RLE Output: {truncate(rle_result)}\n\n"
+        yield section
+
+        # Step 3: Huffman Coding
+        section = "=== Huffman Coding ===\n"
+        huffman_encoded, huffman_codes, freq_map = huffman_encode(input_string)
+        section += f"Frequency Map: {truncate(freq_map)}\n"
+        section += f"Huffman Codes: {truncate(huffman_codes)}\n"
+        section += f"Encoded Output ({len(huffman_encoded)} bytes): {truncate(huffman_encoded.hex(' '))}\n\n"
+        yield section
+
+        # Step 4: Shannon-Fano Coding
+        section = "=== Shannon-Fano Coding ===\n"
+        shannon_fano_encoded, shannon_fano_codes, freq_map = shannon_fano_encode(input_string)
+        section += f"Frequency Map: {truncate(freq_map)}\n"
+        section += f"Shannon-Fano Codes: {truncate(shannon_fano_codes)}\n"
+        section += f"Encoded Output ({len(shannon_fano_encoded)} bytes): {truncate(shannon_fano_encoded.hex(' '))}\n\n"
+        yield section
+
+        # Step 5: LZ77 Compression
+        section = "=== LZ77 Compression ===\n"
+        lz77_encoded = lz77_encode(input_string)
+        section += f"Encoded Output: {truncate(lz77_encoded)}\n\n"
+        yield section
+
+        # Step 6: Move-to-Front and zero-run RLE on the BWT output
+        section = "=== Move-to-Front (MTF) and Zero-Run RLE ===\n"
+        mtf_ranks, mtf_alphabet = mtf_encode(bwt_result)
+        section += f"MTF Alphabet: {truncate(mtf_alphabet)}\n"
+        section += f"MTF Ranks: {truncate([ord(rank) for rank in mtf_ranks])}\n"
+        zero_run_symbols = zero_run_encode(mtf_ranks)
+        section += f"Zero-Run Symbols (0 = RUNA, 1 = RUNB): {truncate([ord(symbol) for symbol in zero_run_symbols])}\n\n"
+        yield section
+
+        # Step 7: Complete pipelines, checked by decoding them again
+        section = "=== Pipelines ===\n"
+        input_size = len(input_string.encode('utf-8'))
+        for name in PIPELINES:
+            pipeline = build_pipeline(name)
+            pipeline_encoded = pipeline.encode(input_string)
+            round_trip = "OK" if pipeline.decode(pipeline_encoded) == input_string else "FAILED"
+            section += f"{pipeline}: {input_size} -> {len(pipeline_encoded)} bytes, round trip {round_trip}\n"
+        yield section + "\n"
+
+    def decode_steps(self, input_string):
+        """Yield the explanation text of decoding; runs on the worker thread."""
+        section = "=== Decoding Mode ===\n"
+        section += "Decoding is only supported for LZ77 compression.\n"
+        try:
+            # Validate input format
+            encoded_data = ast.literal_eval(input_string)
+            if not isinstance(encoded_data, list) or not all(
+                    isinstance(item, tuple) and len(item) == 3 for item in encoded_data):
+                raise ValueError("Invalid input format.")
+
+            # Decode LZ77
+            decoded_string = lz77_decode(encoded_data)
+            section += f"Decoded String: {truncate(decoded_string)}\n\n"
+        except Exception as e:
+            section += f"Error: {e}\n"
+            section += "Please ensure the input is in the correct format.\n\n"
+        yield section
 
 
 # Run the application
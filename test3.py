@@ -1,153 +1,24 @@
-import heapq
-from collections import defaultdict, Counter
 import tkinter as tk
 from tkinter import ttk, messagebox
 import ast
 
+from text_compression.huffman import huffman_encode, huffman_decode
+from text_compression.shannon_fano import shannon_fano_encode, shannon_fano_decode
+from text_compression.deflate import deflate_decode, deflate_encode
+from text_compression.lz77 import lz77_encode, lz77_decode
+from text_compression.bwt import bwt_transform, bwt_rotations, bwt_inverse
+from text_compression.rle import run_length_encoding
+from text_compression.auto import AutoPipeline, block_statistics, estimate_ratios
+from text_compression.background import BackgroundJob, truncate
 
-# BWT Transform
-def bwt_transform(s):
-    """Apply Burrows-Wheeler Transform to the input string."""
-    s = s + '$'
-    rotations = [s[i:] + s[:i] for i in range(len(s))]
-    rotations_sorted = sorted(rotations)
-    bwt_output = ''.join([rotation[-1] for rotation in rotations_sorted])
-    return bwt_output, rotations, rotations_sorted
-
-
-# BWT Inverse
-def bwt_inverse(bwt_str):
-    """Reconstruct the original string from the BWT output."""
-    table = [''] * len(bwt_str)
-    for _ in range(len(bwt_str)):
-        table = sorted([bwt_str[i] + table[i] for i in range(len(bwt_str))])
-    for row in table:
-        if row.endswith('$'):
-            return row.rstrip('$')
-
-
-# Run-Length Encoding
-def run_length_encoding(s):
-    """Apply Run-Length Encoding to the input string."""
-    if not s:
-        return ""
-    compressed = []
-    count = 1
-    for i in range(1, len(s)):
-        if s[i] == s[i - 1]:
-            count += 1
-        else:
-            compressed.append(s[i - 1] + str(count))
-            count = 1
-    compressed.append(s[-1] + str(count))
-    return ''.join(compressed)
-
-
-# Huffman Coding
-class HuffmanNode:
-    """Class to represent a node in the Huffman tree."""
-
-    def __init__(self, char, freq):
-        self.char = char
-        self.freq = freq
-        self.left = None
-        self.right = None
-
-    def __lt__(self, other):
-        return self.freq < other.freq
-
-
-def build_huffman_tree(freq_map):
-    """Build the Huffman tree from the frequency map."""
-    heap = [HuffmanNode(char, freq) for char, freq in freq_map.items()]
-    heapq.heapify(heap)
-    while len(heap) > 1:
-        left = heapq.heappop(heap)
-        right = heapq.heappop(heap)
-        merged = HuffmanNode(None, left.freq + right.freq)
-        merged.left = left
-        merged.right = right
-        heapq.heappush(heap, merged)
-    return heap[0]
-
-
-def build_huffman_codes(node, prefix="", code_map=None):
-    """Build Huffman codes by traversing the Huffman tree."""
-    if code_map is None:
-        code_map = {}
-    if node:
-        if node.char is not None:
-            code_map[node.char] = prefix
-        build_huffman_codes(node.left, prefix + "0", code_map)
-        build_huffman_codes(node.right, prefix + "1", code_map)
-    return code_map
-
-
-def huffman_encode(s):
-    """Encode the input string using Huffman coding."""
-    if not s:
-        return "", {}
-    freq_map = Counter(s)
-    huffman_tree = build_huffman_tree(freq_map)
-    huffman_codes = build_huffman_codes(huffman_tree)
-    encoded_output = ''.join([huffman_codes[char] for char in s])
-    return encoded_output, huffman_codes, freq_map
-
-
-# Shannon-Fano Coding
-def shannon_fano_encode(s):
-    """Encode the input string using Shannon-Fano coding."""
-    if not s:
-        return "", {}
-
-    # Calculate character frequencies
-    freq_map = Counter(s)
-    sorted_chars = sorted(freq_map.keys(), key=lambda x: freq_map[x], reverse=True)
-
-    # Build Shannon-Fano codes
-    def build_shannon_fano_codes(characters, prefix=""):
-        if len(characters) == 1:
-            return {characters[0]: prefix}
-        mid = len(characters) // 2
-        left_codes = build_shannon_fano_codes(characters[:mid], prefix + "0")
-        right_codes = build_shannon_fano_codes(characters[mid:], prefix + "1")
-        return {**left_codes, **right_codes}
-
-    shannon_fano_codes = build_shannon_fano_codes(sorted_chars)
-    encoded_output = ''.join([shannon_fano_codes[char] for char in s])
-    return encoded_output, shannon_fano_codes, freq_map
-
-
-# LZ77 Compression
-def lz77_encode(s):
-    """Apply LZ77 Compression to the input string."""
-    encoded = []
-    buffer_size = 100
-    i = 0
-    while i < len(s):
-        match = (0, 0, s[i])
-        for j in range(max(0, i - buffer_size), i):
-            k = 0
-            while i + k < len(s) and s[j + k] == s[i + k]:
-                k += 1
-            if k > match[1]:
-                match = (i - j, k, s[i + k] if i + k < len(s) else '')
-        encoded.append(match)
-        i += match[1] + 1
-    return encoded
-
-
-def lz77_decode(encoded_data):
-    """Decode LZ77-encoded data."""
-    decoded = []
-    for item in encoded_data:
-        offset, length, char = item
-        if length > 0:
-            start = len(decoded) - offset
-            for i in range(length):
-                decoded.append(decoded[start + i])
-        decoded.append(char)
-    return ''.join(decoded)
+# Rotations are only listed for inputs small enough to read
+ROTATION_DISPLAY_LIMIT = 64
+
+# Milliseconds between checks for results from the worker thread
+POLL_INTERVAL_MS = 50
+
+# Milliseconds per step of the indeterminate progress bar
+PROGRESS_STEP_MS = 20
 
 
 # Tkinter UI
@@ -170,13 +41,13 @@ class CompressionApp:
 
         # Example Label for Decoding
         self.decode_example_label = ttk.Label(self.input_frame,
-                                              text="===Decoding Mode===\nDecoding is only supported for BWT and LZ77 compression.\nPlease enter the valid format.\nExample: [(0, 0, 'b'), (0, 0, 'a'), (2, 1, 'n'), (3, 1, '')] = banana")
+                                              text="===Decoding Mode===\nDecoding is supported for BWT, LZ77, Huffman, Shannon-Fano and Auto.\nPlease enter the valid format (hex bytes for Huffman, Shannon-Fano, Auto and compact LZ77).\nFor BWT, enter the primary index shown with the BWT output; without it the '$' sentinel locates the original row.\nExample: [(0, 0, 'b'), (0, 0, 'a'), (2, 1, 'n'), (3, 1, '')] = banana")
         self.decode_example_label.pack(padx=10, pady=5)
         self.decode_example_label.pack_forget()  # Hide initially
 
         # Explanation Label for Encoding
         self.encode_explanation_label = ttk.Label(self.input_frame,
-                                                  text="===Encoding Mode===\nEnter a string to compress using BWT, RLE, Huffman, Shannon-Fano, and LZ77.")
+                                                  text="===Encoding Mode===\nEnter a string to compress using BWT, RLE, Huffman, Shannon-Fano, LZ77, or let Auto choose.")
         self.encode_explanation_label.pack(padx=10, pady=5)
         self.encode_explanation_label.pack_forget()  # Hide initially
 
@@ -196,6 +67,8 @@ class CompressionApp:
         self.shannon_fano_radio.pack(side="left", padx=10, pady=5)
         self.lz77_radio = ttk.Radiobutton(self.encode_algorithm_frame, text="LZ77", variable=self.encode_algorithm_var, value="LZ77")
         self.lz77_radio.pack(side="left", padx=10, pady=5)
+        self.auto_radio = ttk.Radiobutton(self.encode_algorithm_frame, text="Auto", variable=self.encode_algorithm_var, value="Auto")
+        self.auto_radio.pack(side="left", padx=10, pady=5)
 
         # Frame for Decoding Algorithm Radio Buttons
         self.decode_algorithm_frame = ttk.Frame(self.input_frame)
@@ -207,6 +80,12 @@ class CompressionApp:
         self.bwt_decode_radio.pack(side="left", padx=10, pady=5)
         self.lz77_decode_radio = ttk.Radiobutton(self.decode_algorithm_frame, text="LZ77", variable=self.decode_algorithm_var, value="LZ77")
         self.lz77_decode_radio.pack(side="left", padx=10, pady=5)
+        self.huffman_decode_radio = ttk.Radiobutton(self.decode_algorithm_frame, text="Huffman", variable=self.decode_algorithm_var, value="Huffman")
+        self.huffman_decode_radio.pack(side="left", padx=10, pady=5)
+        self.shannon_fano_decode_radio = ttk.Radiobutton(self.decode_algorithm_frame, text="Shannon-Fano", variable=self.decode_algorithm_var, value="Shannon-Fano")
+        self.shannon_fano_decode_radio.pack(side="left", padx=10, pady=5)
+        self.auto_decode_radio = ttk.Radiobutton(self.decode_algorithm_frame, text="Auto", variable=self.decode_algorithm_var, value="Auto")
+        self.auto_decode_radio.pack(side="left", padx=10, pady=5)
 
         # Initially hide the decoding algorithm frame
         self.decode_algorithm_frame.pack_forget()
@@ -215,9 +94,26 @@ class CompressionApp:
         self.input_entry = ttk.Entry(self.input_frame, width=50)
         self.input_entry.pack(padx=10, pady=10)
 
-        # Process Button
-        self.process_button = ttk.Button(self.input_frame, text="Process", command=self.process_input)
-        self.process_button.pack(pady=10)
+        # Primary index for BWT decoding, shown in decoding mode
+        self.index_frame = ttk.Frame(self.input_frame)
+        ttk.Label(self.index_frame, text="BWT primary index:").pack(side="left", padx=5)
+        self.index_entry = ttk.Entry(self.index_frame, width=10)
+        self.index_entry.pack(side="left", padx=5)
+
+        # Process and Cancel Buttons
+        self.button_frame = ttk.Frame(self.input_frame)
+        self.button_frame.pack(pady=10)
+        self.process_button = ttk.Button(self.button_frame, text="Process", command=self.process_input)
+        self.process_button.pack(side="left", padx=5)
+        self.cancel_button = ttk.Button(self.button_frame, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
+        # Activity of the running job
+        self.progress_bar = ttk.Progressbar(self.input_frame, mode="indeterminate", length=300)
+        self.progress_bar.pack(padx=10, pady=5)
+        self.status_label = ttk.Label(self.input_frame, text="")
+        self.status_label.pack(padx=10, pady=5)
+        self.job = None
 
         # Output Frame
         self.output_frame = ttk.LabelFrame(root, text="Output")
@@ -240,10 +136,12 @@ class CompressionApp:
         """Show or hide the example and explanation labels based on the selected mode."""
         if self.mode_var.get() == "decode":
             self.decode_example_label.pack(padx=10, pady=5)
+            self.index_frame.pack(before=self.button_frame, padx=10, pady=5)
             self.encode_explanation_label.pack_forget()
         else:
             self.encode_explanation_label.pack(padx=10, pady=5)
             self.decode_example_label.pack_forget()
+            self.index_frame.pack_forget()
 
     def toggle_algorithm_buttons(self):
         """Show or hide the encoding/decoding algorithm radio buttons based on the selected mode."""
@@ -260,7 +158,7 @@ class CompressionApp:
             label.config(text="")
 
     def process_input(self):
-        """Process the input string and display the results."""
+        """Start processing the input string on a worker thread."""
         input_string = self.input_entry.get()
         if not input_string:
             messagebox.showerror("Error", "Please enter a string.")
@@ -270,60 +168,124 @@ class CompressionApp:
         self.clear_output_labels()
 
         if self.mode_var.get() == "encode":
-            # Encoding Mode
-            self.output_labels[0].config(text="=== Encoding Mode ===")
-
-            if self.encode_algorithm_var.get() == "BWT":
-                # Step 1: BWT
-                self.output_labels[1].config(text="=== Burrows-Wheeler Transform (BWT) ===")
-                bwt_result, rotations, rotations_sorted = bwt_transform(input_string)
-                self.output_labels[2].config(text=f"Rotations:\n{rotations}")
-                self.output_labels[3].config(text=f"Sorted Rotations:\n{rotations_sorted}")
-                self.output_labels[4].config(text=f"BWT Output: {bwt_result}")
-
-            elif self.encode_algorithm_var.get() == "RLE":
-                # Step 2: Run-Length Encoding (RLE)
-                self.output_labels[1].config(text="=== Run-Length Encoding (RLE) ===")
-                rle_result = run_length_encoding(input_string)
-                self.output_labels[2].config(text=f"RLE Output: {rle_result}")
-
-            elif self.encode_algorithm_var.get() == "Huffman":
-                # Step 3: Huffman Coding
-                self.output_labels[1].config(text="=== Huffman Coding ===")
-                huffman_encoded, huffman_codes, freq_map = huffman_encode(input_string)
-                self.output_labels[2].config(text=f"Frequency Map: {freq_map}")
-                self.output_labels[3].config(text=f"Huffman Codes: {huffman_codes}")
-                self.output_labels[4].config(text=f"Encoded Output: {huffman_encoded}")
-
-            elif self.encode_algorithm_var.get() == "Shannon-Fano":
-                # Step 4: Shannon-Fano Coding
-                self.output_labels[1].config(text="=== Shannon-Fano Coding ===")
-                shannon_fano_encoded, shannon_fano_codes, freq_map = shannon_fano_encode(input_string)
-                self.output_labels[2].config(text=f"Frequency Map: {freq_map}")
-                self.output_labels[3].config(text=f"Shannon-Fano Codes: {shannon_fano_codes}")
-                self.output_labels[4].config(text=f"Encoded Output: {shannon_fano_encoded}")
-
-            elif self.encode_algorithm_var.get() == "LZ77":
-                # Step 5: LZ77 Compression
-                self.output_labels[1].config(text="=== LZ77 Compression ===")
-                lz77_encoded = lz77_encode(input_string)
-                self.output_labels[2].config(text=f"Encoded Output: {lz77_encoded}")
-
+            steps = self.encode_steps(input_string, self.encode_algorithm_var.get())
+        else:
+            index_text = self.index_entry.get().strip()
+            if index_text and not index_text.isdigit():
+                messagebox.showerror("Error", "The BWT primary index must be a non-negative integer.")
+                return
+            primary_index = int(index_text) if index_text else None
+            steps = self.decode_steps(input_string, self.decode_algorithm_var.get(), primary_index)
+        self.job = BackgroundJob(steps).start()
+        self.progress_bar.start(PROGRESS_STEP_MS)
+        self.status_label.config(text="Working...")
+        self.process_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.root.after(POLL_INTERVAL_MS, self.poll_job)
+
+    def cancel_job(self):
+        """Stop the running job after its current step."""
+        if self.job is not None and not self.job.finished:
+            self.job.cancel()
+            self.status_label.config(text="Cancelling after the current step...")
+
+    def poll_job(self):
+        """Fill in the labels the worker has produced and check again until it is done."""
+        for index, text in self.job.poll():
+            self.output_labels[index].config(text=text)
+        if not self.job.finished:
+            self.root.after(POLL_INTERVAL_MS, self.poll_job)
+            return
+        self.progress_bar.stop()
+        if self.job.error is not None:
+            self.status_label.config(text=f"Error: {self.job.error}")
+        elif self.job.cancelled:
+            self.status_label.config(text="Cancelled.")
         else:
-            # Decoding Mode
-            self.output_labels[0].config(text="=== Decoding Mode ===")
-
-            if self.decode_algorithm_var.get() == "BWT":
-                self.output_labels[1].config(text="=== BWT Decoding ===")
-                try:
-                    decoded_string = bwt_inverse(input_string)
-                    self.output_labels[2].config(text=f"Decoded String: {decoded_string}")
-                except Exception as e:
-                    self.output_labels[2].config(text=f"Error: {e}\nPlease ensure the input is in the correct format.")
-
-            elif self.decode_algorithm_var.get() == "LZ77":
-                self.output_labels[1].config(text="=== LZ77 Decoding ===")
-                try:
+            self.status_label.config(text="Done.")
+        self.process_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+
+    def encode_steps(self, input_string, algorithm):
+        """Yield (label index, text) pairs for the chosen encoder; runs on the worker thread."""
+        yield 0, "=== Encoding Mode ==="
+
+        if algorithm == "BWT":
+            # Step 1: BWT
+            yield 1, "=== Burrows-Wheeler Transform (BWT) ==="
+            bwt_result, primary_index = bwt_transform(input_string)
+            if len(input_string) <= ROTATION_DISPLAY_LIMIT:
+                rotations, rotations_sorted = bwt_rotations(input_string)
+                yield 2, f"Rotations:\n{rotations}"
+                yield 3, f"Sorted Rotations:\n{rotations_sorted}"
+            else:
+                yield 2, f"Rotations: not shown for inputs over {ROTATION_DISPLAY_LIMIT} characters"
+            yield 4, f"BWT Output: {truncate(bwt_result)}"
+            yield 5, f"Primary Index: {primary_index} (enter it with the BWT output to decode)"
+
+        elif algorithm == "RLE":
+            # Step 2: Run-Length Encoding (RLE)
+            yield 1, "=== Run-Length Encoding (RLE) ==="
+            rle_result = run_length_encoding(input_string)
+            yield 2, f"RLE Output: {truncate(rle_result)}"
+
+        elif algorithm == "Huffman":
+            # Step 3: Huffman Coding
+            yield 1, "=== Huffman Coding ==="
+            huffman_encoded, huffman_codes, freq_map = huffman_encode(input_string)
+            yield 2, f"Frequency Map: {truncate(freq_map)}"
+            yield 3, f"Huffman Codes: {truncate(huffman_codes)}"
+            yield 4, f"Encoded Output ({len(huffman_encoded)} bytes): {truncate(huffman_encoded.hex(' '))}"
+
+        elif algorithm == "Shannon-Fano":
+            # Step 4: Shannon-Fano Coding
+            yield 1, "=== Shannon-Fano Coding ==="
+            shannon_fano_encoded, shannon_fano_codes, freq_map = shannon_fano_encode(input_string)
+            yield 2, f"Frequency Map: {truncate(freq_map)}"
+            yield 3, f"Shannon-Fano Codes: {truncate(shannon_fano_codes)}"
+            yield 4, f"Encoded Output ({len(shannon_fano_encoded)} bytes): {truncate(shannon_fano_encoded.hex(' '))}"
+
+        elif algorithm == "LZ77":
+            # Step 5: LZ77 Compression
+            yield 1, "=== LZ77 Compression ==="
+            lz77_encoded = lz77_encode(input_string)
+            yield 2, f"Encoded Output: {truncate(lz77_encoded)}"
+            compact = deflate_encode(input_string)
+            yield 3, f"Compact Output ({len(compact)} bytes): {truncate(compact.hex(' '))}"
+
+        elif algorithm == "Auto":
+            # Step 6: Automatic choice from sample statistics
+            yield 1, "=== Automatic Codec Selection ==="
+            statistics = block_statistics(input_string)
+            yield 2, (f"Sample: {statistics['size']} bytes, entropy {statistics['entropy']:.2f} bits/byte, "
+                      f"{statistics['runs']:.0%} in runs, {statistics['repeats']:.0%} repeated")
+            estimates = estimate_ratios(statistics)
+            yield 3, "Estimated Ratios: " + ", ".join(f"{method} {ratio:.2f}" for method, ratio in estimates.items())
+            pipeline = AutoPipeline()
+            auto_encoded = pipeline.encode(input_string)
+            input_size = len(input_string.encode('utf-8'))
+            yield 4, f"Chosen: {pipeline.last_method} ({input_size} -> {len(auto_encoded)} bytes)"
+            yield 5, f"Encoded Output: {truncate(auto_encoded.hex(' '))}"
+
+    def decode_steps(self, input_string, algorithm, primary_index=None):
+        """Yield (label index, text) pairs for the chosen decoder; runs on the worker thread.
+
+        primary_index is the BWT row to start from; None locates it by the sentinel.
+        """
+        yield 0, "=== Decoding Mode ==="
+
+        if algorithm == "BWT":
+            yield 1, "=== BWT Decoding ==="
+            try:
+                decoded_string = bwt_inverse(input_string, primary_index)
+                yield 2, f"Decoded String: {truncate(decoded_string)}"
+            except Exception as e:
+                yield 2, f"Error: {e}\nPlease ensure the input is in the correct format."
+
+        elif algorithm == "LZ77":
+            yield 1, "=== LZ77 Decoding ==="
+            try:
+                if input_string.lstrip().startswith('['):
                     # Validate input format
                     encoded_data = ast.literal_eval(input_string)
                     if not isinstance(encoded_data, list) or not all(
@@ -332,9 +294,30 @@ class CompressionApp:
 
                     # Decode LZ77
                     decoded_string = lz77_decode(encoded_data)
-                    self.output_labels[2].config(text=f"Decoded String: {decoded_string}")
-                except Exception as e:
-                    self.output_labels[2].config(text=f"Error: {e}\nPlease ensure the input is in the correct format.")
+                else:
+                    # Compact output as hex bytes
+                    decoded_string = deflate_decode(bytes.fromhex(input_string))
+                yield 2, f"Decoded String: {truncate(decoded_string)}"
+            except Exception as e:
+                yield 2, f"Error: {e}\nPlease ensure the input is in the correct format."
+
+        elif algorithm == "Auto":
+            yield 1, "=== Auto Decoding ==="
+            try:
+                decoded_string = AutoPipeline().decode(bytes.fromhex(input_string))
+                yield 2, f"Decoded String: {truncate(decoded_string)}"
+            except Exception as e:
+                yield 2, f"Error: {e}\nPlease ensure the input is in the correct format."
+
+        elif algorithm in ("Huffman", "Shannon-Fano"):
+            yield 1, f"=== {algorithm} Decoding ==="
+            try:
+                encoded_data = bytes.fromhex(input_string)
+                decoder = huffman_decode if algorithm == "Huffman" else shannon_fano_decode
+                decoded_string = decoder(encoded_data)
+                yield 2, f"Decoded String: {truncate(decoded_string)}"
+            except Exception as e:
+                yield 2, f"Error: {e}\nPlease ensure the input is in the correct format."
 
 
 # Run the application
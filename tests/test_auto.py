@@ -0,0 +1,40 @@
+import pytest
+
+from text_compression import auto
+from text_compression.auto import AutoPipeline, choose_method, rank_methods
+from text_compression.benchmark import markov_text, repetitive_logs
+
+
+@pytest.mark.parametrize('data', [repetitive_logs(50000) + '\ud800', 'a\ud800b' * 2000,
+                                  markov_text(20000) + ''.join(map(chr, range(0xD7F0, 0xE010))),
+                                  repetitive_logs(20000).encode()], ids=['logs', 'surrogates', 'mixed', 'bytes'])
+def test_auto_round_trip(data):
+    pipeline = AutoPipeline()
+    encoded = pipeline.encode(data)
+    assert pipeline.decode(encoded) == data
+
+
+def test_choose_method_is_first_ranked():
+    data = repetitive_logs(50000)
+    ranked = rank_methods(data)
+    assert ranked[0] == choose_method(data) == 'deflate'
+    assert sorted(ranked) == ['bwt-range', 'deflate', 'huffman', 'store']
+
+
+def test_auto_skips_failing_pipeline(monkeypatch):
+    real_build = auto.build_pipeline
+
+    def build_pipeline(method, level='normal'):
+        pipeline = real_build(method, level)
+        if method == 'deflate':
+            def encode(data):
+                raise ValueError("broken")
+            pipeline.encode = encode
+        return pipeline
+
+    monkeypatch.setattr(auto, 'build_pipeline', build_pipeline)
+    data = repetitive_logs(50000)
+    pipeline = AutoPipeline()
+    encoded = pipeline.encode(data)
+    assert pipeline.last_method != 'deflate'
+    assert pipeline.decode(encoded) == data
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(*args, stdout=subprocess.PIPE):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, '-m', 'text_compression', *args], stdout=stdout,
+                          stderr=subprocess.PIPE, env=env, cwd=ROOT)
+
+
+@pytest.mark.parametrize('data', [b'hello world ' * 2000, os.urandom(20000)], ids=['text', 'binary'])
+def test_decompress_mmap_to_redirected_stdout(tmp_path, data):
+    source = tmp_path / 'a'
+    source.write_bytes(data)
+    archive = tmp_path / 'a.tcz'
+    with open(archive, 'wb') as out:
+        assert _run('compress', '-j', '2', '-c', str(source), stdout=out).returncode == 0
+    # A shell redirection gives the process a write-only stdout
+    output = tmp_path / 'out'
+    with open(output, 'wb') as out:
+        result = _run('decompress', '--mmap', '-c', str(archive), stdout=out)
+    assert result.returncode == 0, result.stderr
+    assert output.read_bytes() == data
+
+
+def test_decompress_mmap_to_file(tmp_path):
+    data = os.urandom(20000)
+    source = tmp_path / 'a'
+    source.write_bytes(data)
+    assert _run('compress', '--mmap', str(source)).returncode == 0
+    source.unlink()
+    assert _run('decompress', '--mmap', str(tmp_path / 'a.tcz')).returncode == 0
+    assert source.read_bytes() == data
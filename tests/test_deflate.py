@@ -0,0 +1,31 @@
+import pytest
+
+from text_compression import vectorized
+from text_compression.benchmark import markov_text, repetitive_logs
+from text_compression.deflate import deflate_decode, deflate_encode
+
+
+@pytest.fixture
+def vectorized_backend(monkeypatch):
+    pytest.importorskip('numpy')
+    monkeypatch.setattr(vectorized, '_DISABLED', False)
+    monkeypatch.setattr(vectorized, 'MIN_VECTOR_SIZE', 1)
+
+
+@pytest.mark.parametrize('data', [repetitive_logs(200000), markov_text(50000).encode(),
+                                  ''.join(map(chr, range(20000)))], ids=['logs', 'binary', 'distinct'])
+def test_deflate_round_trip_vectorized(vectorized_backend, data):
+    encoded = deflate_encode(data)
+    assert deflate_decode(encoded) == data
+
+
+def test_deflate_vectorized_matches_python(vectorized_backend, monkeypatch):
+    data = repetitive_logs(50000)
+    vectorized_output = deflate_encode(data)
+    monkeypatch.setattr(vectorized, '_DISABLED', True)
+    assert deflate_encode(data) == vectorized_output
+
+
+@pytest.mark.parametrize('data', ['a\ud800b', '\udfff' * 300, repetitive_logs(5000) + '\ud800'])
+def test_deflate_round_trip_lone_surrogates(data):
+    assert deflate_decode(deflate_encode(data)) == data
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from text_compression import fuzz, vectorized
+
+NAMES = ['rle', 'lz77', 'huffman', 'deflate']
+
+
+def test_run_fuzz_small():
+    progress = []
+    failures = fuzz.run_fuzz(cases=8, seed=1, max_size=300, names=NAMES, progress=progress.append)
+    assert failures == []
+    assert progress and {entry['backend'] for entry in progress} == set(fuzz.available_backends())
+
+
+def test_broken_codec_is_caught_and_shrunk():
+    codec = (lambda s: s[:-1], lambda s: s, fuzz.BOTH)
+    assert fuzz.round_trip_error(codec, 'abc') is not None
+    assert fuzz.round_trip_error(codec, '') is None
+    assert len(fuzz.shrink(codec, 'abcdefgh')) == 1
+
+
+def test_check_budgets_small():
+    results = fuzz.check_budgets(names=['rle', 'huffman'], size=512, growth=2, slack=20.0, repeats=1)
+    assert results and all(result['ok'] for result in results)
+    assert {result['codec'] for result in results} == {'rle', 'huffman'}
+
+
+def test_backend_restores_settings():
+    saved = vectorized._DISABLED, vectorized.MIN_VECTOR_SIZE
+    with fuzz.backend('python'):
+        assert vectorized._DISABLED
+    assert (vectorized._DISABLED, vectorized.MIN_VECTOR_SIZE) == saved
+    with pytest.raises(ValueError):
+        with fuzz.backend('gpu'):
+            pass
+
+
+def test_budget_min_sizes(monkeypatch):
+    monkeypatch.setitem(fuzz.BUDGET_MIN_SIZES, 'rle', 2048)
+    results = fuzz.check_budgets(names=['rle', 'huffman'], size=512, growth=2, slack=20.0, repeats=1)
+    sizes = {result['codec']: result['sizes'] for result in results}
+    assert sizes == {'rle': (2048, 4096), 'huffman': (512, 1024)}
+
+
+def test_chain_budget_is_linear_past_chain_depth():
+    function = fuzz._GROWTH_FUNCTIONS[fuzz.COMPLEXITY['lz77-max']]
+    size = fuzz.BUDGET_MIN_SIZES['lz77-max']
+    assert function(size * fuzz.GROWTH) / function(size) == fuzz.GROWTH
+
+
+def test_huge_alphabet_has_lone_surrogates():
+    text = fuzz.huge_alphabet(random.Random(0), 2000)
+    assert any(0xD800 <= ord(char) < 0xE000 for char in text)
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from text_compression.huffman import MAX_CODE_LENGTH, huffman_decode, huffman_encode, huffman_tree_lengths
+
+
+def _distinct_text(count, seed=0):
+    # Code points above the surrogates, each used once or twice
+    chars = [chr(0xE000 + i) for i in range(count)]
+    chars += chars[:count // 3]
+    random.Random(seed).shuffle(chars)
+    return ''.join(chars)
+
+
+@pytest.mark.parametrize('canonical', [True, False])
+def test_round_trip_large_alphabet(canonical):
+    text = _distinct_text(45000)
+    encoded, codes, freq_map = huffman_encode(text, canonical=canonical)
+    assert len(freq_map) == 45000
+    assert huffman_decode(encoded) == text
+
+
+def test_large_alphabet_uses_tree_lengths():
+    text = _distinct_text(45000)
+    _, codes, freq_map = huffman_encode(text)
+    lengths = {char: len(code) for char, code in codes.items()}
+    assert max(lengths.values()) > MAX_CODE_LENGTH
+    assert lengths == huffman_tree_lengths(freq_map)
+
+
+def _fibonacci_counts_text(count=30):
+    # Symbol i appears fib(i) times, which needs codes far over 15 bits without a limit
+    pieces = []
+    a, b = 1, 1
+    for i in range(count):
+        pieces.append(chr(0x41 + i) * a)
+        a, b = b, a + b
+    return ''.join(pieces)
+
+
+@pytest.mark.parametrize('max_bits', [MAX_CODE_LENGTH, 20])
+def test_skewed_counts_are_length_limited(max_bits):
+    text = _fibonacci_counts_text()
+    encoded, codes, _ = huffman_encode(text, max_bits=max_bits)
+    assert max(len(code) for code in codes.values()) <= max_bits
+    assert huffman_decode(encoded) == text
+
+
+@pytest.mark.parametrize('data', [b'', b'a', b'abracadabra' * 50, bytes(range(256)) * 3])
+def test_round_trip_bytes(data):
+    encoded, _, _ = huffman_encode(data)
+    assert huffman_decode(encoded) == data
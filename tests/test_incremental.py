@@ -0,0 +1,48 @@
+import pytest
+
+from text_compression.benchmark import repetitive_logs
+from text_compression.incremental import IncrementalEncoder
+from text_compression.lz77 import lz77_decode
+
+DATA = repetitive_logs(200000).encode()
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('level', ['fast', 'normal', 'max'])
+@pytest.mark.parametrize('chunk', [1000, 65536])
+def test_round_trip_fed_in_chunks(level, chunk):
+    encoder = IncrementalEncoder(level, window_size=32 * 1024)
+    tokens = []
+    for piece in _chunks(DATA, chunk):
+        tokens += encoder.feed(piece)
+    tokens += encoder.flush()
+    assert lz77_decode(tokens, True) == DATA
+
+
+def test_feed_after_flush():
+    encoder = IncrementalEncoder()
+    tokens = encoder.feed(DATA[:5000]) + encoder.flush()
+    tokens += encoder.feed(DATA[5000:20000]) + encoder.flush()
+    assert lz77_decode(tokens, True) == DATA[:20000]
+
+
+def test_checkpoint_resumes_with_the_same_tokens(tmp_path):
+    pieces = _chunks(DATA, 7000)
+    encoder = IncrementalEncoder(window_size=32 * 1024)
+    expected = [token for piece in pieces for token in encoder.feed(piece)] + encoder.flush()
+
+    encoder = IncrementalEncoder(window_size=32 * 1024)
+    tokens = [token for piece in pieces[:10] for token in encoder.feed(piece)]
+    encoder.checkpoint(tmp_path / 'state')
+    encoder = IncrementalEncoder.restore(tmp_path / 'state')
+    tokens += [token for piece in pieces[10:] for token in encoder.feed(piece)] + encoder.flush()
+    assert tokens == expected
+    assert lz77_decode(tokens, True) == DATA
+
+
+def test_rejects_str():
+    with pytest.raises(TypeError):
+        IncrementalEncoder().feed('text')
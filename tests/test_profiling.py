@@ -0,0 +1,24 @@
+import threading
+
+from text_compression.profiling import Tracer, stage
+
+
+def test_stages_on_several_threads_nest_and_count_separately():
+    errors = []
+
+    def work():
+        for _ in range(500):
+            with stage('outer'):
+                with stage('inner'):
+                    if tracer.spans[-1].name != 'inner' or len(tracer.spans) != 2:
+                        errors.append(list(tracer.spans))
+
+    with Tracer() as tracer:
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert not errors
+    stages = tracer.to_dict()
+    assert stages['outer']['calls'] == stages['inner']['calls'] == 2000
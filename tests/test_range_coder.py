@@ -0,0 +1,16 @@
+import pytest
+
+from text_compression.range_coder import range_decode, range_encode
+
+
+@pytest.mark.parametrize('order', [0, 1])
+def test_round_trip_alphabet_over_32768_symbols(order):
+    text = ''.join(chr(0xE000 + i) for i in range(33000)) + 'abc' * 1000
+    assert range_decode(range_encode(text, order)) == text
+
+
+@pytest.mark.parametrize('order', [0, 1])
+@pytest.mark.parametrize('data', ['', 'a', 'abracadabra' * 100, 'a\ud800b' * 50, b'', bytes(range(256)) * 20],
+                         ids=['empty', 'one', 'text', 'surrogates', 'no-bytes', 'bytes'])
+def test_round_trip(order, data):
+    assert range_decode(range_encode(data, order)) == data
@@ -0,0 +1,30 @@
+import pytest
+
+from text_compression import vectorized
+from text_compression.rle import rle_decode, rle_encode, run_length_encoding
+
+
+@pytest.fixture(params=['python', 'vectorized'])
+def backend(request, monkeypatch):
+    if request.param == 'vectorized':
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(vectorized, 'MIN_VECTOR_SIZE', 1)
+    monkeypatch.setattr(vectorized, '_DISABLED', request.param == 'python')
+    return request.param
+
+
+def test_run_length_encoding(backend):
+    assert run_length_encoding('aaabccdddd') == 'a3b1c2d4'
+    assert run_length_encoding('') == ''
+    assert run_length_encoding('\ud800\ud800x') == '\ud8002x1'
+
+
+@pytest.mark.parametrize('data', [b'aaab', bytearray(b'xx'), memoryview(b'abc')])
+def test_run_length_encoding_rejects_bytes(data):
+    with pytest.raises(TypeError, match='rle_encode'):
+        run_length_encoding(data)
+
+
+@pytest.mark.parametrize('data', [b'', b'a', b'aaab', b'ab' * 200, b'\x00' * 1000 + bytes(range(256))])
+def test_rle_round_trip(backend, data):
+    assert rle_decode(rle_encode(data)) == data
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from text_compression.benchmark import repetitive_logs
+from text_compression.server import CompressionServer, _Body, _read_head, load_test
+from text_compression.stream import Decompressor
+
+
+async def _post(port, target, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'POST {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode('latin-1') + payload)
+        await writer.drain()
+        line, headers = await _read_head(reader)
+        body = _Body(reader, headers)
+        data = bytearray()
+        while chunk := await body.read(65536):
+            data += chunk
+        return int(line.split()[1]), bytes(data)
+    finally:
+        writer.close()
+
+
+def _with_server(test, **options):
+    async def main():
+        server = CompressionServer(workers=2, block_size=16 * 1024, **options)
+        listener = await server.start('127.0.0.1', 0)
+        try:
+            return await test(server, listener.sockets[0].getsockname()[1])
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_compress_decompress_round_trip():
+    payload = repetitive_logs(100000).encode()
+
+    async def test(server, port):
+        for method in ('lz77', 'bwt'):
+            status, compressed = await _post(port, f'/compress?method={method}', payload)
+            assert status == 200 and len(compressed) < len(payload)
+            decompressor = Decompressor()
+            assert decompressor.feed(compressed) == payload and decompressor.eof
+            status, decompressed = await _post(port, '/decompress', compressed)
+            assert status == 200 and decompressed == payload
+        assert (await _post(port, '/compress?method=nope', payload))[0] == 400
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /stats HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n')
+        _, headers = await _read_head(reader)
+        stats = json.loads(await _Body(reader, headers).read_exactly(int(headers['content-length'])))
+        writer.close()
+        assert stats['requests'] == 4 and stats['errors'] == 1
+
+    _with_server(test)
+
+
+def test_load_test_and_rejection():
+    async def test(server, port):
+        return await load_test('127.0.0.1', port, clients=4, requests=2, payload=b'hello ' * 1000)
+
+    summary = _with_server(test)
+    assert summary['statuses'] == {200: 8} and summary['connection_errors'] == 0
+    summary = _with_server(test, max_requests=0)
+    assert summary['statuses'] == {503: 8}
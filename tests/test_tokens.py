@@ -0,0 +1,28 @@
+import pytest
+
+from text_compression.benchmark import markov_text, repetitive_logs
+from text_compression.huffman import MAX_CODE_LENGTH, huffman_encode
+from text_compression.tokens import (MAX_VOCABULARY_SIZE, MODES, Tokenizer, token_decode, token_encode,
+                                     train_vocabulary)
+
+
+@pytest.mark.parametrize('coder', ['huffman', 'shannon-fano', 'range'])
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('data', [markov_text(5000), repetitive_logs(5000).encode(), '', 'é\ud800 naïve ' * 40],
+                         ids=['text', 'bytes', 'empty', 'surrogates'])
+def test_round_trip(data, mode, coder):
+    assert token_decode(token_encode(data, coder, mode, size=300)) == data
+
+
+def test_vocabulary_size_is_limited():
+    with pytest.raises(ValueError):
+        train_vocabulary(markov_text(1000), size=MAX_VOCABULARY_SIZE + 1)
+    tokens = [b'w' + i.to_bytes(2, 'big') for i in range(MAX_VOCABULARY_SIZE + 1)]
+    with pytest.raises(ValueError):
+        Tokenizer(tokens)
+    # The largest vocabulary keeps every symbol, and so every Huffman code, within 15 bits
+    tokenizer = Tokenizer(tokens[:-1])
+    symbols = tokenizer.tokenize(b''.join(tokens[-100:-1]))
+    assert max(map(ord, symbols)) < 1 << 15
+    _, codes, _ = huffman_encode(''.join(map(chr, range(1 << 15))))
+    assert max(len(code) for code in codes.values()) <= MAX_CODE_LENGTH
@@ -0,0 +1,29 @@
+import pytest
+
+from text_compression.trained import MAX_CODE_LENGTH, decode_message, encode_message, train
+
+
+def _fibonacci_samples(count=30):
+    # Byte i appears fib(i) times: skewed enough for codes far over MAX_CODE_LENGTH
+    samples = []
+    a, b = 1, 1
+    for value in range(count):
+        samples.append(bytes([value]) * a)
+        a, b = b, a + b
+    return samples
+
+
+@pytest.mark.parametrize('kind', ['huffman', 'shannon-fano'])
+def test_skewed_training_limits_code_lengths(kind):
+    table = train(_fibonacci_samples(), kind)
+    assert max(table.body) <= MAX_CODE_LENGTH
+    assert sum(2.0 ** -length for length in table.body) <= 1
+    for message in (bytes(range(256)), b'\x00\x01' * 50, b''):
+        assert decode_message(encode_message(message, table), table) == message
+
+
+@pytest.mark.parametrize('kind', ['huffman', 'shannon-fano', 'lz77'])
+def test_round_trip_str_messages(kind):
+    table = train(['user=alice status=200', 'user=bob status=404'] * 3, kind)
+    for message in ('user=carol status=500', 'a\ud800b\udfff', 'é' * 20):
+        assert decode_message(encode_message(message, table), table) == message
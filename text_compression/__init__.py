@@ -0,0 +1,48 @@
+"""Text compression algorithms usable without the Tkinter UI.
+
+Submodules are imported on first use of one of their names, so
+``import text_compression`` stays cheap for short-lived processes.
+"""
+
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'auto': ('AutoPipeline', 'choose_method', 'rank_methods', 'block_statistics'),
+    'bwt': ('bwt_transform', 'bwt_rotations', 'bwt_inverse', 'bwt_encode_blocks', 'bwt_decode_blocks',
+            'rotation_array'),
+    'lz77': ('lz77_encode', 'lz77_decode', 'LEVELS'),
+    'deflate': ('deflate_encode', 'deflate_decode'),
+    'huffman': ('huffman_encode', 'huffman_decode'),
+    'shannon_fano': ('shannon_fano_encode', 'shannon_fano_decode'),
+    'range_coder': ('range_encode', 'range_decode'),
+    'mtf': ('mtf_encode', 'mtf_decode', 'zero_run_encode', 'zero_run_decode'),
+    'rle': ('run_length_encoding', 'rle_encode', 'rle_decode'),
+    'stream': ('Compressor', 'Decompressor', 'CompressedFile', 'compress_stream', 'decompress_stream'),
+    'parallel': ('parallel_compress', 'parallel_decompress', 'parallel_compress_file', 'parallel_decompress_file'),
+    'incremental': ('IncrementalEncoder',),
+    'mapped': ('mapped_compress_file', 'mapped_decompress_file'),
+    'server': ('CompressionServer', 'serve', 'load_test'),
+    'seekable': ('ArchiveReader', 'open_archive'),
+    'profiling': ('Tracer', 'stage', 'traced'),
+    'pipeline': ('Pipeline', 'Stage', 'PIPELINES', 'STAGES', 'build_pipeline'),
+    'tokens': ('Tokenizer', 'train_vocabulary', 'token_encode', 'token_decode'),
+    'trained': ('StaticTable', 'TableCache', 'train', 'encode_message', 'decode_message', 'save_table', 'load_table'),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    # Cache it so later lookups skip this function
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
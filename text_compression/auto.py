@@ -0,0 +1,180 @@
+"""Automatic choice of a pipeline for each block from statistics of a sample.
+
+A few slices of the block are sampled and measured:
+    entropy: order-0 entropy of the sample's bytes, in bits per byte
+    runs:    fraction of bytes in runs of RUN_LENGTH or more equal bytes
+    repeats: fraction of bytes a greedy scan can copy from earlier in the
+             sample, and the number of copies it makes
+From these the compressed size of each candidate in CANDIDATES is
+estimated, and the fastest one expected to reach the target ratio is used
+(or the one with the best expected ratio when none does). Data that no
+candidate is expected to shrink is stored as it is.
+
+An auto-compressed block starts with the id of the pipeline chosen for it,
+followed by that pipeline's output, so every block decodes on its own.
+"""
+
+import math
+from collections import Counter
+
+from .pipeline import PIPELINES, PIPELINES_BY_ID, build_pipeline
+from .rle import _runs
+from .symbols import byte_view, is_binary
+
+# Bytes taken from the start, middle and end of a block
+SAMPLE_SLICES = 3
+SAMPLE_SLICE_SIZE = 4096
+
+# Shortest repeat the sample scan counts, and the shortest run
+REPEAT_LENGTH = 4
+RUN_LENGTH = 4
+
+# Approximate cost of one LZ77 copy (length and distance codes with extra
+# bits), and the extra cost of a literal over its entropy (its length code)
+MATCH_BITS = 12
+LITERAL_BITS = 1
+
+# An entropy coder spends at least one bit on every symbol
+MIN_SYMBOL_BITS = 1
+
+# BWT saves about this multiple of what LZ77 saves over order-0 entropy
+BWT_GAIN = 1.15
+
+# Container, table and pipeline headers, in bytes
+OVERHEAD_BYTES = 32
+
+DEFAULT_TARGET_RATIO = 0.5
+
+# Candidates from fastest to slowest: (method, encode throughput in MB/s on
+# the benchmark corpus, estimator key). The throughputs only need to be
+# right relative to each other.
+CANDIDATES = (
+    ('store', 500.0, 'store'),
+    ('huffman', 5.0, 'entropy'),
+    ('deflate', 0.25, 'lz77'),
+    ('bwt-range', 0.1, 'bwt'),
+)
+
+
+def sample(data, slices=SAMPLE_SLICES, slice_size=SAMPLE_SLICE_SIZE):
+    """Return bytes from evenly spaced slices of data (str is sampled as UTF-8)."""
+    if len(data) <= slices * slice_size:
+        parts = [data]
+    else:
+        step = (len(data) - slice_size) // (slices - 1)
+        parts = [data[i * step:i * step + slice_size] for i in range(slices)]
+    if is_binary(data):
+        return b''.join(bytes(byte_view(part)) for part in parts)
+    return ''.join(parts).encode('utf-8', 'surrogatepass')
+
+
+def block_statistics(data):
+    """Return a dict of sample statistics of data (see the module docstring)."""
+    sampled = sample(data)
+    n = len(sampled)
+    if not n:
+        return {'size': 0, 'entropy': 0.0, 'runs': 0.0, 'repeats': 0.0, 'copies': 0}
+    counts = Counter(sampled)
+    entropy = -sum(count / n * math.log2(count / n) for count in counts.values())
+    _, run_lengths = _runs(sampled, RUN_LENGTH)
+
+    # Greedy scan for repeats, remembering the last position of every prefix
+    last = {}
+    covered = 0
+    copies = 0
+    i = 0
+    while i + REPEAT_LENGTH <= n:
+        key = sampled[i:i + REPEAT_LENGTH]
+        j = last.get(key)
+        last[key] = i
+        if j is None:
+            i += 1
+            continue
+        length = REPEAT_LENGTH
+        while i + length < n and sampled[j + length] == sampled[i + length]:
+            length += 1
+        covered += length
+        copies += 1
+        i += length
+    return {'size': n, 'entropy': entropy, 'runs': sum(run_lengths) / n, 'repeats': covered / n, 'copies': copies}
+
+
+def estimate_ratios(statistics):
+    """Return {method: estimated compressed size / input size} for every candidate."""
+    n = statistics['size']
+    if not n:
+        return {method: 1.0 for method, _, _ in CANDIDATES}
+    overhead = OVERHEAD_BYTES / n
+    entropy = max(statistics['entropy'], MIN_SYMBOL_BITS) / 8
+    # Runs are copies too, at distance one
+    repeats = max(statistics['repeats'], statistics['runs'])
+    literals = (1 - repeats) * (statistics['entropy'] + LITERAL_BITS) * n
+    lz77 = (literals + statistics['copies'] * MATCH_BITS) / (8 * n)
+    bwt = max(entropy - BWT_GAIN * max(entropy - lz77, 0), 0)
+    estimates = {'store': 1.0, 'entropy': entropy + overhead, 'lz77': lz77 + overhead, 'bwt': bwt + overhead}
+    return {method: estimates[key] for method, _, key in CANDIDATES}
+
+
+def rank_methods(data, target_ratio=DEFAULT_TARGET_RATIO, min_throughput=None):
+    """Return the names of the pipelines to try on data, best first.
+
+    Candidates slower than min_throughput (MB/s, see CANDIDATES) are left
+    out. The ones whose estimated ratio meets target_ratio come first,
+    fastest first, then the rest from the best estimate down.
+    """
+    estimates = estimate_ratios(block_statistics(data))
+    allowed = [method for method, throughput, _ in CANDIDATES
+               if min_throughput is None or throughput >= min_throughput or method == 'store']
+    meeting = [method for method in allowed if estimates[method] <= target_ratio]
+    rest = sorted((method for method in allowed if method not in meeting),
+                  key=lambda method: (estimates[method], allowed.index(method)))
+    return meeting + rest
+
+
+def choose_method(data, target_ratio=DEFAULT_TARGET_RATIO, min_throughput=None):
+    """Return the name of the pipeline to compress data with: the first of rank_methods().
+
+    Of the candidates at least min_throughput fast, the fastest whose
+    estimated ratio meets target_ratio is chosen, or else the one with the
+    best estimate.
+    """
+    return rank_methods(data, target_ratio, min_throughput)[0]
+
+
+class AutoPipeline:
+    """Pipeline that picks a pipeline per block with choose_method and records its id."""
+
+    def __init__(self, level='normal', target_ratio=DEFAULT_TARGET_RATIO, min_throughput=None):
+        self.level = level
+        self.target_ratio = target_ratio
+        self.min_throughput = min_throughput
+        self.last_method = None
+
+    def __repr__(self):
+        return 'auto'
+
+    def encode(self, data):
+        """Compress data with the chosen pipeline and return its id followed by the output bytes.
+
+        A pipeline that raises on data is skipped for the next one from
+        rank_methods(); 'store' takes anything.
+        """
+        error = None
+        for method in rank_methods(data, self.target_ratio, self.min_throughput):
+            try:
+                encoded = build_pipeline(method, self.level).encode(data)
+            except Exception as e:
+                error = error or e
+                continue
+            self.last_method = method
+            return bytes([PIPELINES[method][0]]) + encoded
+        raise error
+
+    def decode(self, data):
+        """Invert encode."""
+        if not data:
+            raise ValueError("Auto-compressed block is empty.")
+        method = PIPELINES_BY_ID.get(data[0])
+        if method is None or method == 'auto':
+            raise ValueError(f"Unknown pipeline id {data[0]} in auto-compressed block.")
+        return build_pipeline(method).decode(memoryview(data)[1:])
@@ -0,0 +1,83 @@
+"""Run slow work off a UI thread and hand its results back through a queue.
+
+The Tkinter front-ends wrap their work in a BackgroundJob and poll it
+with root.after, so the main loop keeps handling events while a codec
+runs.
+"""
+
+import queue
+import threading
+
+# Characters of one displayed value shown before it is cut short
+DISPLAY_LIMIT = 2000
+
+
+def truncate(value, limit=DISPLAY_LIMIT):
+    """Return str(value) cut to limit characters, noting how much was left out."""
+    text = str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text) - limit} more characters not shown)"
+
+
+class BackgroundJob:
+    """Run a generator on a worker thread; every item it yields is one step of progress.
+
+    poll() returns the items produced since the previous call and updates
+    done, finished, cancelled and error. Cancelling takes effect between
+    steps, since a codec call already running cannot be interrupted.
+    """
+
+    def __init__(self, steps, total=None):
+        self.total = total
+        self.done = 0
+        self.finished = False
+        self.cancelled = False
+        self.error = None
+        self._steps = steps
+        self._queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Ask the worker to stop before its next step."""
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        """Wait for the worker thread to end."""
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            for item in self._steps:
+                self._queue.put(('item', item))
+                if self._cancel.is_set():
+                    self._steps.close()
+                    self._queue.put(('cancelled', None))
+                    return
+        except Exception as e:
+            self._queue.put(('error', e))
+            return
+        self._queue.put(('finished', None))
+
+    def poll(self):
+        """Return the items yielded since the last poll, without blocking."""
+        items = []
+        while True:
+            try:
+                kind, value = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if kind == 'item':
+                items.append(value)
+                self.done += 1
+                continue
+            self.finished = True
+            if kind == 'error':
+                self.error = value
+            elif kind == 'cancelled':
+                self.cancelled = True
@@ -0,0 +1,254 @@
+"""Benchmark every codec and pipeline over a locally generated corpus.
+
+Run with:
+    python -m text_compression.benchmark --sizes 1K,100K --output results.json
+    python -m text_compression.benchmark --baseline results.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from .bwt import bwt_inverse, bwt_transform
+from .pipeline import PIPELINES, build_pipeline
+from .tokens import MODES, token_decode, token_encode
+
+DEFAULT_SIZES = ('1K', '10K', '100K')
+
+# Relative throughput drop (or ratio drop) that counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+_LOG_LEVELS = ('INFO', 'INFO', 'INFO', 'WARN', 'DEBUG', 'ERROR')
+_LOG_PATHS = ('/index.html', '/api/v1/users', '/api/v1/orders', '/static/app.js', '/login', '/health')
+_LOG_USERS = ('alice', 'bob', 'carol', 'dave', 'eve')
+
+_MARKOV_SEED_TEXT = (
+    "the quick brown fox jumps over the lazy dog while the cat sleeps in the warm sun. "
+    "compression algorithms find structure in data and replace repeated patterns with "
+    "shorter references. a good model of the source predicts the next symbol well, and "
+    "an entropy coder turns those predictions into bits. text written by people repeats "
+    "words and phrases, so dictionary methods and context models both work well on it. "
+)
+
+
+def parse_size(text):
+    """Parse sizes such as '512', '10K' or '100M' into a number of characters."""
+    text = text.strip().upper()
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def repetitive_logs(size, seed=0):
+    """Generate web-server-like log lines with heavy repetition."""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    timestamp = 1700000000
+    while total < size:
+        timestamp += rng.randint(0, 3)
+        line = (f"{timestamp} {rng.choice(_LOG_LEVELS)} GET {rng.choice(_LOG_PATHS)} "
+                f"user={rng.choice(_LOG_USERS)} status={rng.choice((200, 200, 200, 304, 404, 500))} "
+                f"took={rng.randint(1, 900)}ms\n")
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines)[:size]
+
+
+def random_text(size, seed=0):
+    """Generate uniformly random printable characters (nearly incompressible)."""
+    rng = random.Random(seed)
+    return ''.join(rng.choices(string.printable, k=size))
+
+
+def markov_text(size, seed=0, order=3):
+    """Generate natural-language-like text from a character Markov model."""
+    rng = random.Random(seed)
+    source = _MARKOV_SEED_TEXT
+    model = {}
+    for i in range(len(source) - order):
+        model.setdefault(source[i:i + order], []).append(source[i + order])
+    context = source[:order]
+    generated = [context]
+    total = order
+    while total < size:
+        char = rng.choice(model.get(context) or source)
+        generated.append(char)
+        context = context[1:] + char
+        total += 1
+    return ''.join(generated)[:size]
+
+
+CORPUS = {
+    'logs': repetitive_logs,
+    'random': random_text,
+    'markov': markov_text,
+}
+
+
+def _codecs():
+    """Return {name: (encode, decode)} for every benchmarked codec."""
+    codecs = {'bwt-transform': (lambda text: bwt_transform(text), lambda encoded: bwt_inverse(*encoded))}
+    for name in PIPELINES:
+        pipeline = build_pipeline(name)
+        codecs[name] = (pipeline.encode, pipeline.decode)
+    for mode in MODES:
+        codecs[f'{mode}-huffman'] = (lambda text, mode=mode: token_encode(text, 'huffman', mode), token_decode)
+    return codecs
+
+
+def _encoded_size(encoded):
+    if isinstance(encoded, (bytes, bytearray)):
+        return len(encoded)
+    # bwt-transform: the BWT string plus its primary index
+    return len(encoded[0].encode('utf-8')) + 8
+
+
+def _measure(function, argument, memory):
+    """Return (result, seconds, peak bytes or None)."""
+    start = time.perf_counter()
+    result = function(argument)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function(argument)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, corpora=None, codecs=None, memory=True, seed=0, progress=None):
+    """Run every (corpus, size, codec) combination and return a list of result dicts."""
+    available = _codecs()
+    codecs = codecs or list(available)
+    unknown = [name for name in codecs if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown codecs {unknown}; expected names from {sorted(available)}.")
+    corpora = corpora or list(CORPUS)
+    unknown = [name for name in corpora if name not in CORPUS]
+    if unknown:
+        raise ValueError(f"Unknown corpora {unknown}; expected names from {sorted(CORPUS)}.")
+    results = []
+    for corpus in corpora:
+        for size in sizes:
+            size = parse_size(size) if isinstance(size, str) else size
+            text = CORPUS[corpus](size, seed)
+            input_bytes = len(text.encode('utf-8'))
+            for name in codecs:
+                encode, decode = available[name]
+                encoded, encode_seconds, encode_peak = _measure(encode, text, memory)
+                decoded, decode_seconds, decode_peak = _measure(decode, encoded, memory)
+                output_bytes = _encoded_size(encoded)
+                result = {
+                    'corpus': corpus,
+                    'size': size,
+                    'codec': name,
+                    'input_bytes': input_bytes,
+                    'output_bytes': output_bytes,
+                    'ratio': input_bytes / output_bytes if output_bytes else 0.0,
+                    'encode_mb_s': input_bytes / encode_seconds / 1e6 if encode_seconds else 0.0,
+                    'decode_mb_s': input_bytes / decode_seconds / 1e6 if decode_seconds else 0.0,
+                    'encode_peak_bytes': encode_peak,
+                    'decode_peak_bytes': decode_peak,
+                    'round_trip': decoded == text,
+                }
+                results.append(result)
+                if progress:
+                    progress(result)
+    return results
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Return human-readable regressions of current against baseline results."""
+    previous = {(r['corpus'], r['size'], r['codec']): r for r in baseline}
+    regressions = []
+    for result in current:
+        key = (result['corpus'], result['size'], result['codec'])
+        if not result['round_trip']:
+            regressions.append(f"{key}: round trip failed")
+        old = previous.get(key)
+        if old is None:
+            continue
+        for metric in ('encode_mb_s', 'decode_mb_s', 'ratio'):
+            if old[metric] and result[metric] < old[metric] * (1 - tolerance):
+                regressions.append(f"{key}: {metric} dropped from {old[metric]:.3f} to {result[metric]:.3f}")
+    return regressions
+
+
+def report(results, label=None):
+    """Wrap results with the environment they were measured in, ready for JSON."""
+    return {
+        'label': label,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def format_result(result):
+    """One table row for a result dict."""
+    peak = result['encode_peak_bytes']
+    peak = f"{peak / 1024:9.0f}K" if peak is not None else f"{'-':>10}"
+    return (f"{result['corpus']:<7} {result['size']:>10} {result['codec']:<34} "
+            f"{result['ratio']:7.2f} {result['encode_mb_s']:8.3f} {result['decode_mb_s']:8.3f} {peak}"
+            f"{'' if result['round_trip'] else '  ROUND TRIP FAILED'}")
+
+
+def build_parser(parser=None):
+    """Add benchmark options to parser (a new ArgumentParser by default)."""
+    parser = parser or argparse.ArgumentParser(prog='python -m text_compression.benchmark',
+                                               description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                        help="comma-separated corpus sizes, e.g. 1K,1M,100M")
+    parser.add_argument('--corpus', default=','.join(CORPUS), help="comma-separated corpora")
+    parser.add_argument('--codecs', default=None, help="comma-separated codecs (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak memory runs")
+    parser.add_argument('--label', default=None, help="label stored with the results, e.g. a version")
+    parser.add_argument('--output', default=None, help="write results as JSON to this file")
+    parser.add_argument('--baseline', default=None, help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    return parser
+
+
+def run(args):
+    """Run the benchmark described by parsed args; return the process exit code."""
+    print(f"{'corpus':<7} {'size':>10} {'codec':<34} {'ratio':>7} {'enc MB/s':>8} {'dec MB/s':>8} {'enc peak':>10}")
+    results = run_benchmarks(
+        sizes=[parse_size(size) for size in args.sizes.split(',')],
+        corpora=args.corpus.split(','),
+        codecs=args.codecs.split(',') if args.codecs else None,
+        memory=not args.no_memory,
+        seed=args.seed,
+        progress=lambda result: print(format_result(result), flush=True),
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report(results, args.label), f, indent=2)
+    failed = not all(result['round_trip'] for result in results)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f)['results'], results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Burrows-Wheeler Transform built on a suffix (rotation) array."""
+
+from array import array
+from collections import Counter
+
+from .profiling import traced
+from .symbols import byte_view, is_binary
+
+# Block size used when a large input is split for block-parallel decoding
+DEFAULT_BLOCK_SIZE = 900 * 1024
+
+
+def _symbols(s):
+    """Return the input as a list of integer symbols."""
+    if isinstance(s, str):
+        return [ord(c) for c in s]
+    return list(s)
+
+
+def rotation_array(s):
+    """Return the start positions of the cyclic rotations of s in sorted order.
+
+    Uses prefix doubling over integer rank arrays, so no rotation is ever
+    materialized: each round sorts by (rank[i], rank[i + k]) and stops as
+    soon as every rank is distinct.
+    """
+    n = len(s)
+    if n == 0:
+        return []
+    symbols = _symbols(s)
+    order = sorted(range(n), key=symbols.__getitem__)
+
+    # Dense initial ranks in 0..n-1
+    rank = [0] * n
+    r = 0
+    for j in range(1, n):
+        if symbols[order[j]] != symbols[order[j - 1]]:
+            r += 1
+        rank[order[j]] = r
+
+    k = 1
+    while r < n - 1 and k < n:
+        doubled = rank + rank
+        keys = [a * n + b for a, b in zip(rank, doubled[k:k + n])]
+        order.sort(key=keys.__getitem__)
+        r = 0
+        rank[order[0]] = 0
+        for j in range(1, n):
+            if keys[order[j]] != keys[order[j - 1]]:
+                r += 1
+            rank[order[j]] = r
+        k *= 2
+    return order
+
+
+@traced('bwt.transform')
+def bwt_transform(s, sentinel='$'):
+    """Apply Burrows-Wheeler Transform to the input string.
+
+    Returns the BWT string and the primary index (the row of the sorted
+    rotations that holds the original string). The sentinel is appended to
+    str input unless it is None; bytes-like input is always transformed
+    without one and gives bytes.
+    """
+    if is_binary(s):
+        data = byte_view(s)
+        order = rotation_array(data)
+        return bytes([data[i - 1] for i in order]), order.index(0) if order else 0
+    if sentinel:
+        s = s + sentinel
+    order = rotation_array(s)
+    bwt_output = ''.join([s[i - 1] for i in order])
+    return bwt_output, order.index(0) if order else 0
+
+
+def bwt_rotations(s):
+    """Return the rotations and sorted rotations of s + '$' for display."""
+    s = s + '$'
+    rotations = [s[i:] + s[:i] for i in range(len(s))]
+    rotations_sorted = [rotations[i] for i in rotation_array(s)]
+    return rotations, rotations_sorted
+
+
+# BWT Inverse
+@traced('bwt.inverse')
+def bwt_inverse(bwt_str, primary_index=None, sentinel='$'):
+    """Reconstruct the original string from the BWT output by LF-mapping.
+
+    primary_index is the row returned by bwt_transform; when it is omitted
+    the row is located by the sentinel in the BWT output. The sentinel is
+    stripped from str output unless it is None; bytes-like input needs the
+    primary index and gives bytes.
+    """
+    binary = is_binary(bwt_str)
+    n = len(bwt_str)
+    if n == 0:
+        return b'' if binary else ''
+    if primary_index is None:
+        primary_index = -1 if binary or not sentinel else bwt_str.find(sentinel)
+        if primary_index < 0:
+            raise ValueError("BWT output has no sentinel; pass primary_index.")
+    if not 0 <= primary_index < n:
+        raise ValueError(f"Primary index {primary_index} out of range for length {n}.")
+    if binary:
+        codes = byte_view(bwt_str)
+    else:
+        codes = array('I', bwt_str.encode('utf-32-le', 'surrogatepass'))
+
+    # Counting sort: first row of every symbol in the sorted first column
+    next_row = {}
+    total = 0
+    for symbol, count in sorted(Counter(codes).items()):
+        next_row[symbol] = total
+        total += count
+
+    # LF[i] is the row whose rotation starts with the last character of row i
+    lf = array('l', [0]) * n
+    for i, symbol in enumerate(codes):
+        lf[i] = next_row[symbol]
+        next_row[symbol] += 1
+
+    # Walk backwards from the primary row
+    decoded = bytearray(n) if binary else array('I', [0]) * n
+    row = primary_index
+    for k in range(n - 1, -1, -1):
+        decoded[k] = codes[row]
+        row = lf[row]
+    if binary:
+        return bytes(decoded)
+    if sentinel:
+        # Drop the sentinel appended by bwt_transform
+        decoded = memoryview(decoded)[:-1]
+    return decoded.tobytes().decode('utf-32-le', 'surrogatepass')
+
+
+def _inverse_block(block):
+    """Invert one (bwt_str, primary_index) block; top level so it pickles."""
+    return bwt_inverse(*block)
+
+
+def bwt_encode_blocks(s, block_size=DEFAULT_BLOCK_SIZE):
+    """Split s into independent blocks and transform each one."""
+    return [bwt_transform(s[i:i + block_size]) for i in range(0, len(s), block_size)]
+
+
+def bwt_decode_blocks(blocks, workers=None):
+    """Invert a list of (bwt_str, primary_index) blocks, in parallel when worthwhile."""
+    blocks = list(blocks)
+    empty = b'' if blocks and is_binary(blocks[0][0]) else ''
+    if len(blocks) < 2 or workers == 1:
+        return empty.join(map(_inverse_block, blocks))
+    # Imported here: the process pool machinery is slow to import and rarely needed
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return empty.join(executor.map(_inverse_block, blocks))
@@ -0,0 +1,258 @@
+"""Command-line interface for compressing files without the Tkinter UI.
+
+Examples:
+    python -m text_compression compress big.log            # writes big.log.tcz
+    python -m text_compression compress -m lz77 -l fast 'logs/*.log'
+    cat big.log | python -m text_compression compress > big.log.tcz
+    python -m text_compression decompress -c big.log.tcz | head
+    python -m text_compression benchmark --sizes 1K,100K
+    python -m text_compression fuzz --cases 500 --budgets
+    python -m text_compression serve -j 4 &
+    python -m text_compression loadtest --clients 64
+
+Files are compressed as bytes into the streaming format, or into the
+indexed block archive when --workers or --mmap is given. Decompression detects
+which of the two it was given.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+
+from .lz77 import LEVELS
+from .pipeline import PIPELINES
+from .profiling import Tracer
+from .stream import CHUNK_SIZE, DEFAULT_BLOCK_SIZE, STREAM_MAGIC, Decompressor, compress_stream
+
+DEFAULT_SUFFIX = '.tcz'
+
+# Characters that make an argument a glob pattern
+_GLOB_CHARACTERS = '*?['
+
+
+def _size(text):
+    # Imported here so that compress and decompress never load the benchmark module
+    from .benchmark import parse_size
+    try:
+        return parse_size(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}") from None
+
+
+def expand_paths(patterns):
+    """Expand glob patterns (kept for shells that pass them through) into a list of paths."""
+    paths = []
+    for pattern in patterns:
+        if pattern != '-' and any(char in pattern for char in _GLOB_CHARACTERS):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise ValueError(f"{pattern}: no files match")
+            paths.extend(path for path in matches if os.path.isfile(path))
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def compress_file(source, destination, args):
+    """Compress binary file object source into destination with the options in args."""
+    if args.mmap:
+        from .mapped import mapped_compress_file
+        mapped_compress_file(source, destination, args.method, args.block_size, args.level, args.workers or 1)
+    elif args.workers:
+        # Imported here: the block archive pulls in the process pool machinery
+        from .parallel import parallel_compress_file
+        parallel_compress_file(source, destination, args.method, args.block_size, args.level, args.workers)
+    else:
+        compress_stream(source, destination, args.method, args.block_size, args.level)
+
+
+def decompress_file(source, destination, args):
+    """Decompress a stream or block archive from binary source into binary destination."""
+    magic = source.read(len(STREAM_MAGIC))
+    if magic == STREAM_MAGIC:
+        decompressor = Decompressor()
+        data = magic
+        while data and not decompressor.eof:
+            decoded = decompressor.feed(data)
+            if decoded:
+                # Streams written from str hold text; files receive it as UTF-8
+                destination.write(decoded.encode('utf-8') if isinstance(decoded, str) else decoded)
+            data = source.read(CHUNK_SIZE)
+        decompressor.flush()
+        return
+    from .parallel import ARCHIVE_MAGIC, parallel_decompress_file, read_index
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError("not a compressed stream or block archive")
+    if not source.seekable():
+        source = io.BytesIO(magic + source.read())
+    elif args.mmap and destination.readable() and destination.seekable():
+        # Mapping the output needs a read/write file ('w+b'); a redirected stdout is write-only
+        from .mapped import mapped_decompress_file
+        mapped_decompress_file(source, destination)
+        return
+    if read_index(source)[1]:
+        parallel_decompress_file(source, destination, args.workers)
+        return
+    text_destination = io.TextIOWrapper(destination, encoding='utf-8', newline='', write_through=True)
+    try:
+        parallel_decompress_file(source, text_destination, args.workers)
+    finally:
+        text_destination.detach()
+
+
+def _output_path(path, args):
+    if args.command == 'compress':
+        return path + args.suffix
+    if not path.endswith(args.suffix) or path == args.suffix:
+        raise ValueError(f"unknown suffix, expected {args.suffix!r} (use -c or -o)")
+    return path[:-len(args.suffix)]
+
+
+def _process(path, args):
+    """Compress or decompress one path ('-' is stdin); return False after reporting an error."""
+    function = compress_file if args.command == 'compress' else decompress_file
+    to_stdout = args.stdout or (path == '-' and not args.output)
+    output = None
+    try:
+        source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            if to_stdout:
+                function(source, sys.stdout.buffer, args)
+                sys.stdout.buffer.flush()
+            else:
+                output = args.output or _output_path(path, args)
+                if os.path.exists(output) and not args.force:
+                    output = None
+                    raise ValueError("output file already exists (use -f to overwrite)")
+                # A mapped output file must also be readable
+                with open(output, 'w+b' if args.mmap else 'wb') as destination:
+                    function(source, destination, args)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+    except (OSError, ValueError) as e:
+        if output is not None and os.path.exists(output):
+            os.remove(output)
+        print(f"{args.prog}: {path}: {e}", file=sys.stderr)
+        return False
+    if args.verbose and path != '-' and output is not None:
+        before, after = os.path.getsize(path), os.path.getsize(output)
+        print(f"{path} -> {output}: {before} -> {after} bytes", file=sys.stderr)
+    if args.remove and path != '-':
+        os.remove(path)
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m text_compression', description=__doc__.splitlines()[0],
+                                     epilog="Run 'benchmark --help' or 'fuzz --help' for their options.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('compress', "compress files or stdin"),
+                               ('decompress', "decompress files or stdin")):
+        sub = commands.add_parser(command, help=help_text)
+        sub.add_argument('files', nargs='*', default=['-'],
+                         help="files or glob patterns; '-' or none reads stdin and writes stdout")
+        sub.add_argument('-c', '--stdout', action='store_true', help="write to stdout")
+        sub.add_argument('-o', '--output', help="output file (only with a single input)")
+        sub.add_argument('-f', '--force', action='store_true', help="overwrite existing output files")
+        sub.add_argument('--rm', dest='remove', action='store_true', help="remove input files once done")
+        sub.add_argument('-S', '--suffix', default=DEFAULT_SUFFIX, help="compressed file suffix")
+        sub.add_argument('-j', '--workers', type=int, default=None,
+                         help="worker processes; compressing with it writes a block archive")
+        sub.add_argument('--mmap', action='store_true',
+                         help="map files into memory instead of reading them; compressing writes a block archive")
+        sub.add_argument('-v', '--verbose', action='store_true', help="report sizes on stderr")
+        sub.add_argument('--profile', choices=('json', 'prometheus'),
+                         help="print per-stage timings on stderr (not of --workers processes)")
+        if command == 'compress':
+            sub.add_argument('-m', '--method', default='bwt', choices=sorted(PIPELINES))
+            sub.add_argument('-l', '--level', default='normal', choices=sorted(LEVELS))
+            sub.add_argument('-b', '--block-size', type=_size, default=DEFAULT_BLOCK_SIZE,
+                             help="bytes per independently compressed block, e.g. 256K")
+    for command, help_text in (('serve', "run the HTTP compression server"),
+                               ('loadtest', "load-test a running server")):
+        sub = commands.add_parser(command, help=help_text)
+        sub.add_argument('--host', default='127.0.0.1')
+        sub.add_argument('--port', type=int, default=8741)
+        sub.add_argument('--unix', metavar='PATH', help="use a Unix socket instead of TCP")
+        if command == 'serve':
+            sub.add_argument('-j', '--workers', type=int, default=None, help="worker processes coding blocks")
+            sub.add_argument('-b', '--block-size', type=_size, default=DEFAULT_BLOCK_SIZE,
+                             help="bytes per block handed to a worker, e.g. 256K")
+            sub.add_argument('--max-requests', type=int, default=256,
+                             help="requests in progress before new ones get 503")
+            sub.add_argument('-m', '--method', default='bwt', choices=sorted(PIPELINES),
+                             help="method when a request names none")
+        else:
+            sub.add_argument('--clients', type=int, default=32, help="concurrent connections")
+            sub.add_argument('--requests', type=int, default=10, help="requests per connection")
+            sub.add_argument('--size', type=_size, default=64 * 1024, help="bytes of generated logs per request")
+            sub.add_argument('--endpoint', default='/compress?method=lz77')
+    # Options are parsed by the benchmark and fuzz modules themselves, imported only when needed
+    commands.add_parser('benchmark', help="run the codec benchmarks", add_help=False)
+    commands.add_parser('fuzz', help="check round trips on generated inputs", add_help=False)
+    return parser
+
+
+def _service(parser, args):
+    # Imported here so that compress and decompress never load asyncio
+    import asyncio
+    from . import server
+    if args.command == 'serve':
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers must be at least 1")
+        where = args.unix or f'http://{args.host}:{args.port}'
+        print(f"{parser.prog}: serving on {where}", file=sys.stderr)
+        try:
+            server.serve(args.host, args.port, args.unix, workers=args.workers, block_size=args.block_size,
+                         max_requests=args.max_requests, method=args.method)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    from .benchmark import repetitive_logs
+    payload = repetitive_logs(args.size).encode()[:args.size]
+    summary = asyncio.run(server.load_test(args.host, args.port, args.unix, args.clients, args.requests, payload,
+                                           args.endpoint))
+    print(json.dumps(summary, indent=2))
+    return 0 if summary['statuses'].get(200) == args.clients * args.requests else 1
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == 'benchmark':
+        from . import benchmark
+        return benchmark.main(extra)
+    if args.command == 'fuzz':
+        from . import fuzz
+        return fuzz.main(extra)
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if args.command in ('serve', 'loadtest'):
+        return _service(parser, args)
+    args.prog = parser.prog
+    try:
+        paths = expand_paths(args.files)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output and len(paths) > 1:
+        parser.error("-o/--output needs a single input")
+    if args.mmap and args.command == 'compress' and '-' in paths:
+        parser.error("--mmap needs input files, not stdin")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    tracer = Tracer() if args.profile else None
+    ok = True
+    with tracer or contextlib.nullcontext():
+        for path in paths:
+            ok = _process(path, args) and ok
+    if tracer is not None:
+        if args.profile == 'json':
+            print(json.dumps(tracer.to_dict(), indent=2), file=sys.stderr)
+        else:
+            print(tracer.to_prometheus(), end='', file=sys.stderr)
+    return 0 if ok else 1
@@ -0,0 +1,213 @@
+"""Byte-oriented container for entropy-coded output.
+
+Layout:
+    magic (4 bytes) | version (1) | method (1) | flags (1)
+    | symbol count (varint) | table length (varint) | code table
+    | padding bits (1) | payload | CRC-32 of everything before it (4, big-endian)
+Version 1 containers have no flags byte.
+"""
+
+import zlib
+
+from . import vectorized
+from .symbols import symbol_value
+
+MAGIC = b'TCZ1'
+VERSION = 2
+
+# Flags: the symbols are bytes (0-255) and decode to bytes
+FLAG_BINARY = 1
+
+METHOD_HUFFMAN = 1
+METHOD_SHANNON_FANO = 2
+METHOD_CANONICAL_HUFFMAN = 3
+METHOD_RANGE_ORDER0 = 4
+METHOD_RANGE_ORDER1 = 5
+METHOD_DEFLATE = 6
+
+
+def write_varint(out, value):
+    """Append value to the bytearray out as an unsigned LEB128 varint."""
+    if value < 0:
+        raise ValueError("Varints must be non-negative.")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Read an unsigned LEB128 varint from data at pos; return (value, new_pos)."""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated varint.")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def pack_bits(bits):
+    """Pack a string of '0'/'1' characters into bytes; return (payload, padding)."""
+    padding = -len(bits) % 8
+    if not bits:
+        return b'', 0
+    bits += '0' * padding
+    return int(bits, 2).to_bytes(len(bits) // 8, 'big'), padding
+
+
+def pack_codes(s, codes):
+    """Pack the prefix code of every symbol of s; return (payload, padding)."""
+    if vectorized.enabled(len(s)):
+        packed = vectorized.pack_codes(s, codes)
+        if packed is not None:
+            return packed
+    return pack_bits(''.join([codes[char] for char in s]))
+
+
+def unpack_bits(payload, padding):
+    """Inverse of pack_bits: return the payload as a '0'/'1' string."""
+    if not payload:
+        return ''
+    bits = format(int.from_bytes(payload, 'big'), f'0{8 * len(payload)}b')
+    return bits[:len(bits) - padding]
+
+
+def encode_code_table(codes):
+    """Serialize a {symbol: code string} map as (symbol, length, code value) varints."""
+    out = bytearray()
+    write_varint(out, len(codes))
+    for char, code in sorted(codes.items()):
+        write_varint(out, symbol_value(char))
+        write_varint(out, len(code))
+        write_varint(out, int(code, 2) if code else 0)
+    return bytes(out)
+
+
+def decode_code_table(table, binary=False):
+    """Inverse of encode_code_table: return a {code string: symbol} map."""
+    count, pos = read_varint(table, 0)
+    decode_map = {}
+    for _ in range(count):
+        symbol, pos = read_varint(table, pos)
+        length, pos = read_varint(table, pos)
+        value, pos = read_varint(table, pos)
+        decode_map[format(value, f'0{length}b') if length else ''] = symbol if binary else chr(symbol)
+    return decode_map
+
+
+def encode_length_table(lengths):
+    """Serialize a {symbol: code length} map as (symbol delta, length) pairs."""
+    out = bytearray()
+    write_varint(out, len(lengths))
+    previous = 0
+    for char in sorted(lengths):
+        symbol = symbol_value(char)
+        write_varint(out, symbol - previous)
+        out.append(lengths[char])
+        previous = symbol
+    return bytes(out)
+
+
+def decode_length_table(table, binary=False):
+    """Inverse of encode_length_table: return a {symbol: code length} map."""
+    count, pos = read_varint(table, 0)
+    lengths = {}
+    symbol = 0
+    for _ in range(count):
+        delta, pos = read_varint(table, pos)
+        symbol += delta
+        lengths[symbol if binary else chr(symbol)] = table[pos]
+        pos += 1
+    return lengths
+
+
+def encode_alphabet(symbols):
+    """Serialize a set of symbols as a count and ascending symbol deltas."""
+    out = bytearray()
+    write_varint(out, len(symbols))
+    previous = 0
+    for symbol in sorted(map(symbol_value, symbols)):
+        write_varint(out, symbol - previous)
+        previous = symbol
+    return bytes(out)
+
+
+def decode_alphabet(table, binary=False):
+    """Inverse of encode_alphabet: return the symbols in ascending order."""
+    count, pos = read_varint(table, 0)
+    alphabet = []
+    symbol = 0
+    for _ in range(count):
+        delta, pos = read_varint(table, pos)
+        symbol += delta
+        alphabet.append(symbol if binary else chr(symbol))
+    return alphabet
+
+
+def decode_prefix_bits(bits, decode_map, count):
+    """Decode count symbols from a '0'/'1' string using a prefix-code map; return a list."""
+    decoded = []
+    current = ''
+    for bit in bits:
+        current += bit
+        symbol = decode_map.get(current)
+        if symbol is not None:
+            decoded.append(symbol)
+            current = ''
+            if len(decoded) == count:
+                break
+    if len(decoded) != count:
+        raise ValueError("Payload ended before all symbols were decoded.")
+    return decoded
+
+
+def write_container(method, count, table, payload, padding, flags=0):
+    """Assemble a container and append its CRC-32."""
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    out.append(method)
+    out.append(flags)
+    write_varint(out, count)
+    write_varint(out, len(table))
+    out += table
+    out.append(padding)
+    out += payload
+    out += zlib.crc32(out).to_bytes(4, 'big')
+    return bytes(out)
+
+
+def read_container(data, *methods):
+    """Validate a container holding one of methods.
+
+    Returns (method, flags, count, table, payload, padding).
+    """
+    data = bytes(data)
+    if len(data) < len(MAGIC) + 7 or not data.startswith(MAGIC):
+        raise ValueError("Not a compressed container (bad magic number).")
+    if zlib.crc32(data[:-4]) != int.from_bytes(data[-4:], 'big'):
+        raise ValueError("CRC mismatch: the container is corrupted.")
+    pos = len(MAGIC)
+    version = data[pos]
+    if version not in (1, VERSION):
+        raise ValueError(f"Unsupported container version {version}.")
+    method = data[pos + 1]
+    if method not in methods:
+        raise ValueError(f"Container holds method {method}, expected one of {methods}.")
+    pos += 2
+    flags = 0
+    if version >= 2:
+        flags = data[pos]
+        pos += 1
+    count, pos = read_varint(data, pos)
+    table_length, pos = read_varint(data, pos)
+    table = data[pos:pos + table_length]
+    pos += table_length
+    padding = data[pos]
+    if padding > 7:
+        raise ValueError(f"Invalid padding bit count {padding}.")
+    return method, flags, count, table, data[pos + 1:-4], padding
@@ -0,0 +1,182 @@
+"""Compact DEFLATE-style coding of LZ77 tokens.
+
+lz77_encode returns a list of (offset, length, next_char) tuples, which
+is convenient to show but costs far more memory than the input. Here the
+tokens are split into three symbol streams, each coded with its own
+canonical Huffman code, plus one stream of raw extra bits:
+    literals: the next byte of every token (the last token may have none)
+    lengths:  one length code per token, 0 meaning no match
+    distances: one distance code per match, for offset - 1
+As in DEFLATE, a length or distance v is sent as a code naming a range of
+values and as many extra bits as needed to pick v inside it: codes 0-3
+are the values themselves, and every later pair of codes covers twice the
+range of the pair before. Text is coded as its UTF-8 bytes.
+
+The output is a container (see container.py) with method METHOD_DEFLATE:
+    table: per stream, length (varint) | code lengths (encode_length_table)
+    payload: literal count (varint) | literal, length and distance stream
+             sizes (varints) | the three streams | extra bits
+The container's padding field applies to the extra bits.
+"""
+
+from .container import (FLAG_BINARY, METHOD_DEFLATE, decode_length_table, encode_length_table, pack_bits,
+                        pack_codes, read_container, read_varint, write_container, write_varint)
+from .huffman import ROOT_TABLE_BITS, CanonicalDecoder, canonical_codes, huffman_code_lengths
+from .lz77 import lz77_encode
+from .profiling import traced
+from .symbols import byte_view, is_binary
+
+# Codes needed for values below 2**24, which covers the largest LZ77 window
+MAX_CODE = 48
+
+# (first value, extra bit count) of every code
+CODE_RANGES = [(code, 0) for code in range(4)] + [
+    ((2 | code & 1) << ((code >> 1) - 1), (code >> 1) - 1) for code in range(4, MAX_CODE + 2)]
+
+
+def value_code(value):
+    """Return (code, extra bit count, extra bits) for a non-negative length or distance."""
+    if value < 4:
+        return value, 0, 0
+    high = value.bit_length() - 1
+    return 2 * high + (value >> (high - 1) & 1), high - 1, value & ((1 << (high - 1)) - 1)
+
+
+def _code_table(symbols):
+    """Return ({symbol: code string}, serialized lengths) for a Huffman code of symbols."""
+    counts = {}
+    for symbol in symbols:
+        counts[symbol] = counts.get(symbol, 0) + 1
+    codes = canonical_codes(huffman_code_lengths(counts)) if counts else {}
+    table = encode_length_table({symbol: len(code) for symbol, code in codes.items()})
+    return codes, table
+
+
+def _decode_stream(lengths, payload, count):
+    """Decode count symbols of the Huffman stream payload."""
+    if not count:
+        return []
+    if not lengths:
+        raise ValueError("Stream has symbols but no code table.")
+    # Keep the lookup table no larger than the payload warrants
+    root_bits = min(ROOT_TABLE_BITS, max(max(lengths.values()), len(payload).bit_length()))
+    return CanonicalDecoder(lengths, root_bits).decode(payload, count)
+
+
+@traced('deflate.encode')
+def deflate_encode(s, level='normal', **lz77_options):
+    """Encode the input string (or bytes-like object) as Huffman-coded LZ77 token streams.
+
+    level and the keyword arguments are passed to lz77_encode. Returns the
+    packed container bytes.
+    """
+    flags = FLAG_BINARY if is_binary(s) else 0
+    data = bytes(byte_view(s)) if flags else s.encode('utf-8', 'surrogatepass')
+    tokens = lz77_encode(data, level, **lz77_options)
+
+    literals = bytearray()
+    length_codes = []
+    distance_codes = []
+    extra_bits = []
+    for offset, length, char in tokens:
+        if length:
+            code, bit_count, extra = value_code(length)
+            length_codes.append(code)
+            if bit_count:
+                extra_bits.append(format(extra, f'0{bit_count}b'))
+            code, bit_count, extra = value_code(offset - 1)
+            distance_codes.append(code)
+            if bit_count:
+                extra_bits.append(format(extra, f'0{bit_count}b'))
+        else:
+            length_codes.append(0)
+        if char is not None:
+            literals.append(char)
+
+    table = bytearray()
+    payload = bytearray()
+    write_varint(payload, len(literals))
+    streams = []
+    for symbols in (literals, length_codes, distance_codes):
+        codes, lengths = _code_table(symbols)
+        write_varint(table, len(lengths))
+        table += lengths
+        streams.append(pack_codes(symbols, codes)[0])
+    for stream in streams:
+        write_varint(payload, len(stream))
+    for stream in streams:
+        payload += stream
+    extra_payload, padding = pack_bits(''.join(extra_bits))
+    payload += extra_payload
+    return write_container(METHOD_DEFLATE, len(tokens), bytes(table), bytes(payload), padding, flags)
+
+
+@traced('deflate.decode')
+def deflate_decode(data):
+    """Decode a container produced by deflate_encode back to the original string or bytes."""
+    _, flags, count, table, payload, padding = read_container(data, METHOD_DEFLATE)
+    tables = []
+    pos = 0
+    for _ in range(3):
+        size, pos = read_varint(table, pos)
+        tables.append(decode_length_table(table[pos:pos + size], True))
+        pos += size
+    literal_count, pos = read_varint(payload, 0)
+    if not count - 1 <= literal_count <= count:
+        raise ValueError("Literal count does not match the token count.")
+    sizes = []
+    for _ in range(3):
+        size, pos = read_varint(payload, pos)
+        sizes.append(size)
+    streams = []
+    for size in sizes:
+        streams.append(payload[pos:pos + size])
+        pos += size
+    extra = payload[pos:]
+    extra_bits_total = 8 * len(extra) - padding
+
+    literals = bytes(_decode_stream(tables[0], streams[0], literal_count))
+    length_codes = _decode_stream(tables[1], streams[1], count)
+    distance_codes = _decode_stream(tables[2], streams[2], count - length_codes.count(0))
+
+    out = bytearray()
+    # Extra bits are read through a small integer buffer refilled eight bytes at a time
+    buffer = 0
+    bits = 0
+    extra_pos = 0
+    bits_read = 0
+    match = 0
+    for token, code in enumerate(length_codes):
+        if code:
+            length_base, length_bits = CODE_RANGES[code]
+            distance_base, distance_bits = CODE_RANGES[distance_codes[match]]
+            match += 1
+            needed = length_bits + distance_bits
+            while bits < needed:
+                chunk = extra[extra_pos:extra_pos + 8]
+                if not chunk:
+                    raise ValueError("Extra bits ended before the last match.")
+                buffer = (buffer << (8 * len(chunk))) | int.from_bytes(chunk, 'big')
+                bits += 8 * len(chunk)
+                extra_pos += len(chunk)
+            bits -= needed
+            bits_read += needed
+            value = buffer >> bits
+            buffer &= (1 << bits) - 1
+            length = length_base + (value >> distance_bits)
+            offset = distance_base + (value & ((1 << distance_bits) - 1)) + 1
+            start = len(out) - offset
+            if start < 0:
+                raise ValueError("Match refers to data before the start of the output.")
+            if offset >= length:
+                out += out[start:start + length]
+            elif offset == 1:
+                out += out[-1:] * length
+            else:
+                # Overlapping copy repeats the last offset bytes
+                out += (out[start:] * (length // offset + 1))[:length]
+        if token < literal_count:
+            out.append(literals[token])
+    if bits_read > extra_bits_total:
+        raise ValueError("Extra bits ended before the last match.")
+    return bytes(out) if flags & FLAG_BINARY else out.decode('utf-8', 'surrogatepass')
@@ -0,0 +1,501 @@
+"""Property-based round-trip checks and complexity budgets for every codec.
+
+Run with:
+    python -m text_compression fuzz --cases 200 --seed 1
+    python -m text_compression fuzz --cases 0 --budgets
+
+run_fuzz() draws inputs from GENERATORS (random text, long runs,
+all-distinct characters, huge alphabets with lone surrogates, '$' and NUL
+heavy text, periodic and Fibonacci strings, and binary data), at sizes
+from 0 up, and checks that every codec in codecs() decodes each one back
+to exactly the input. Every case runs once per backend: 'python' with the
+pure-Python loops and, when NumPy is installed, 'vectorized' with the
+NumPy loops (see vectorized.py) forced on for every input size. A failing
+input is shrunk by dropping pieces of it while it still fails, so the
+report shows a small reproduction.
+
+check_budgets() times every codec at BUDGET_SIZE (or its entry in
+BUDGET_MIN_SIZES) and at GROWTH times that on inputs with a bounded
+alphabet, and compares how much slower the larger input was with what
+the codec's complexity class in COMPLEXITY allows (times a slack factor
+for noise). A quadratic slowdown in a hot path grows four times faster
+than a linear budget and fails the check.
+"""
+
+import argparse
+import contextlib
+import math
+import random
+import string
+import sys
+import time
+
+from .benchmark import markov_text, repetitive_logs
+from .bwt import bwt_inverse, bwt_transform
+from .deflate import deflate_decode, deflate_encode
+from .huffman import huffman_decode, huffman_encode
+from .incremental import IncrementalEncoder
+from .lz77 import LEVELS, lz77_decode, lz77_encode, pack_tokens, unpack_tokens
+from .mtf import mtf_decode, mtf_encode, zero_run_decode, zero_run_encode
+from .parallel import parallel_compress, parallel_decompress
+from .pipeline import PIPELINES, build_pipeline
+from .range_coder import range_decode, range_encode
+from .rle import rle_decode, rle_encode
+from .shannon_fano import shannon_fano_decode, shannon_fano_encode
+from .stream import Compressor, Decompressor
+from .symbols import is_binary
+from .tokens import token_decode, token_encode
+from .trained import decode_message, encode_message, train
+from . import vectorized
+
+# Input sizes drawn by run_fuzz, small ones (and their edge cases) more often;
+# the largest pass vectorized.MIN_VECTOR_SIZE, where NumPy takes over by default
+SIZES = (0, 1, 2, 3, 4, 7, 16, 64, 127, 128, 129, 255, 256, 257, 1000, 4095, 4096, 4097, 8192, 16384)
+
+DEFAULT_CASES = 100
+DEFAULT_MAX_SIZE = 16384
+
+BACKENDS = ('python', 'vectorized')
+
+# Attempts at shrinking one failing input
+SHRINK_ATTEMPTS = 300
+
+# Budget check: base size, growth factor, timing repeats and noise slack
+BUDGET_SIZE = 4096
+GROWTH = 4
+BUDGET_REPEATS = 3
+DEFAULT_SLACK = 2.0
+
+# Smallest base size for codecs whose cost only settles on larger inputs
+BUDGET_MIN_SIZES = {'lz77-max': 64 * 1024}
+
+# Characters up to the top of Unicode, without the surrogates
+_SURROGATES = range(0xD800, 0xE000)
+
+
+def _char(code):
+    return chr(code + len(_SURROGATES) if code >= _SURROGATES.start else code)
+
+
+_MAX_CHAR = 0x110000 - len(_SURROGATES)
+
+
+def random_chars(rng, size):
+    return ''.join(rng.choices(string.printable, k=size))
+
+
+def long_runs(rng, size):
+    pieces = []
+    total = 0
+    while total < size:
+        run = min(size - total, rng.choice((1, 2, 3, 127, 128, 129, 300, rng.randint(1, size))))
+        pieces.append(rng.choice('ab$\x00') * run)
+        total += run
+    return ''.join(pieces)
+
+
+def single_char(rng, size):
+    return rng.choice('a$\x00') * size
+
+
+def all_distinct(rng, size):
+    start = rng.randrange(_MAX_CHAR - size) if size < _MAX_CHAR else 0
+    chars = [_char(start + i) for i in range(size)]
+    rng.shuffle(chars)
+    return ''.join(chars)
+
+
+def huge_alphabet(rng, size):
+    # Some lone surrogates too: str holds them, and UTF-8 needs 'surrogatepass' for them
+    return ''.join(chr(rng.randrange(_SURROGATES.start, _SURROGATES.stop)) if rng.random() < 0.05
+                   else _char(rng.randrange(_MAX_CHAR)) for _ in range(size))
+
+
+def sentinel_heavy(rng, size):
+    return ''.join(rng.choices('$$\x00ab', k=size))
+
+
+def periodic(rng, size):
+    period = ''.join(rng.choices('abc$', k=rng.randint(1, 12)))
+    return (period * (size // len(period) + 1))[:size]
+
+
+def fibonacci(rng, size):
+    # Highly repetitive without being periodic; a classic worst case for suffix sorting
+    a, b = 'a', 'ab'
+    while len(b) < size:
+        a, b = b, b + a
+    return b[:size]
+
+
+def words(rng, size):
+    return markov_text(size, rng.randrange(1 << 30))
+
+
+def logs(rng, size):
+    return repetitive_logs(size, rng.randrange(1 << 30))
+
+
+def random_bytes(rng, size):
+    return rng.randbytes(size)
+
+
+def binary_runs(rng, size):
+    return long_runs(rng, size).encode('latin-1')
+
+
+def binary_periodic(rng, size):
+    period = rng.randbytes(rng.randint(1, 12))
+    return (period * (size // len(period) + 1))[:size]
+
+
+GENERATORS = {
+    'random-text': random_chars,
+    'long-runs': long_runs,
+    'single-char': single_char,
+    'all-distinct': all_distinct,
+    'huge-alphabet': huge_alphabet,
+    'sentinel': sentinel_heavy,
+    'periodic': periodic,
+    'fibonacci': fibonacci,
+    'words': words,
+    'logs': logs,
+    'binary': random_bytes,
+    'binary-runs': binary_runs,
+    'binary-periodic': binary_periodic,
+}
+
+# Generators whose alphabet does not grow with the input, used for the budgets;
+# coders like MTF cost time in proportion to the alphabet as well
+BUDGET_GENERATORS = ('random-text', 'long-runs', 'single-char', 'periodic', 'fibonacci', 'logs', 'binary')
+
+
+# Codecs
+def _lz77(**options):
+    return (lambda s: (lz77_encode(s, **options), is_binary(s)),
+            lambda encoded: lz77_decode(encoded[0], binary=encoded[1]))
+
+
+def _packed_lz77(s):
+    binary = is_binary(s)
+    return pack_tokens(lz77_encode(s), binary), binary
+
+
+def _zero_run(s):
+    ranks, alphabet = mtf_encode(s)
+    return zero_run_encode(ranks), alphabet, is_binary(s)
+
+
+def _zero_run_inverse(encoded):
+    runs, alphabet, binary = encoded
+    return mtf_decode(zero_run_decode(runs, binary), alphabet)
+
+
+def _incremental(s):
+    encoder = IncrementalEncoder()
+    tokens = []
+    for start in range(0, len(s), 100):
+        tokens += encoder.feed(s[start:start + 100])
+    return tokens + encoder.flush()
+
+
+def _stream(s):
+    compressor = Compressor('lz77-huffman', block_size=1000, binary=is_binary(s))
+    return b''.join([compressor.feed(s[start:start + 700]) for start in range(0, len(s), 700)]
+                    + [compressor.flush()])
+
+
+def _stream_inverse(data):
+    decompressor = Decompressor()
+    pieces = [decompressor.feed(data[start:start + 333]) for start in range(0, len(data), 333)]
+    if not decompressor.eof:
+        raise ValueError("Stream did not reach its end marker.")
+    return (b'' if decompressor.binary else '').join(pieces)
+
+
+def _trained(s):
+    table = train([s[:len(s) // 2] or s], 'huffman')
+    return encode_message(s, table), table
+
+
+TEXT = 'text'
+BYTES = 'bytes'
+BOTH = 'both'
+
+
+def codecs():
+    """Return {name: (encode, decode, kinds of input)} for every codec and pipeline."""
+    table = {
+        'bwt': (bwt_transform, lambda encoded: bwt_inverse(*encoded), BOTH),
+        'bwt-no-sentinel': (lambda s: bwt_transform(s, None), lambda encoded: bwt_inverse(*encoded, None), TEXT),
+        'mtf': (mtf_encode, lambda encoded: mtf_decode(*encoded), BOTH),
+        'mtf-zero-run': (_zero_run, _zero_run_inverse, BOTH),
+        'rle': (rle_encode, rle_decode, BYTES),
+        'lz77-fast': _lz77(level='fast') + (BOTH,),
+        'lz77': _lz77() + (BOTH,),
+        'lz77-max': _lz77(level='max') + (BOTH,),
+        'lz77-binary-tree': _lz77(match_finder='binary_tree') + (BOTH,),
+        'lz77-small-window': _lz77(window_size=32 * 1024, max_match=3) + (BOTH,),
+        'lz77-packed': (_packed_lz77, lambda encoded: lz77_decode(unpack_tokens(*encoded), encoded[1]), BOTH),
+        'lz77-incremental': (_incremental, lambda tokens: lz77_decode(tokens, binary=True), BYTES),
+        'deflate': (deflate_encode, deflate_decode, BOTH),
+        'huffman': (lambda s: huffman_encode(s)[0], huffman_decode, BOTH),
+        'huffman-tree': (lambda s: huffman_encode(s, canonical=False)[0], huffman_decode, BOTH),
+        'shannon-fano': (lambda s: shannon_fano_encode(s)[0], shannon_fano_decode, BOTH),
+        'range': (range_encode, range_decode, BOTH),
+        'range-order1': (lambda s: range_encode(s, order=1), range_decode, BOTH),
+        'word-tokens': (lambda s: token_encode(s, 'huffman', 'word'), token_decode, BOTH),
+        'bpe-tokens': (lambda s: token_encode(s, 'shannon-fano', 'bpe', 256), token_decode, BOTH),
+        'stream': (_stream, _stream_inverse, BOTH),
+        'archive': (lambda s: parallel_compress(s, 'huffman', 1000, workers=1),
+                    lambda data: parallel_decompress(data, workers=1), BOTH),
+        'trained-huffman': (_trained, lambda encoded: decode_message(*encoded), BOTH),
+    }
+    for name in PIPELINES:
+        pipeline = build_pipeline(name)
+        table[f'pipeline-{name}'] = (pipeline.encode, pipeline.decode, BOTH)
+    return table
+
+
+# Complexity class of each codec on bounded alphabets; anything not listed is 'n'.
+# 'n chain' is a hash-chain match finder: each search walks at most
+# chain_depth earlier positions, so the cost is linear once the chains are
+# full. Until then the walks lengthen as the input grows; at the max level
+# (256 links) they settle on logs only past 64 KB, so lz77-max is timed from
+# BUDGET_MIN_SIZES up, where a quadratic finder would grow 16 times.
+COMPLEXITY = {
+    'lz77-max': 'n chain',
+    'bwt': 'n log n',
+    'bwt-no-sentinel': 'n log n',
+    'pipeline-bwt': 'n log n',
+    'pipeline-bwt-shannon-fano': 'n log n',
+    'pipeline-bwt-range': 'n log n',
+    'pipeline-auto': 'n log n',
+    'bpe-tokens': 'n log n',
+}
+
+_GROWTH_FUNCTIONS = {
+    'n': lambda n: n,
+    'n log n': lambda n: n * math.log2(n),
+    'n chain': lambda n: n * min(n, LEVELS['max']['chain_depth']),
+}
+
+
+def available_backends():
+    """Return the backends run_fuzz can use here."""
+    return BACKENDS if vectorized.HAVE_NUMPY else BACKENDS[:1]
+
+
+@contextlib.contextmanager
+def backend(name):
+    """Run the codecs inside the block with the 'python' loops or the 'vectorized' ones at every size."""
+    if name not in available_backends():
+        raise ValueError(f"Unknown or unavailable backend {name!r}; expected one of {available_backends()}.")
+    saved = vectorized._DISABLED, vectorized.MIN_VECTOR_SIZE
+    vectorized._DISABLED = name == 'python'
+    if name == 'vectorized':
+        vectorized.MIN_VECTOR_SIZE = 1
+    try:
+        yield
+    finally:
+        vectorized._DISABLED, vectorized.MIN_VECTOR_SIZE = saved
+
+
+def _accepts(kinds, data):
+    return kinds == BOTH or (kinds == BYTES) == is_binary(data)
+
+
+def round_trip_error(codec, data):
+    """Return why codec (encode, decode, kinds) fails to round-trip data, or None when it does."""
+    encode, decode, _ = codec
+    try:
+        decoded = decode(encode(data))
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    if type(decoded) is not type(data):
+        return f"decoded to {type(decoded).__name__}, expected {type(data).__name__}"
+    if decoded != data:
+        for i, (a, b) in enumerate(zip(decoded, data)):
+            if a != b:
+                break
+        else:
+            i = min(len(decoded), len(data))
+        return f"decoded {len(decoded)} symbols for {len(data)}, first difference at {i}"
+    return None
+
+
+def shrink(codec, data, attempts=SHRINK_ATTEMPTS):
+    """Return a smaller input on which codec still fails, by dropping ever smaller pieces of data."""
+    piece = len(data) // 2
+    while piece and attempts:
+        start = 0
+        while start < len(data) and attempts:
+            candidate = data[:start] + data[start + piece:]
+            attempts -= 1
+            if round_trip_error(codec, candidate) is not None:
+                data = candidate
+            else:
+                start += piece
+        piece //= 2
+    return data
+
+
+def run_fuzz(cases=DEFAULT_CASES, seed=0, max_size=DEFAULT_MAX_SIZE, names=None, progress=None, backends=None):
+    """Check round trips on cases random inputs; return a list of failure dicts.
+
+    Every case picks a generator and a size and runs every codec (or those
+    named) that takes that kind of input, on each of backends (by default
+    every available one). A codec is reported once per generator and
+    backend, with its input shrunk.
+    """
+    rng = random.Random(seed)
+    table = codecs()
+    if names is not None:
+        table = {name: table[name] for name in names}
+    backends = available_backends() if backends is None else backends
+    sizes = [size for size in SIZES if size <= max_size] or [max_size]
+    failures = []
+    failing = set()
+    for case in range(cases):
+        generator = rng.choice(sorted(GENERATORS))
+        size = rng.choice(sizes)
+        case_seed = rng.randrange(1 << 30)
+        data = GENERATORS[generator](random.Random(case_seed), size)
+        for backend_name in backends:
+            with backend(backend_name):
+                for name, codec in table.items():
+                    if (name, generator, backend_name) in failing or not _accepts(codec[2], data):
+                        continue
+                    start = time.perf_counter()
+                    error = round_trip_error(codec, data)
+                    seconds = time.perf_counter() - start
+                    if error is not None:
+                        failing.add((name, generator, backend_name))
+                        small = shrink(codec, data)
+                        failures.append({'codec': name, 'generator': generator, 'backend': backend_name,
+                                         'size': size, 'seed': case_seed,
+                                         'error': round_trip_error(codec, small) or error, 'input': small})
+                    if progress:
+                        progress({'case': case, 'codec': name, 'generator': generator, 'backend': backend_name,
+                                  'size': size, 'seconds': seconds, 'ok': error is None})
+    return failures
+
+
+def _best_time(function, argument, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_budgets(names=None, size=BUDGET_SIZE, growth=GROWTH, slack=DEFAULT_SLACK, seed=0,
+                  repeats=BUDGET_REPEATS, progress=None):
+    """Time every codec at size and growth * size; return a result dict per (codec, generator).
+
+    Codecs in BUDGET_MIN_SIZES start from at least that size. A result is
+    ok when the time grew by at most slack times what the codec's
+    complexity class predicts.
+    """
+    table = codecs()
+    if names is not None:
+        table = {name: table[name] for name in names}
+    results = []
+    for generator in BUDGET_GENERATORS:
+        inputs = {}
+        for name, (encode, decode, kinds) in table.items():
+            base = max(size, BUDGET_MIN_SIZES.get(name, 0))
+            for n in (base, base * growth):
+                if n not in inputs:
+                    inputs[n] = GENERATORS[generator](random.Random(seed), n)
+            small, large = inputs[base], inputs[base * growth]
+            if not _accepts(kinds, small):
+                continue
+            complexity = COMPLEXITY.get(name, 'n')
+            function = _GROWTH_FUNCTIONS[complexity]
+            allowed = slack * function(base * growth) / function(base)
+            times = [_best_time(lambda data: decode(encode(data)), data, repeats) for data in (small, large)]
+            ratio = times[1] / times[0] if times[0] else 0.0
+            result = {'codec': name, 'generator': generator, 'complexity': complexity,
+                      'sizes': (base, base * growth), 'seconds': times, 'ratio': ratio, 'allowed': allowed,
+                      'ok': ratio <= allowed}
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def format_failure(failure):
+    shown = repr(failure['input'])
+    if len(shown) > 200:
+        shown = shown[:200] + '...'
+    return (f"FAIL {failure['codec']} on {failure['generator']} ({failure['backend']} backend, "
+            f"size {failure['size']}, seed {failure['seed']}): {failure['error']}\n"
+            f"     smallest failing input ({len(failure['input'])} symbols): {shown}")
+
+
+def format_budget(result):
+    verdict = 'ok' if result['ok'] else 'OVER BUDGET'
+    return (f"{result['codec']:<30} {result['generator']:<12} {result['complexity']:<8} "
+            f"{result['seconds'][0] * 1000:9.2f} {result['seconds'][1] * 1000:9.2f} "
+            f"{result['ratio']:6.2f} {result['allowed']:6.2f}  {verdict}")
+
+
+def build_parser(parser=None):
+    """Add fuzzing options to parser (a new ArgumentParser by default)."""
+    parser = parser or argparse.ArgumentParser(prog='python -m text_compression fuzz',
+                                               description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', type=int, default=DEFAULT_CASES, help="random inputs to check")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE, help="largest fuzzed input")
+    parser.add_argument('--codecs', default=None, help="comma-separated codecs (default: all)")
+    parser.add_argument('--backend', choices=BACKENDS + ('all',), default='all',
+                        help="loops to fuzz: pure Python, NumPy at every size, or all available")
+    parser.add_argument('--budgets', action='store_true', help="also check the complexity budgets")
+    parser.add_argument('--budget-size', type=int, default=BUDGET_SIZE)
+    parser.add_argument('--slack', type=float, default=DEFAULT_SLACK,
+                        help="allowed factor over the predicted slowdown")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every check")
+    return parser
+
+
+def run(args):
+    """Run the checks described by parsed args; return the process exit code."""
+    names = args.codecs.split(',') if args.codecs else None
+    unknown = sorted(set(names or ()) - set(codecs()))
+    if unknown:
+        print(f"unknown codecs: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    progress = None
+    if args.verbose:
+        progress = lambda check: print(f"case {check['case']:>4} {check['codec']:<30} {check['generator']:<16} "
+                                       f"{check['backend']:<10} "
+                                       f"{check['size']:>6} {check['seconds'] * 1000:9.2f} ms"
+                                       f"{'' if check['ok'] else '  FAILED'}", flush=True)
+    backends = None if args.backend == 'all' else (args.backend,)
+    if backends and args.backend not in available_backends():
+        print(f"backend {args.backend} needs NumPy", file=sys.stderr)
+        return 2
+    failures = run_fuzz(args.cases, args.seed, args.max_size, names, progress, backends)
+    for failure in failures:
+        print(format_failure(failure))
+    print(f"{args.cases} cases on {', '.join(backends or available_backends())}, "
+          f"{len(failures)} failing codec/generator/backend combinations")
+    over = []
+    if args.budgets:
+        print(f"{'codec':<30} {'generator':<12} {'class':<8} {'small ms':>9} {'large ms':>9} {'ratio':>6} "
+              f"{'limit':>6}")
+        results = check_budgets(names, args.budget_size, slack=args.slack, seed=args.seed,
+                                progress=lambda result: print(format_budget(result), flush=True))
+        over = [result for result in results if not result['ok']]
+        print(f"{len(results)} budget checks, {len(over)} over budget")
+    return 1 if failures or over else 0
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""Huffman coding."""
+
+from collections import Counter
+from operator import itemgetter
+
+from .container import (FLAG_BINARY, METHOD_CANONICAL_HUFFMAN, METHOD_HUFFMAN, decode_code_table,
+                        decode_length_table, decode_prefix_bits, encode_code_table, encode_length_table,
+                        pack_codes, read_container, unpack_bits, write_container)
+from . import vectorized
+from .profiling import stage, traced
+from .symbols import byte_view, is_binary, join_symbols
+
+# Longest code allowed in canonical mode, as in DEFLATE
+MAX_CODE_LENGTH = 15
+
+# Bits resolved by one lookup in the primary decoding table
+ROOT_TABLE_BITS = 11
+
+
+# Huffman Coding
+class HuffmanNode:
+    """Class to represent a node in the Huffman tree."""
+
+    __slots__ = ('char', 'freq', 'left', 'right')
+
+    def __init__(self, char, freq):
+        self.char = char
+        self.freq = freq
+        self.left = None
+        self.right = None
+
+    def __lt__(self, other):
+        return self.freq < other.freq
+
+
+def _sorted_symbols(freq_map):
+    # Ties in frequency go by symbol, so the same counts always give the same tree
+    return sorted(freq_map, key=lambda char: (freq_map[char], char))
+
+
+def _two_queue_merge(weights, count):
+    """Merge count leaves, sorted by weight, into a Huffman tree in O(count).
+
+    weights holds the leaf weights followed by room for the count - 1
+    internal nodes, which are created in order of increasing weight, so
+    the two lightest nodes are always at the front of the leaves or of the
+    internal nodes; a tie takes the leaf. Returns (left, right) child
+    lists indexed by internal node number - count.
+    """
+    lefts = []
+    rights = []
+    leaf = 0
+    internal = count
+    for node in range(count, 2 * count - 1):
+        children = []
+        for _ in range(2):
+            if leaf < count and (internal == node or weights[leaf] <= weights[internal]):
+                children.append(leaf)
+                leaf += 1
+            else:
+                children.append(internal)
+                internal += 1
+        weights[node] = weights[children[0]] + weights[children[1]]
+        lefts.append(children[0])
+        rights.append(children[1])
+    return lefts, rights
+
+
+def build_huffman_tree(freq_map):
+    """Build the Huffman tree from the frequency map (None when it is empty)."""
+    symbols = _sorted_symbols(freq_map)
+    nodes = [HuffmanNode(char, freq_map[char]) for char in symbols]
+    if not nodes:
+        return None
+    count = len(nodes)
+    weights = [node.freq for node in nodes] + [0] * (count - 1)
+    for left, right in zip(*_two_queue_merge(weights, count)):
+        merged = HuffmanNode(None, nodes[left].freq + nodes[right].freq)
+        merged.left = nodes[left]
+        merged.right = nodes[right]
+        nodes.append(merged)
+    return nodes[-1]
+
+
+def build_huffman_codes(node, prefix="", code_map=None):
+    """Build Huffman codes by traversing the Huffman tree."""
+    if code_map is None:
+        code_map = {}
+    if node is None:
+        return code_map
+    # Codes are carried as (value, length) and formatted once per leaf
+    stack = [(node, int(prefix, 2) if prefix else 0, len(prefix))]
+    while stack:
+        node, code, length = stack.pop()
+        if node.char is not None:
+            # A lone symbol still needs one bit per occurrence
+            code_map[node.char] = format(code, f'0{length}b') if length else "0"
+            continue
+        if node.right is not None:
+            stack.append((node.right, code << 1 | 1, length + 1))
+        if node.left is not None:
+            stack.append((node.left, code << 1, length + 1))
+    return code_map
+
+
+def huffman_tree_lengths(freq_map):
+    """Return unlimited Huffman code lengths, using flat arrays instead of tree nodes.
+
+    Suited to large alphabets (word lists, all of Unicode): after sorting,
+    the build and the depth pass are both linear.
+    """
+    symbols = _sorted_symbols(freq_map)
+    count = len(symbols)
+    if count < 2:
+        return {char: 1 for char in symbols}
+    weights = [freq_map[char] for char in symbols] + [0] * (count - 1)
+    lefts, rights = _two_queue_merge(weights, count)
+    # Children are created before their parents, so walking back from the root sets every depth
+    depth = [0] * (2 * count - 1)
+    for node in range(2 * count - 2, count - 1, -1):
+        child_depth = depth[node] + 1
+        depth[lefts[node - count]] = child_depth
+        depth[rights[node - count]] = child_depth
+    return {char: depth[index] for index, char in enumerate(symbols)}
+
+
+def package_merge_lengths(freq_map, max_bits):
+    """Return optimal code lengths no longer than max_bits (package-merge)."""
+    symbols = sorted(freq_map, key=freq_map.__getitem__)
+    n = len(symbols)
+    if n > 1 << max_bits:
+        raise ValueError(f"{n} symbols cannot be coded in {max_bits} bits.")
+    # Leaves are symbol indices; packages are (item, item) pairs
+    leaves = [(freq_map[symbol], index) for index, symbol in enumerate(symbols)]
+    current = leaves
+    for _ in range(max_bits - 1):
+        packages = [(current[k][0] + current[k + 1][0], (current[k][1], current[k + 1][1]))
+                    for k in range(0, len(current) - 1, 2)]
+        current = sorted(leaves + packages, key=itemgetter(0))
+
+    # Each time a leaf appears in the chosen 2n - 2 items its code grows by one bit
+    counts = [0] * n
+    stack = [item for _, item in current[:2 * n - 2]]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, int):
+            counts[item] += 1
+        else:
+            stack.extend(item)
+    return {symbol: counts[index] for index, symbol in enumerate(symbols)}
+
+
+def huffman_code_lengths(freq_map, max_bits=MAX_CODE_LENGTH):
+    """Return Huffman code lengths, limited to max_bits when the tree is deeper.
+
+    Alphabets of more than 2 ** max_bits symbols get the shortest limit that
+    fits them instead.
+    """
+    max_bits = max(max_bits, (len(freq_map) - 1).bit_length())
+    lengths = huffman_tree_lengths(freq_map)
+    if lengths and max(lengths.values()) > max_bits:
+        lengths = package_merge_lengths(freq_map, max_bits)
+    return lengths
+
+
+def canonical_codes(lengths):
+    """Assign canonical codes: consecutive values in (length, symbol) order."""
+    codes = {}
+    code = 0
+    previous_length = 0
+    for symbol in sorted(lengths, key=lambda x: (lengths[x], x)):
+        length = lengths[symbol]
+        code <<= length - previous_length
+        codes[symbol] = format(code, f'0{length}b')
+        code += 1
+        previous_length = length
+    return codes
+
+
+class CanonicalDecoder:
+    """Table-driven decoder for canonical Huffman codes.
+
+    The primary table is indexed by the next ROOT_TABLE_BITS bits and holds
+    every complete code that fits in them, so one lookup usually yields
+    several symbols. Codes longer than the root are resolved through a
+    second-level table per root prefix.
+    """
+
+    def __init__(self, lengths, root_bits=ROOT_TABLE_BITS):
+        codes = canonical_codes(lengths)
+        self.max_length = max(lengths.values())
+        self.root_bits = root_bits
+        by_code = {(len(code), int(code, 2)): symbol for symbol, code in codes.items()}
+
+        # Primary table: symbols decoded and bits consumed per root index
+        self.symbols = []
+        self.consumed = []
+        for index in range(1 << root_bits):
+            decoded = []
+            used = 0
+            while True:
+                for length in range(1, min(self.max_length, root_bits - used) + 1):
+                    value = (index >> (root_bits - used - length)) & ((1 << length) - 1)
+                    symbol = by_code.get((length, value))
+                    if symbol is not None:
+                        decoded.append(symbol)
+                        used += length
+                        break
+                else:
+                    break
+            self.symbols.append(tuple(decoded))
+            self.consumed.append(used)
+
+        # Second-level tables for codes longer than the root
+        self.sub_bits = max(self.max_length - root_bits, 0)
+        self.subtables = {}
+        for symbol, code in codes.items():
+            length = len(code)
+            if length <= root_bits:
+                continue
+            value = int(code, 2)
+            table = self.subtables.setdefault(value >> (length - root_bits), [None] * (1 << self.sub_bits))
+            low = (value & ((1 << (length - root_bits)) - 1)) << (self.max_length - length)
+            for k in range(low, low + (1 << (self.max_length - length))):
+                table[k] = (symbol, length)
+
+    def decode(self, payload, count):
+        """Decode count symbols from the packed payload bytes."""
+        root_bits = self.root_bits
+        root_mask = (1 << root_bits) - 1
+        sub_bits = self.sub_bits
+        symbols = self.symbols
+        consumed = self.consumed
+        subtables = self.subtables
+        decoded = []
+        extend = decoded.extend
+        buffer = 0
+        bits = 0
+        pos = 0
+        size = len(payload)
+        while len(decoded) < count:
+            if bits < 32 and pos < size:
+                chunk = payload[pos:pos + 8]
+                buffer = (buffer << (8 * len(chunk))) | int.from_bytes(chunk, 'big')
+                bits += 8 * len(chunk)
+                pos += len(chunk)
+            if bits <= 0:
+                raise ValueError("Payload ended before all symbols were decoded.")
+            # Past the end of the payload the missing bits read as zero
+            if bits >= root_bits:
+                index = (buffer >> (bits - root_bits)) & root_mask
+            else:
+                index = (buffer << (root_bits - bits)) & root_mask
+            used = consumed[index]
+            if used:
+                extend(symbols[index])
+            else:
+                table = subtables.get(index)
+                shift = bits - root_bits - sub_bits
+                low = (buffer >> shift if shift >= 0 else buffer << -shift) & ((1 << sub_bits) - 1)
+                entry = table[low] if table else None
+                if entry is None:
+                    raise ValueError("Invalid code in payload.")
+                decoded.append(entry[0])
+                used = entry[1]
+            bits -= used
+            buffer &= (1 << max(bits, 0)) - 1
+        # Symbols decoded from the zero padding are dropped
+        del decoded[count:]
+        return decoded
+
+
+@traced('huffman.encode')
+def huffman_encode(s, canonical=True, max_bits=MAX_CODE_LENGTH):
+    """Encode the input string (or bytes-like object) using Huffman coding.
+
+    In canonical mode (the default) codes are limited to max_bits (or the
+    fewest bits that fit a larger alphabet) and only their lengths are
+    stored. Returns the packed container bytes, the code map and the
+    frequency map; for bytes-like input their keys are ints.
+    """
+    flags = FLAG_BINARY if is_binary(s) else 0
+    if flags:
+        s = byte_view(s)
+    with stage('huffman.count', s) as span:
+        freq_map = vectorized.symbol_counts(s) if vectorized.enabled(len(s)) else Counter(s)
+        span.done(symbols=len(freq_map))
+    with stage('huffman.codes') as span:
+        if not s:
+            huffman_codes = {}
+        elif canonical:
+            huffman_codes = canonical_codes(huffman_code_lengths(freq_map, max_bits))
+        else:
+            huffman_codes = build_huffman_codes(build_huffman_tree(freq_map))
+        span.done(symbols=len(huffman_codes))
+    with stage('huffman.pack', s) as span:
+        payload, padding = pack_codes(s, huffman_codes)
+        span.done(payload, len(s))
+    if canonical:
+        method = METHOD_CANONICAL_HUFFMAN
+        table = encode_length_table({char: len(code) for char, code in huffman_codes.items()})
+    else:
+        method, table = METHOD_HUFFMAN, encode_code_table(huffman_codes)
+    encoded_output = write_container(method, len(s), table, payload, padding, flags)
+    return encoded_output, huffman_codes, freq_map
+
+
+@traced('huffman.decode')
+def huffman_decode(data):
+    """Decode a container produced by huffman_encode back to the original string or bytes."""
+    method, flags, count, table, payload, padding = read_container(data, METHOD_HUFFMAN,
+                                                                   METHOD_CANONICAL_HUFFMAN)
+    binary = bool(flags & FLAG_BINARY)
+    if method == METHOD_HUFFMAN:
+        decoded = decode_prefix_bits(unpack_bits(payload, padding), decode_code_table(table, binary), count)
+        return join_symbols(decoded, binary)
+    lengths = decode_length_table(table, binary)
+    if not lengths:
+        return join_symbols([], binary)
+    # Keep the lookup table no larger than the payload warrants
+    root_bits = min(ROOT_TABLE_BITS, max(max(lengths.values()), len(payload).bit_length()))
+    return join_symbols(CanonicalDecoder(lengths, root_bits).decode(payload, count), binary)
@@ -0,0 +1,170 @@
+"""Incremental LZ77 compression of append-only byte streams such as growing logs.
+
+IncrementalEncoder keeps the last window of input and its hash chains
+between calls, so compressing appended data costs time in proportion to
+the new bytes rather than the whole file, and the new tokens can still
+refer back into everything the window holds. Tokens from successive calls
+concatenate: lz77_decode(all tokens, binary=True) (or pack_tokens and
+unpack_tokens on the concatenated packed bytes) restores the stream.
+
+The encoder state can be saved with checkpoint() and loaded with
+restore() so that a log shipper can resume after a restart. Checkpoint
+layout:
+    magic (4 bytes) | window size, max match, chain depth, nice length,
+    lazy, window start, next position (varints) | window length (varint)
+    | window bytes | CRC-32 of everything before it (4, big-endian)
+The hash chains are rebuilt from the window bytes on restore.
+"""
+
+import zlib
+
+from .container import read_varint, write_varint
+from .lz77 import MIN_MATCH, HashChainMatchFinder, _resolve_settings
+from .symbols import byte_view, is_binary
+
+CHECKPOINT_MAGIC = b'TCL1'
+
+
+class _WindowMatchFinder(HashChainMatchFinder):
+    """HashChainMatchFinder over the encoder's bytearray window, whose slices cannot be dict keys."""
+
+    def _key(self, i):
+        s = self.s
+        r = i - self.base
+        return s[r] << 16 | s[r + 1] << 8 | s[r + 2]
+
+
+class IncrementalEncoder:
+    """Stateful LZ77 encoder: feed() appended bytes, flush() at sync points, checkpoint() to disk.
+
+    feed() holds back the last max_match bytes so matches can run into
+    data that has not arrived yet; flush() encodes them too, after which
+    the encoder can still be fed. The settings are those of lz77_encode,
+    with the hash-chain match finder.
+    """
+
+    def __init__(self, level='normal', window_size=None, max_match=None, chain_depth=None, lazy=None):
+        settings = _resolve_settings(level, {
+            'window_size': window_size, 'max_match': max_match, 'chain_depth': chain_depth, 'lazy': lazy,
+        })
+        self.window_size = settings['window_size']
+        self.max_match = settings['max_match']
+        self.chain_depth = settings['chain_depth']
+        self.nice_length = min(settings['nice_length'], self.max_match)
+        self.lazy = settings['lazy']
+        self._reset(0, 0, b'')
+
+    def _reset(self, base, pos, window):
+        # Absolute stream offset of window[0], and of the next byte to encode
+        self.base = base
+        self.pos = pos
+        self.window = bytearray(window)
+        # The finder shares the window, so bytes appended to it are seen as they arrive
+        self.finder = _WindowMatchFinder(self.window, self.window_size, self.max_match, self.chain_depth,
+                                         self.nice_length, base, chain_size=self.window_size)
+        self._pending = None
+
+    @property
+    def total_in(self):
+        """Bytes fed so far."""
+        return self.base + len(self.window)
+
+    def _encode(self, end):
+        """Emit tokens for the positions before end; a match may run past it."""
+        tokens = []
+        window = self.window
+        base = self.base
+        total = self.total_in
+        i = self.pos
+        while i < end:
+            length, offset = self._pending if self._pending else self.finder.find(i)
+            self._pending = None
+            if length < MIN_MATCH:
+                length = offset = 0
+            elif self.lazy and length < self.nice_length and i + 1 < total:
+                # Lazy matching: emit a literal if the next position matches longer
+                next_match = self.finder.find(i + 1)
+                if next_match[0] > length:
+                    tokens.append((0, 0, window[i - base]))
+                    i += 1
+                    self._pending = next_match
+                    continue
+            stop = i + length
+            if stop < total:
+                tokens.append((offset, length, window[stop - base]))
+                i = stop + 1
+            else:
+                # The match reaches the end of the input so far; the next byte starts the next token
+                tokens.append((offset, length, None))
+                i = stop
+        self.pos = max(i, self.pos)
+        if self._pending is not None and self.pos != end:
+            self._pending = None
+        self._trim()
+        return tokens
+
+    def _trim(self):
+        # Drop history older than the window once it adds up to another window
+        excess = min(self.pos, self.finder.pos) - self.window_size - self.base
+        if excess >= self.window_size:
+            del self.window[:excess]
+            self.base += excess
+            self.finder.base = self.base
+
+    def feed(self, data):
+        """Append bytes-like data and return the tokens for the input that is now final."""
+        if not is_binary(data):
+            raise TypeError(f"IncrementalEncoder takes bytes-like data, not {type(data).__name__}.")
+        self.window += byte_view(data)
+        self.finder.n = self.total_in
+        # Keep room for the longest match and its next byte
+        return self._encode(self.total_in - self.max_match - 1)
+
+    def flush(self):
+        """Return the tokens for all remaining input; the encoder can still be fed afterwards."""
+        return self._encode(self.total_in)
+
+    def to_bytes(self):
+        """Serialize the encoder state (see the module docstring)."""
+        out = bytearray(CHECKPOINT_MAGIC)
+        for value in (self.window_size, self.max_match, self.chain_depth, self.nice_length, int(self.lazy),
+                      self.base, self.pos):
+            write_varint(out, value)
+        write_varint(out, len(self.window))
+        out += self.window
+        out += zlib.crc32(out).to_bytes(4, 'big')
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild an encoder from to_bytes output."""
+        data = bytes(data)
+        if len(data) < len(CHECKPOINT_MAGIC) + 4 or not data.startswith(CHECKPOINT_MAGIC):
+            raise ValueError("Not an encoder checkpoint (bad magic number).")
+        if zlib.crc32(data[:-4]) != int.from_bytes(data[-4:], 'big'):
+            raise ValueError("CRC mismatch: the checkpoint is corrupted.")
+        pos = len(CHECKPOINT_MAGIC)
+        values = []
+        for _ in range(8):
+            value, pos = read_varint(data, pos)
+            values.append(value)
+        window_size, max_match, chain_depth, nice_length, lazy, base, position, length = values
+        if pos + length != len(data) - 4 or not base <= position <= base + length:
+            raise ValueError("Checkpoint window does not match its positions.")
+        encoder = cls(window_size=window_size, max_match=max_match, chain_depth=chain_depth, lazy=bool(lazy))
+        encoder.nice_length = nice_length
+        encoder._reset(base, position, data[pos:pos + length])
+        # Positions before the next one to encode were in the hash chains when saved
+        encoder.finder.skip_to(position)
+        return encoder
+
+    def checkpoint(self, path):
+        """Write the encoder state to path."""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def restore(cls, path):
+        """Load an encoder saved with checkpoint()."""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,353 @@
+"""LZ77 compression with hash-chain and binary-tree match finders."""
+
+from array import array
+
+from .container import read_varint, write_varint
+from .profiling import traced
+from .symbols import is_binary
+
+# Shortest match worth a back-reference; also the hash key length
+MIN_MATCH = 3
+
+# Positions inside a match still added to a binary tree before skipping the rest
+TREE_SKIP_INSERTS = 4
+
+MIN_WINDOW_SIZE = 32 * 1024
+MAX_WINDOW_SIZE = 16 * 1024 * 1024
+
+# Speed/ratio presets selectable by name
+LEVELS = {
+    'fast': {'window_size': 32 * 1024, 'max_match': 258, 'chain_depth': 4,
+             'nice_length': 16, 'lazy': False, 'match_finder': 'hash_chain'},
+    'normal': {'window_size': 256 * 1024, 'max_match': 258, 'chain_depth': 32,
+               'nice_length': 128, 'lazy': True, 'match_finder': 'hash_chain'},
+    'max': {'window_size': 4 * 1024 * 1024, 'max_match': 273, 'chain_depth': 256,
+            'nice_length': 273, 'lazy': True, 'match_finder': 'hash_chain'},
+}
+
+
+def _match_length(s, j, i, limit):
+    """Return the length of the common prefix of s[j:] and s[i:], up to limit."""
+    k = 0
+    step = 8
+    # Gallop over equal slices, then binary search the first mismatching one
+    while k < limit:
+        end = min(k + step, limit)
+        if s[j + k:j + end] != s[i + k:i + end]:
+            while end - k > 1:
+                mid = (k + end) // 2
+                if s[j + k:j + mid] == s[i + k:i + mid]:
+                    k = mid
+                else:
+                    end = mid
+            return k
+        k = end
+        step *= 2
+    return k
+
+
+class HashChainMatchFinder:
+    """Find matches by walking chains of earlier positions with the same 3-symbol prefix.
+
+    Positions are absolute: s[0] is position base and n is the end of the
+    input. A sliding window (see incremental.py) appends to s and raises n
+    as input arrives, and raises base as it drops old input. chain_size
+    is the number of chain slots, by default enough for s or the window.
+    """
+
+    def __init__(self, s, window_size, max_match, chain_depth, nice_length, base=0, chain_size=None):
+        self.s = s
+        self.base = base
+        self.n = base + len(s)
+        self.window_size = window_size
+        self.max_match = max_match
+        self.chain_depth = chain_depth
+        self.nice_length = nice_length
+        self.head = {}
+        self.prev = array('l', [-1]) * (chain_size or min(window_size, len(s) + 1))
+        # Next position to insert; positions are inserted in order once their whole key is known
+        self.pos = base
+
+    def _key(self, i):
+        r = i - self.base
+        return self.s[r:r + MIN_MATCH]
+
+    def skip_to(self, i):
+        """Insert every position up to (not including) i without searching."""
+        head = self.head
+        prev = self.prev
+        size = len(prev)
+        key = self._key
+        stop = min(i, self.n - MIN_MATCH + 1)
+        for j in range(self.pos, stop):
+            k = key(j)
+            prev[j % size] = head.get(k, -1)
+            head[k] = j
+        if stop > self.pos:
+            self.pos = stop
+
+    def fill(self, end):
+        """Insert every position before end, such as a preset dictionary."""
+        self.skip_to(end)
+
+    def find(self, i):
+        """Return (length, offset) of the longest match at i, then insert i."""
+        self.skip_to(i)
+        s = self.s
+        base = self.base
+        limit = min(self.max_match, self.n - i)
+        best_length = best_offset = 0
+        if limit >= MIN_MATCH:
+            lowest = max(i - self.window_size, base - 1)
+            j = self.head.get(self._key(i), -1)
+            depth = self.chain_depth
+            r = i - base
+            while j > lowest and depth:
+                # Cheap rejection: a longer match must agree at best_length
+                if s[j - base + best_length] == s[r + best_length]:
+                    length = _match_length(s, j - base, r, limit)
+                    if length > best_length:
+                        best_length, best_offset = length, i - j
+                        if length >= self.nice_length or length == limit:
+                            break
+                j = self.prev[j % len(self.prev)]
+                depth -= 1
+        self.skip_to(i + 1)
+        return best_length, best_offset
+
+
+class BinaryTreeMatchFinder:
+    """Find matches in per-hash binary trees of earlier positions ordered by content.
+
+    Every insertion also searches, as in the LZMA BT match finders, so the
+    tree below each hash head stays sorted and deep chains are never walked
+    linearly.
+    """
+
+    def __init__(self, s, window_size, max_match, chain_depth, nice_length):
+        self.s = s
+        self.n = len(s)
+        self.window_size = min(window_size, self.n + 1)
+        self.max_match = max_match
+        self.chain_depth = chain_depth
+        self.nice_length = nice_length
+        self.head = {}
+        # Left child of position p at 2 * (p % window), right child at the next slot
+        self.children = array('l', [-1]) * (2 * self.window_size)
+        self.pos = 0
+
+    def skip_to(self, i):
+        """Insert the first few positions up to (not including) i.
+
+        Tree insertion costs a full search, so inside long matches only the
+        first TREE_SKIP_INSERTS positions are added.
+        """
+        for j in range(self.pos, min(i, self.pos + TREE_SKIP_INSERTS)):
+            self._insert(j)
+        if i > self.pos:
+            self.pos = i
+
+    def fill(self, end):
+        """Insert every position before end, such as a preset dictionary."""
+        for j in range(self.pos, end):
+            self._insert(j)
+        self.pos = max(self.pos, end)
+
+    def find(self, i):
+        """Return (length, offset) of the longest match at i, then insert i."""
+        self.skip_to(i)
+        length, offset = self._insert(i)
+        self.pos = i + 1
+        if length >= self.nice_length:
+            # The tree only orders positions up to nice_length; extend past it directly
+            length = _match_length(self.s, i - offset, i, min(self.max_match, self.n - i))
+        return length, offset
+
+    def _insert(self, i):
+        s = self.s
+        children = self.children
+        window = self.window_size
+        limit = min(self.nice_length, self.n - i)
+        if limit < MIN_MATCH:
+            return 0, 0
+        key = s[i:i + MIN_MATCH]
+        current = self.head.get(key, -1)
+        self.head[key] = i
+
+        # Slots still waiting for the subtree of smaller / larger positions
+        smaller_slot = 2 * (i % window)
+        larger_slot = smaller_slot + 1
+        smaller_length = larger_length = 0
+        best_length = best_offset = 0
+        depth = self.chain_depth
+        while True:
+            if current < 0 or i - current >= window or not depth:
+                children[smaller_slot] = children[larger_slot] = -1
+                break
+            depth -= 1
+            node = 2 * (current % window)
+            known = min(smaller_length, larger_length)
+            length = known + _match_length(s, current + known, i + known, limit - known)
+            if length > best_length:
+                best_length, best_offset = length, i - current
+                if length == limit:
+                    # Identical up to the limit: i takes over current's subtrees
+                    children[smaller_slot] = children[node]
+                    children[larger_slot] = children[node + 1]
+                    break
+            if s[current + length] < s[i + length]:
+                children[smaller_slot] = current
+                smaller_slot = node + 1
+                current = children[smaller_slot]
+                smaller_length = length
+            else:
+                children[larger_slot] = current
+                larger_slot = node
+                current = children[larger_slot]
+                larger_length = length
+        if best_length < MIN_MATCH:
+            return 0, 0
+        return best_length, best_offset
+
+
+MATCH_FINDERS = {
+    'hash_chain': HashChainMatchFinder,
+    'binary_tree': BinaryTreeMatchFinder,
+}
+
+
+def _resolve_settings(level, overrides):
+    """Merge a named level with explicit keyword overrides and validate them."""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown LZ77 level {level!r}; expected one of {sorted(LEVELS)}.")
+    settings = dict(LEVELS[level])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    if not MIN_WINDOW_SIZE <= settings['window_size'] <= MAX_WINDOW_SIZE:
+        raise ValueError(f"Window size must be between {MIN_WINDOW_SIZE} and {MAX_WINDOW_SIZE} bytes.")
+    if settings['max_match'] < MIN_MATCH:
+        raise ValueError(f"Maximum match length must be at least {MIN_MATCH}.")
+    if settings['chain_depth'] < 1:
+        raise ValueError("Chain depth must be at least 1.")
+    if settings['match_finder'] not in MATCH_FINDERS:
+        raise ValueError(f"Unknown match finder {settings['match_finder']!r}.")
+    return settings
+
+
+# LZ77 Compression
+@traced('lz77.encode')
+def lz77_encode(s, level='normal', window_size=None, max_match=None, chain_depth=None,
+                lazy=None, match_finder=None, dictionary=None):
+    """Apply LZ77 Compression to the input string or bytes-like object.
+
+    Returns a list of (offset, length, next_char) tuples. level selects a
+    preset from LEVELS ('fast', 'normal' or 'max'); the keyword arguments
+    override individual settings of that preset. For bytes-like input
+    next_char is an int; the last token's next_char is '' (None for bytes)
+    when the input ends inside a match. A preset dictionary of the same
+    type as s acts as text seen before it, so early matches can refer
+    into it; pass the same dictionary to lz77_decode.
+    """
+    settings = _resolve_settings(level, {
+        'window_size': window_size, 'max_match': max_match, 'chain_depth': chain_depth,
+        'lazy': lazy, 'match_finder': match_finder,
+    })
+    binary = is_binary(s)
+    if binary and not isinstance(s, bytes):
+        # Hash keys are slices, which must be hashable
+        s = bytes(s)
+    start = 0
+    if dictionary:
+        if is_binary(dictionary) != binary:
+            raise ValueError("The dictionary must be bytes for bytes input and str for str input.")
+        start = len(dictionary)
+        s = (bytes(dictionary) if binary else dictionary) + s
+    end_char = None if binary else ''
+    nice_length = min(settings['nice_length'], settings['max_match'])
+    finder = MATCH_FINDERS[settings['match_finder']](
+        s, settings['window_size'], settings['max_match'], settings['chain_depth'], nice_length)
+
+    encoded = []
+    n = len(s)
+    i = start
+    finder.fill(start)
+    length, offset = finder.find(start) if n > start else (0, 0)
+    while i < n:
+        if length < MIN_MATCH:
+            length = offset = 0
+        elif settings['lazy'] and length < nice_length and i + 1 < n:
+            # Lazy matching: emit a literal if the next position matches longer
+            next_length, next_offset = finder.find(i + 1)
+            if next_length > length:
+                encoded.append((0, 0, s[i]))
+                i += 1
+                length, offset = next_length, next_offset
+                continue
+        end = i + length
+        encoded.append((offset, length, s[end] if end < n else end_char))
+        i = end + 1
+        if i < n:
+            length, offset = finder.find(i)
+    return encoded
+
+
+@traced('lz77.decode')
+def lz77_decode(encoded_data, binary=None, dictionary=None):
+    """Decode LZ77-encoded data.
+
+    Tokens from bytes-like input decode to bytes. binary is detected from
+    the tokens (or the dictionary) unless given, which is only needed for
+    an empty token list. dictionary must be the one given to lz77_encode.
+    """
+    if binary is None:
+        if encoded_data:
+            # Text tokens always carry str characters, including the final ''
+            binary = not isinstance(encoded_data[-1][2], str)
+        else:
+            binary = is_binary(dictionary)
+    preset = len(dictionary) if dictionary else 0
+    decoded = bytearray(dictionary or b'') if binary else list(dictionary or '')
+    for offset, length, char in encoded_data:
+        if length > 0:
+            start = len(decoded) - offset
+            if offset >= length:
+                decoded.extend(decoded[start:start + length])
+            else:
+                # Overlapping copy repeats the last offset symbols
+                period = decoded[start:]
+                decoded.extend((period * (length // offset + 1))[:length])
+        if binary:
+            if char is not None:
+                decoded.append(char)
+        else:
+            decoded.append(char)
+    return bytes(decoded[preset:]) if binary else ''.join(decoded[preset:])
+
+
+def pack_tokens(tokens, binary):
+    """Serialize tokens as (offset, length, next symbol + 1) varints, 0 marking no next symbol."""
+    out = bytearray()
+    for offset, length, char in tokens:
+        write_varint(out, offset)
+        write_varint(out, length)
+        if binary:
+            write_varint(out, char + 1 if char is not None else 0)
+        else:
+            write_varint(out, ord(char) + 1 if char else 0)
+    return bytes(out)
+
+
+def unpack_tokens(data, binary):
+    """Inverse of pack_tokens."""
+    end_char = None if binary else ''
+    tokens = []
+    pos = 0
+    while pos < len(data):
+        offset, pos = read_varint(data, pos)
+        length, pos = read_varint(data, pos)
+        char, pos = read_varint(data, pos)
+        if char:
+            char = char - 1 if binary else chr(char - 1)
+        else:
+            char = end_char
+        tokens.append((offset, length, char))
+    return tokens
@@ -0,0 +1,97 @@
+"""Memory-mapped compression of files into block archives and back.
+
+The source file is mapped rather than read, and each block handed to the
+pipeline is a memoryview slice of the mapping, so the file's pages are
+loaded (and dropped again) by the operating system as the blocks are
+coded. Decompression maps the archive the same way and, for archives of
+bytes, writes every decoded block straight into a mapping of the
+destination file, sized up front from the archive index. Memory use then
+follows the block size rather than the file size.
+
+The archives are the block archives of parallel.py, always of bytes;
+text archives (which index characters, not bytes) are decoded block by
+block into the destination instead.
+"""
+
+import mmap
+
+from .parallel import read_index, write_archive
+from .pipeline import build_pipeline
+from .stream import DEFAULT_BLOCK_SIZE
+
+
+def _map(file, access=mmap.ACCESS_READ, length=0):
+    """Map a file object, or return b'' for an empty file, which mmap cannot map."""
+    if not (length or file.seek(0, 2)):
+        return b''
+    return mmap.mmap(file.fileno(), length, access=access)
+
+
+def mapped_compress_file(source, destination, method='bwt', block_size=DEFAULT_BLOCK_SIZE, level='normal',
+                         workers=1):
+    """Compress the file behind binary file object source into a block archive in destination.
+
+    With more than one worker each block is copied once to send it to its
+    worker process.
+    """
+    if block_size < 1:
+        raise ValueError("Block size must be positive.")
+    mapping = _map(source)
+    try:
+        view = memoryview(mapping)
+        try:
+            blocks = (view[start:start + block_size] for start in range(0, len(view), block_size))
+            if workers > 1:
+                blocks = map(bytes, blocks)
+            write_archive(blocks, destination, method, True, level, workers)
+        finally:
+            view.release()
+    finally:
+        if mapping:
+            mapping.close()
+
+
+def mapped_decompress_file(source, destination):
+    """Decompress the block archive file object source into binary file object destination.
+
+    Archives of bytes are decoded into a mapping of destination, which must
+    be opened for reading and writing ('w+b'); text archives are written
+    to it as UTF-8.
+    """
+    method, binary, blocks = read_index(source)
+    mapping = _map(source)
+    try:
+        pipeline = build_pipeline(method)
+        view = memoryview(mapping)
+        try:
+            if binary:
+                _decompress_into_mapping(view, blocks, pipeline, destination)
+            else:
+                for offset, size, _, length in blocks:
+                    text = pipeline.decode(view[offset:offset + size])
+                    if len(text) != length:
+                        raise ValueError("Decoded block size does not match the archive index.")
+                    destination.write(text.encode('utf-8'))
+        finally:
+            view.release()
+    finally:
+        if mapping:
+            mapping.close()
+
+
+def _decompress_into_mapping(view, blocks, pipeline, destination):
+    total = blocks[-1][2] + blocks[-1][3] if blocks else 0
+    destination.seek(0)
+    destination.truncate(total)
+    if not total:
+        return
+    output = _map(destination, mmap.ACCESS_WRITE, total)
+    try:
+        for offset, size, start, length in blocks:
+            data = pipeline.decode(view[offset:offset + size])
+            if len(data) != length:
+                raise ValueError("Decoded block size does not match the archive index.")
+            output[start:start + length] = data
+        output.flush()
+    finally:
+        output.close()
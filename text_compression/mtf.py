@@ -0,0 +1,106 @@
+"""Move-to-front transform and zero-run encoding of its output.
+
+Ranks of str input are carried as characters (chr(rank)) so the result
+can be fed to the character-based entropy coders directly; ranks of
+bytes-like input are bytes.
+"""
+
+from .profiling import traced
+from .symbols import byte_view, is_binary
+
+# Zero runs are written in bijective base 2 with these two digits
+RUNA = '\x00'
+RUNB = '\x01'
+
+
+@traced('mtf.encode')
+def mtf_encode(s):
+    """Apply Move-to-Front to s; return (ranks, initial alphabet)."""
+    if is_binary(s):
+        data = byte_view(s)
+        alphabet = bytes(sorted(set(data)))
+        table = bytearray(alphabet)
+        ranks = bytearray(len(data))
+        for i, byte in enumerate(data):
+            rank = table.index(byte)
+            if rank:
+                del table[rank]
+                table.insert(0, byte)
+            ranks[i] = rank
+        return bytes(ranks), alphabet
+    alphabet = sorted(set(s))
+    table = list(alphabet)
+    ranks = []
+    for char in s:
+        rank = table.index(char)
+        if rank:
+            del table[rank]
+            table.insert(0, char)
+        ranks.append(chr(rank))
+    return ''.join(ranks), alphabet
+
+
+@traced('mtf.decode')
+def mtf_decode(ranks, alphabet):
+    """Inverse of mtf_encode; bytes-like ranks decode to bytes."""
+    binary = is_binary(ranks)
+    table = bytearray(alphabet) if binary else list(alphabet)
+    decoded = bytearray(len(ranks)) if binary else []
+    for i, rank in enumerate(byte_view(ranks) if binary else map(ord, ranks)):
+        char = table[rank]
+        if rank:
+            del table[rank]
+            table.insert(0, char)
+        if binary:
+            decoded[i] = char
+        else:
+            decoded.append(char)
+    return bytes(decoded) if binary else ''.join(decoded)
+
+
+@traced('zrle.encode')
+def zero_run_encode(ranks):
+    """Replace runs of rank 0 by RUNA/RUNB digits and shift other ranks up by one.
+
+    The result is always a str, since shifted byte ranks can reach 256.
+    """
+    if is_binary(ranks):
+        ranks = bytes(ranks).decode('latin-1')
+    encoded = []
+    run = 0
+    for rank in ranks:
+        if rank == '\x00':
+            run += 1
+            continue
+        while run:
+            digit = 2 - (run & 1)
+            encoded.append(RUNA if digit == 1 else RUNB)
+            run = (run - digit) >> 1
+        encoded.append(chr(ord(rank) + 1))
+    while run:
+        digit = 2 - (run & 1)
+        encoded.append(RUNA if digit == 1 else RUNB)
+        run = (run - digit) >> 1
+    return ''.join(encoded)
+
+
+@traced('zrle.decode')
+def zero_run_decode(encoded, binary=False):
+    """Inverse of zero_run_encode; returns bytes when binary is set."""
+    decoded = []
+    run = 0
+    weight = 1
+    for symbol in encoded:
+        if symbol == RUNA or symbol == RUNB:
+            run += weight if symbol == RUNA else 2 * weight
+            weight <<= 1
+            continue
+        if run:
+            decoded.append('\x00' * run)
+            run = 0
+            weight = 1
+        decoded.append(chr(ord(symbol) - 1))
+    if run:
+        decoded.append('\x00' * run)
+    decoded = ''.join(decoded)
+    return decoded.encode('latin-1') if binary else decoded
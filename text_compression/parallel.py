@@ -0,0 +1,169 @@
+"""Block-parallel compression on a process pool with an indexed multi-block archive.
+
+Archive layout:
+    magic (4 bytes) | method (1) | flags (1) | block payloads... | index
+    | index offset (8, big-endian) | end magic (4)
+The index is a varint block count followed by (compressed size,
+uncompressed size) varint pairs, one per block, in order. Flag
+FLAG_BINARY marks an archive of bytes rather than text.
+"""
+
+import io
+import os
+from collections import deque
+
+from .container import FLAG_BINARY, read_varint, write_varint
+from .pipeline import PIPELINES, PIPELINES_BY_ID, build_pipeline
+from .stream import DEFAULT_BLOCK_SIZE
+from .symbols import is_binary
+
+ARCHIVE_MAGIC = b'TCA1'
+END_MAGIC = b'TCAX'
+HEADER_SIZE = len(ARCHIVE_MAGIC) + 2
+FOOTER_SIZE = 8 + len(END_MAGIC)
+
+
+def _compress_block(task):
+    """Compress one (method, text, level) task; top level so it pickles."""
+    method, text, level = task
+    return build_pipeline(method, level).encode(text), len(text)
+
+
+def _decompress_block(task):
+    """Decompress one (method, payload) task; top level so it pickles."""
+    method, payload = task
+    return build_pipeline(method).decode(payload)
+
+
+def _map_bounded(function, tasks, workers):
+    """Yield function(task) in order, keeping at most 2 * workers tasks in flight."""
+    if workers == 1:
+        yield from map(function, tasks)
+        return
+    # Imported here: the process pool machinery is slow to import and rarely needed
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _read_blocks(source, block_size):
+    """Yield successive blocks of block_size characters (or bytes) from a file object."""
+    while True:
+        block = source.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def parallel_compress_file(source, destination, method='bwt', block_size=DEFAULT_BLOCK_SIZE,
+                           level='normal', workers=None):
+    """Compress a text or binary file object into a binary file object, one block per worker task."""
+    if method not in PIPELINES:
+        raise ValueError(f"Unknown method {method!r}; expected one of {sorted(PIPELINES)}.")
+    workers = workers or os.cpu_count() or 1
+    # read(0) returns '' or b'', which tells text and binary sources apart even when empty
+    binary = is_binary(source.read(0))
+    write_archive(_read_blocks(source, block_size), destination, method, binary, level, workers)
+
+
+def write_archive(blocks, destination, method='bwt', binary=False, level='normal', workers=1):
+    """Compress an iterable of str (or bytes-like) blocks into an archive written to destination.
+
+    With one worker the blocks are compressed in this process, so they may
+    be memoryview slices, which cannot be sent to a worker process.
+    """
+    if method not in PIPELINES:
+        raise ValueError(f"Unknown method {method!r}; expected one of {sorted(PIPELINES)}.")
+    flags = FLAG_BINARY if binary else 0
+    destination.write(ARCHIVE_MAGIC + bytes([PIPELINES[method][0], flags]))
+    offset = HEADER_SIZE
+    index = bytearray()
+    count = 0
+    tasks = ((method, block, level) for block in blocks)
+    for payload, length in _map_bounded(_compress_block, tasks, workers):
+        destination.write(payload)
+        offset += len(payload)
+        write_varint(index, len(payload))
+        write_varint(index, length)
+        count += 1
+    header = bytearray()
+    write_varint(header, count)
+    destination.write(bytes(header + index))
+    destination.write(offset.to_bytes(8, 'big') + END_MAGIC)
+
+
+def read_index(source):
+    """Return (method, binary, blocks) for an archive file object.
+
+    blocks is a list of (compressed offset, compressed size, uncompressed
+    offset, uncompressed size) tuples.
+    """
+    source.seek(0)
+    header = source.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(ARCHIVE_MAGIC):
+        raise ValueError("Not a block archive (bad magic number).")
+    method_id, flags = header[len(ARCHIVE_MAGIC):]
+    if method_id not in PIPELINES_BY_ID:
+        raise ValueError(f"Unknown archive method {method_id}.")
+    end = source.seek(0, io.SEEK_END)
+    if end < len(header) + FOOTER_SIZE:
+        raise ValueError("Block archive is truncated.")
+    source.seek(end - FOOTER_SIZE)
+    footer = source.read(FOOTER_SIZE)
+    if not footer.endswith(END_MAGIC):
+        raise ValueError("Block archive has no index footer.")
+    index_offset = int.from_bytes(footer[:8], 'big')
+    if not len(header) <= index_offset <= end - FOOTER_SIZE:
+        raise ValueError("Block archive index offset is out of range.")
+    source.seek(index_offset)
+    index = source.read(end - FOOTER_SIZE - index_offset)
+    count, pos = read_varint(index, 0)
+    blocks = []
+    offset = len(header)
+    text_offset = 0
+    for _ in range(count):
+        size, pos = read_varint(index, pos)
+        length, pos = read_varint(index, pos)
+        blocks.append((offset, size, text_offset, length))
+        offset += size
+        text_offset += length
+    if offset != index_offset:
+        raise ValueError("Block archive index does not match its blocks.")
+    return PIPELINES_BY_ID[method_id], bool(flags & FLAG_BINARY), blocks
+
+
+def parallel_decompress_file(source, destination, workers=None):
+    """Decompress a seekable binary archive file object into a text (or binary) file object."""
+    workers = workers or os.cpu_count() or 1
+    method, _, blocks = read_index(source)
+
+    def tasks():
+        for offset, size, _, _ in blocks:
+            source.seek(offset)
+            yield method, source.read(size)
+
+    for text in _map_bounded(_decompress_block, tasks(), workers):
+        destination.write(text)
+
+
+def parallel_compress(text, method='bwt', block_size=DEFAULT_BLOCK_SIZE, level='normal', workers=None):
+    """Compress a string (or bytes-like object) into block archive bytes using a process pool."""
+    source = io.BytesIO(text) if is_binary(text) else io.StringIO(text)
+    destination = io.BytesIO()
+    parallel_compress_file(source, destination, method, block_size, level, workers)
+    return destination.getvalue()
+
+
+def parallel_decompress(data, workers=None):
+    """Decompress block archive bytes into a string (or bytes) using a process pool."""
+    source = io.BytesIO(data)
+    binary = read_index(source)[1]
+    destination = io.BytesIO() if binary else io.StringIO()
+    parallel_decompress_file(source, destination, workers)
+    return destination.getvalue()
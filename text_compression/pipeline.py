@@ -0,0 +1,248 @@
+"""Composable pipelines of reversible compression stages.
+
+Each stage's encode() returns (data, params), where params is a tuple of
+non-negative integers the matching decode() needs (for example the BWT
+primary index). A pipeline stores every stage's params ahead of the
+final payload, so its output is self-contained:
+    per stage: param count (varint) | params (varints)
+    followed by the last stage's output bytes
+"""
+
+from .bwt import bwt_inverse, bwt_transform
+from .container import read_varint, write_varint
+from .deflate import deflate_decode, deflate_encode
+from .huffman import huffman_decode, huffman_encode
+from .lz77 import lz77_decode, lz77_encode, pack_tokens, unpack_tokens
+from .mtf import mtf_decode, mtf_encode, zero_run_decode, zero_run_encode
+from . import profiling
+from .range_coder import range_decode, range_encode
+from .shannon_fano import shannon_fano_decode, shannon_fano_encode
+from .symbols import is_binary, symbol_value
+
+
+class Stage:
+    """Base class for a reversible pipeline stage."""
+
+    name = None
+
+    def __init__(self, level='normal'):
+        self.level = level
+
+    def encode(self, data):
+        """Return (encoded data, params)."""
+        raise NotImplementedError
+
+    def decode(self, data, params):
+        """Invert encode given its params."""
+        raise NotImplementedError
+
+
+class BWTStage(Stage):
+    """Burrows-Wheeler Transform; the primary index is the only param."""
+
+    name = 'bwt'
+
+    def encode(self, data):
+        bwt_output, primary_index = bwt_transform(data)
+        return bwt_output, (primary_index,)
+
+    def decode(self, data, params):
+        return bwt_inverse(data, params[0])
+
+
+class MTFStage(Stage):
+    """Move-to-front; the initial alphabet's code points are the params.
+
+    Byte ranks (from bytes input) decode back to bytes.
+    """
+
+    name = 'mtf'
+
+    def encode(self, data):
+        ranks, alphabet = mtf_encode(data)
+        return ranks, tuple(map(symbol_value, alphabet))
+
+    def decode(self, data, params):
+        return mtf_decode(data, bytes(params) if is_binary(data) else list(map(chr, params)))
+
+
+class ZeroRunStage(Stage):
+    """bzip2-style RUNA/RUNB encoding of runs of rank 0; the param flags byte input."""
+
+    name = 'zrle'
+
+    def encode(self, data):
+        return zero_run_encode(data), (int(is_binary(data)),)
+
+    def decode(self, data, params):
+        return zero_run_decode(data, binary=bool(params[0]))
+
+
+class LZ77Stage(Stage):
+    """LZ77 tokens serialized with pack_tokens; the param flags byte input."""
+
+    name = 'lz77'
+
+    def encode(self, data):
+        binary = is_binary(data)
+        return pack_tokens(lz77_encode(data, level=self.level), binary), (int(binary),)
+
+    def decode(self, data, params):
+        binary = bool(params[0])
+        return lz77_decode(unpack_tokens(data, binary), binary)
+
+
+class DeflateStage(Stage):
+    """LZ77 tokens coded as Huffman-coded literal, length and distance streams."""
+
+    name = 'deflate'
+
+    def encode(self, data):
+        return deflate_encode(data, self.level), ()
+
+    def decode(self, data, params):
+        return deflate_decode(data)
+
+
+class StoreStage(Stage):
+    """No compression: str is stored as UTF-8; the param flags byte input."""
+
+    name = 'store'
+
+    def encode(self, data):
+        if is_binary(data):
+            return bytes(data), (1,)
+        return data.encode('utf-8', 'surrogatepass'), (0,)
+
+    def decode(self, data, params):
+        return bytes(data) if params[0] else bytes(data).decode('utf-8', 'surrogatepass')
+
+
+class _EntropyStage(Stage):
+    """Entropy coder over characters, or over byte values for bytes input."""
+
+    encoder = None
+    decoder = None
+
+    def encode(self, data):
+        return type(self).encoder(data)[0], ()
+
+    def decode(self, data, params):
+        return type(self).decoder(data)
+
+
+class HuffmanStage(_EntropyStage):
+    name = 'huffman'
+    encoder = huffman_encode
+    decoder = huffman_decode
+
+
+class ShannonFanoStage(_EntropyStage):
+    name = 'shannon-fano'
+    encoder = shannon_fano_encode
+    decoder = shannon_fano_decode
+
+
+class RangeStage(Stage):
+    """Adaptive range coder with an order-0 model."""
+
+    name = 'range'
+    order = 0
+
+    def encode(self, data):
+        return range_encode(data, self.order), ()
+
+    def decode(self, data, params):
+        return range_decode(data)
+
+
+class Order1RangeStage(RangeStage):
+    """Adaptive range coder with a model per preceding symbol."""
+
+    name = 'range-order1'
+    order = 1
+
+
+STAGES = {stage.name: stage for stage in
+          (BWTStage, MTFStage, ZeroRunStage, LZ77Stage, DeflateStage, HuffmanStage, ShannonFanoStage, RangeStage,
+           Order1RangeStage, StoreStage)}
+
+# Named chains: name -> (id stored in stream and archive headers, stage names);
+# 'auto' picks one of the others per block (see auto.py)
+PIPELINES = {
+    'bwt': (1, ('bwt', 'mtf', 'zrle', 'huffman')),
+    'lz77': (2, ('lz77',)),
+    'lz77-huffman': (3, ('lz77', 'huffman')),
+    'huffman': (4, ('huffman',)),
+    'shannon-fano': (5, ('shannon-fano',)),
+    'bwt-shannon-fano': (6, ('bwt', 'mtf', 'zrle', 'shannon-fano')),
+    'bwt-range': (7, ('bwt', 'mtf', 'zrle', 'range')),
+    'lz77-range': (8, ('lz77', 'range-order1')),
+    'deflate': (9, ('deflate',)),
+    'store': (10, ('store',)),
+    'auto': (11, ()),
+}
+PIPELINES_BY_ID = {pipeline_id: name for name, (pipeline_id, _) in PIPELINES.items()}
+
+
+class Pipeline:
+    """A chain of stages applied in order on encode and in reverse on decode."""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        if not self.stages:
+            raise ValueError("A pipeline needs at least one stage.")
+
+    @classmethod
+    def from_names(cls, names, level='normal'):
+        """Build a pipeline from stage names such as ('bwt', 'mtf', 'zrle', 'huffman')."""
+        unknown = [name for name in names if name not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown stages {unknown}; expected names from {sorted(STAGES)}.")
+        return cls(STAGES[name](level) for name in names)
+
+    def __repr__(self):
+        return ' -> '.join(stage.name for stage in self.stages)
+
+    def encode(self, data):
+        """Run every stage and return the self-contained output bytes."""
+        header = bytearray()
+        for stage in self.stages:
+            with profiling.stage(f'pipeline.{stage.name}.encode', data) as span:
+                data, params = stage.encode(data)
+                span.done(data)
+            write_varint(header, len(params))
+            for param in params:
+                write_varint(header, param)
+        if not isinstance(data, (bytes, bytearray)):
+            raise ValueError(f"Pipeline {self!r} does not end in a stage that produces bytes.")
+        return bytes(header + data)
+
+    def decode(self, data):
+        """Invert encode."""
+        pos = 0
+        all_params = []
+        for _ in self.stages:
+            count, pos = read_varint(data, pos)
+            params = []
+            for _ in range(count):
+                param, pos = read_varint(data, pos)
+                params.append(param)
+            all_params.append(params)
+        data = bytes(data[pos:])
+        for stage, params in zip(reversed(self.stages), reversed(all_params)):
+            with profiling.stage(f'pipeline.{stage.name}.decode', data) as span:
+                data = stage.decode(data, params)
+                span.done(data)
+        return data
+
+
+def build_pipeline(method, level='normal'):
+    """Return the Pipeline registered under method in PIPELINES."""
+    if method not in PIPELINES:
+        raise ValueError(f"Unknown method {method!r}; expected one of {sorted(PIPELINES)}.")
+    if method == 'auto':
+        # Imported here because auto.py builds its pipelines through this module
+        from .auto import AutoPipeline
+        return AutoPipeline(level)
+    return Pipeline.from_names(PIPELINES[method][1], level)
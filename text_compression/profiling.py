@@ -0,0 +1,213 @@
+"""Optional per-stage profiling of the codecs.
+
+Codecs mark their stages with stage() blocks or the traced() decorator.
+Nothing is measured unless a Tracer is active:
+
+    with Tracer() as tracer:
+        huffman_encode(text)
+    print(tracer.to_prometheus())
+
+For every stage name the tracer sums the calls, wall time, input and
+output sizes (len(): characters for str, bytes for bytes, tokens for
+LZ77 token lists) and symbols (the alphabet or token count the stage
+reports). Tracer(memory=True) also records each stage's peak memory above
+its starting point with tracemalloc, which slows everything down while it
+runs. When no tracer is active a stage costs one global lookup.
+
+The active tracer sees stages run by any thread of the process, but not
+those run in worker processes. Each thread nests its stages on a stack of
+its own, and the totals are updated under a lock. tracemalloc's peak is
+shared by the whole process, so with memory=True stages running on
+several threads at once can see each other's allocations.
+"""
+
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+# Innermost active tracer, or None; checked on every stage
+_active = None
+
+METRICS = (
+    ('calls', 'counter', "Times the stage ran."),
+    ('seconds', 'counter', "Wall time spent in the stage."),
+    ('bytes_in', 'counter', "Size of the stage input (characters for text)."),
+    ('bytes_out', 'counter', "Size of the stage output (characters for text, tokens for LZ77)."),
+    ('symbols', 'counter', "Symbols or tokens reported by the stage."),
+    ('peak_memory_bytes', 'gauge', "Largest memory increase seen during one run of the stage."),
+)
+
+
+def _size(value):
+    """Return len() of a stage input or output; tuples count their first item (the encoded data)."""
+    if isinstance(value, tuple):
+        value = value[0] if value else None
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+class _Span:
+    """One running stage; records itself on the tracer when the block exits."""
+
+    __slots__ = ('tracer', 'name', 'bytes_in', 'bytes_out', 'symbols', 'start', 'memory_start', 'peak')
+
+    def __init__(self, tracer, name, data):
+        self.tracer = tracer
+        self.name = name
+        self.bytes_in = _size(data)
+        self.bytes_out = 0
+        self.symbols = 0
+        self.peak = 0
+
+    def __enter__(self):
+        tracer = self.tracer
+        if tracer.memory:
+            self.memory_start, peak = tracemalloc.get_traced_memory()
+            # Resetting the peak hides the enclosing span's peak so far; keep it on that span
+            if tracer.spans:
+                parent = tracer.spans[-1]
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+        tracer.spans.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.start
+        tracer = self.tracer
+        tracer.spans.pop()
+        memory = 0
+        if tracer.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.peak)
+            memory = peak - self.memory_start
+            if tracer.spans:
+                parent = tracer.spans[-1]
+                parent.peak = max(parent.peak, peak)
+        tracer.record(self.name, seconds, self.bytes_in, self.bytes_out, self.symbols, memory)
+        return False
+
+    def done(self, output=None, symbols=0):
+        """Report the stage output (for its size) and its symbol count."""
+        self.bytes_out = _size(output)
+        self.symbols = symbols
+
+
+class _NullSpan:
+    """Stand-in used when no tracer is active."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    def done(self, output=None, symbols=0):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def stage(name, data=None):
+    """Return a context manager timing the stage name on the active tracer, if any.
+
+    data is the stage input, for its size; call .done(output, symbols) on
+    the value of the with statement to report the output.
+    """
+    if _active is None:
+        return _NULL_SPAN
+    return _Span(_active, name, data)
+
+
+def traced(name):
+    """Decorator running a function as stage name; its first argument is the input, its result the output."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            with _Span(_active, name, args[0] if args else None) as span:
+                result = function(*args, **kwargs)
+                span.done(result)
+            return result
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """Collects per-stage metrics while active (use it as a context manager)."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._previous = None
+        self._started_tracemalloc = False
+
+    @property
+    def spans(self):
+        """The stages running on the calling thread, innermost last."""
+        spans = getattr(self._local, 'spans', None)
+        if spans is None:
+            spans = self._local.spans = []
+        return spans
+
+    def __enter__(self):
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        global _active
+        _active = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return False
+
+    def record(self, name, seconds, bytes_in=0, bytes_out=0, symbols=0, memory=0):
+        """Add one run of stage name to the totals."""
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {metric: 0 for metric, _, _ in METRICS}
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['symbols'] += symbols
+            stats['peak_memory_bytes'] = max(stats['peak_memory_bytes'], memory)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+    def to_dict(self):
+        """Return {stage name: {metric: value}}, stages sorted by name."""
+        with self._lock:
+            return {name: dict(self.stages[name]) for name in sorted(self.stages)}
+
+    def to_prometheus(self, prefix='text_compression_stage'):
+        """Return the metrics in the Prometheus text exposition format."""
+        stages = self.to_dict()
+        lines = []
+        for metric, kind, help_text in METRICS:
+            full_name = f'{prefix}_{metric}' + ('_total' if kind == 'counter' else '')
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for name, stats in stages.items():
+                value = stats[metric]
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{full_name}{{stage="{label}"}} {value:.6f}' if isinstance(value, float)
+                             else f'{full_name}{{stage="{label}"}} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,238 @@
+"""Adaptive range coding with order-0 and order-1 context models.
+
+Unlike Huffman and Shannon-Fano, which spend a whole number of bits on
+every symbol, a range coder narrows an integer interval by each symbol's
+probability and so gets within a fraction of a bit of the entropy per
+message. The probabilities come from adaptive frequency counts, so no
+code table is stored; only the alphabet is. The order-1 model keeps one
+set of counts per preceding symbol.
+
+The output is a container (see container.py) with method
+METHOD_RANGE_ORDER0 or METHOD_RANGE_ORDER1, the alphabet as the table and
+the range coder bytes as the payload. All arithmetic is on integers: the
+coder keeps a 32-bit range and carries into bytes already written, as in
+LZMA.
+"""
+
+from .container import (FLAG_BINARY, METHOD_RANGE_ORDER0, METHOD_RANGE_ORDER1, decode_alphabet,
+                        encode_alphabet, read_container, write_container)
+from .profiling import traced
+from .symbols import byte_view, is_binary, join_symbols
+
+# The range is renormalized to stay above 2**24, and frequency totals are
+# kept at or below 2**16, so every symbol keeps an interval of 256 or more.
+# Alphabets over MAX_TOTAL // 2 symbols let the total grow to twice their
+# size instead, which stays below 2**22 and still leaves every symbol an
+# interval of at least 4.
+RANGE_TOP = 1 << 24
+RANGE_MASK = 0xFFFFFFFF
+MAX_TOTAL = 1 << 16
+
+# Added to a symbol's count each time it is coded; the counts are halved
+# once their total passes the model's limit, which also lets the model forget
+INCREMENT = 32
+
+# The order-1 model keeps a table of this many counts per context, so
+# larger alphabets are coded with the order-0 model
+MAX_ORDER1_ALPHABET = 1024
+
+# Every Unicode code point
+MAX_ALPHABET = 0x110000
+
+
+class AdaptiveModel:
+    """Adaptive counts of symbols 0..size-1 with a Fenwick tree for cumulative counts."""
+
+    def __init__(self, size):
+        self.size = size
+        self.freqs = [1] * size
+        self.total = size
+        self.limit = max(MAX_TOTAL, 2 * size)
+        self.top = 1 << (size.bit_length() - 1)
+        self._build_tree()
+
+    def _build_tree(self):
+        size = self.size
+        tree = [0] + self.freqs
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def interval(self, symbol):
+        """Return (cumulative count below symbol, count of symbol)."""
+        tree = self.tree
+        low = 0
+        i = symbol
+        while i:
+            low += tree[i]
+            i &= i - 1
+        return low, self.freqs[symbol]
+
+    def find(self, target):
+        """Return (symbol, cumulative count below it) for the symbol whose interval holds target."""
+        tree = self.tree
+        size = self.size
+        symbol = 0
+        low = 0
+        bit = self.top
+        while bit:
+            node = symbol + bit
+            if node <= size and low + tree[node] <= target:
+                symbol = node
+                low += tree[node]
+            bit >>= 1
+        return symbol, low
+
+    def update(self, symbol):
+        """Count one more occurrence of symbol."""
+        self.freqs[symbol] += INCREMENT
+        self.total += INCREMENT
+        if self.total > self.limit:
+            self.freqs = [(freq + 1) >> 1 for freq in self.freqs]
+            self.total = sum(self.freqs)
+            self._build_tree()
+            return
+        tree = self.tree
+        size = self.size
+        i = symbol + 1
+        while i <= size:
+            tree[i] += INCREMENT
+            i += i & -i
+
+
+class RangeEncoder:
+    """Integer range encoder; write symbols with encode() and collect the bytes from finish()."""
+
+    def __init__(self):
+        self.low = 0
+        self.range = RANGE_MASK
+        self.cache = 0
+        self.cache_size = 1
+        self.out = bytearray()
+
+    def encode(self, low, size, total):
+        """Narrow the range to the interval [low, low + size) out of total."""
+        r = self.range // total
+        self.low += r * low
+        self.range = r * size
+        while self.range < RANGE_TOP:
+            self.range <<= 8
+            self._shift_low()
+
+    def _shift_low(self):
+        # The top byte is held back (with any 0xFF bytes after it) until a carry can no longer reach it
+        low = self.low
+        if low < 0xFF000000 or low > RANGE_MASK:
+            carry = low >> 32
+            out = self.out
+            out.append((self.cache + carry) & 0xFF)
+            out.extend(bytes([(0xFF + carry) & 0xFF]) * (self.cache_size - 1))
+            self.cache_size = 0
+            self.cache = (low >> 24) & 0xFF
+        self.cache_size += 1
+        self.low = (low & 0x00FFFFFF) << 8
+
+    def finish(self):
+        """Flush the coder and return its bytes."""
+        for _ in range(5):
+            self._shift_low()
+        # The first byte is always zero, so it is not stored
+        return bytes(self.out[1:])
+
+
+class RangeDecoder:
+    """Inverse of RangeEncoder over its finished bytes."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 4
+        self.code = int.from_bytes(data[:4].ljust(4, b'\0'), 'big')
+        self.range = RANGE_MASK
+        self.r = 1
+
+    def target(self, total):
+        """Return the cumulative count the next symbol's interval (out of total) contains."""
+        self.r = self.range // total
+        return min(self.code // self.r, total - 1)
+
+    def decode(self, low, size):
+        """Consume the interval [low, low + size) found through target()."""
+        self.code -= self.r * low
+        self.range = self.r * size
+        while self.range < RANGE_TOP:
+            # Past the end of the data the missing bytes read as zero
+            byte = self.data[self.pos] if self.pos < len(self.data) else 0
+            self.pos += 1
+            self.code = (self.code << 8) | byte
+            self.range <<= 8
+
+
+@traced('range.encode')
+def range_encode(s, order=0):
+    """Encode the input string (or bytes-like object) with an adaptive range coder.
+
+    order is 0 for a single model or 1 for a model per preceding symbol;
+    alphabets above MAX_ORDER1_ALPHABET symbols fall back to order 0.
+    Returns the packed container bytes.
+    """
+    if order not in (0, 1):
+        raise ValueError(f"Unsupported model order {order}; expected 0 or 1.")
+    flags = FLAG_BINARY if is_binary(s) else 0
+    if flags:
+        s = byte_view(s)
+    alphabet = sorted(set(s))
+    if len(alphabet) > MAX_ALPHABET:
+        raise ValueError(f"The range coder supports at most {MAX_ALPHABET} distinct symbols.")
+    if len(alphabet) > MAX_ORDER1_ALPHABET:
+        order = 0
+    encoder = RangeEncoder()
+    if len(alphabet) > 1:
+        index = {symbol: i for i, symbol in enumerate(alphabet)}
+        models = [None] * len(alphabet) if order else [AdaptiveModel(len(alphabet))]
+        context = 0
+        for symbol in s:
+            symbol = index[symbol]
+            model = models[context]
+            if model is None:
+                model = models[context] = AdaptiveModel(len(alphabet))
+            low, size = model.interval(symbol)
+            encoder.encode(low, size, model.total)
+            model.update(symbol)
+            if order:
+                context = symbol
+    method = METHOD_RANGE_ORDER1 if order else METHOD_RANGE_ORDER0
+    # A single-symbol alphabet needs no payload: the count says it all
+    payload = encoder.finish() if len(alphabet) > 1 else b''
+    return write_container(method, len(s), encode_alphabet(alphabet), payload, 0, flags)
+
+
+@traced('range.decode')
+def range_decode(data):
+    """Decode a container produced by range_encode back to the original string or bytes."""
+    method, flags, count, table, payload, _ = read_container(data, METHOD_RANGE_ORDER0, METHOD_RANGE_ORDER1)
+    binary = bool(flags & FLAG_BINARY)
+    alphabet = decode_alphabet(table, binary)
+    if len(alphabet) <= 1:
+        if count and not alphabet:
+            raise ValueError("Container has symbols but an empty alphabet.")
+        return join_symbols(alphabet * count, binary)
+    if len(alphabet) > MAX_ALPHABET:
+        raise ValueError(f"Alphabet of {len(alphabet)} symbols is too large.")
+    order = method == METHOD_RANGE_ORDER1
+    decoder = RangeDecoder(payload)
+    models = [None] * len(alphabet) if order else [AdaptiveModel(len(alphabet))]
+    context = 0
+    decoded = []
+    for _ in range(count):
+        model = models[context]
+        if model is None:
+            model = models[context] = AdaptiveModel(len(alphabet))
+        symbol, low = model.find(decoder.target(model.total))
+        decoder.decode(low, model.freqs[symbol])
+        model.update(symbol)
+        decoded.append(alphabet[symbol])
+        if order:
+            context = symbol
+    return join_symbols(decoded, binary)
@@ -0,0 +1,102 @@
+"""Run-length encoding.
+
+run_length_encoding is the readable form shown by the UI ("a3b1"), for
+str only; it cannot be decoded when the input contains digits. rle_encode
+is the unambiguous PackBits form for bytes-like input:
+    header n in 0-127: the next n + 1 bytes are literals
+    header n in 129-255: the next byte repeats 257 - n times
+"""
+
+from . import vectorized
+from .profiling import traced
+from .symbols import byte_view
+
+# Longest run or literal span one header byte can describe
+MAX_RUN = 128
+
+
+def _runs(s, min_length=1):
+    """Return (start, length) lists of the runs of at least min_length equal symbols in s."""
+    if vectorized.enabled(len(s)):
+        return vectorized.runs(s, min_length)
+    starts = []
+    lengths = []
+    for i in range(len(s)):
+        if i and s[i] == s[i - 1]:
+            lengths[-1] += 1
+        else:
+            if lengths and lengths[-1] < min_length:
+                starts.pop()
+                lengths.pop()
+            starts.append(i)
+            lengths.append(1)
+    if lengths and lengths[-1] < min_length:
+        starts.pop()
+        lengths.pop()
+    return starts, lengths
+
+
+def run_length_encoding(s):
+    """Apply Run-Length Encoding to the input string.
+
+    Only str is accepted; bytes-like input raises TypeError (use
+    rle_encode for bytes).
+    """
+    if not isinstance(s, str):
+        raise TypeError(f"run_length_encoding takes str, not {type(s).__name__}; use rle_encode for bytes.")
+    starts, lengths = _runs(s)
+    return ''.join([s[start] + str(length) for start, length in zip(starts, lengths)])
+
+
+def _append_literals(out, data, start, end):
+    """Append data[start:end] as literal spans of at most MAX_RUN bytes."""
+    for start in range(start, end, MAX_RUN):
+        span = min(MAX_RUN, end - start)
+        out.append(span - 1)
+        out += data[start:start + span]
+
+
+@traced('rle.encode')
+def rle_encode(data):
+    """PackBits-encode a bytes-like object into bytes."""
+    data = byte_view(data)
+    out = bytearray()
+    literal_start = 0
+    # Runs shorter than three bytes stay in the surrounding literal span
+    starts, lengths = _runs(data, 3)
+    for start, length in zip(starts, lengths):
+        while length >= 3:
+            _append_literals(out, data, literal_start, start)
+            run = min(MAX_RUN, length)
+            out.append(257 - run)
+            out.append(data[start])
+            start += run
+            length -= run
+            literal_start = start
+    _append_literals(out, data, literal_start, len(data))
+    return bytes(out)
+
+
+@traced('rle.decode')
+def rle_decode(data):
+    """Inverse of rle_encode."""
+    data = byte_view(data)
+    n = len(data)
+    out = bytearray()
+    pos = 0
+    while pos < n:
+        header = data[pos]
+        if header < 128:
+            end = pos + 2 + header
+            if end > n:
+                raise ValueError("Run-length data ended inside a literal span.")
+            out += data[pos + 1:end]
+            pos = end
+        elif header > 128:
+            if pos + 1 >= n:
+                raise ValueError("Run-length data ended before a run byte.")
+            out += bytes((data[pos + 1],)) * (257 - header)
+            pos += 2
+        else:
+            raise ValueError("Invalid run-length header 128.")
+    return bytes(out)
@@ -0,0 +1,158 @@
+"""Random access into block archives.
+
+Every block of a parallel.py archive is compressed on its own and the
+footer index records where each one starts, both compressed and
+uncompressed. ArchiveReader uses the index to decode only the blocks a
+read touches, keeping the most recently used ones decoded in a small
+cache, so a lookup near the end of a large archive costs one or two
+blocks rather than everything before it.
+
+Offsets count bytes for archives of bytes and characters for archives
+of text.
+"""
+
+import builtins
+import io
+from bisect import bisect_right
+from collections import OrderedDict
+
+from .parallel import read_index
+from .pipeline import build_pipeline
+
+# Decoded blocks kept by default; at the default block size this is 2 MB
+DEFAULT_CACHE_BLOCKS = 8
+
+
+class ArchiveReader(io.IOBase):
+    """Seekable, read-only file-like view of the uncompressed contents of a block archive.
+
+    read() and readline() return str or bytes, matching what the archive
+    holds. read_at(offset, length) reads without moving the position.
+    """
+
+    def __init__(self, file, cache_blocks=DEFAULT_CACHE_BLOCKS):
+        if cache_blocks < 1:
+            raise ValueError("The block cache must hold at least one block.")
+        if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+            self._file = builtins.open(file, 'rb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        try:
+            self.method, self.binary, self._blocks = read_index(self._file)
+        except Exception:
+            if self._owns_file:
+                self._file.close()
+            raise
+        self._starts = [start for _, _, start, _ in self._blocks]
+        self.size = self._starts[-1] + self._blocks[-1][3] if self._blocks else 0
+        self._pipeline = build_pipeline(self.method)
+        self._empty = b'' if self.binary else ''
+        self.cache_blocks = cache_blocks
+        self._cache = OrderedDict()
+        # Blocks decoded so far, cache misses included; shows how much work lookups cost
+        self.blocks_decoded = 0
+        self._pos = 0
+
+    def __len__(self):
+        return self.size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def _block(self, number):
+        """Return the decoded contents of block number, through the cache."""
+        data = self._cache.get(number)
+        if data is not None:
+            self._cache.move_to_end(number)
+            return data
+        offset, size, _, length = self._blocks[number]
+        self._file.seek(offset)
+        data = self._pipeline.decode(self._file.read(size))
+        if len(data) != length:
+            raise ValueError(f"Block {number} decoded to {len(data)} symbols, expected {length}.")
+        self.blocks_decoded += 1
+        self._cache[number] = data
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return data
+
+    def read_at(self, offset, length):
+        """Return up to length bytes (or characters) starting at offset, leaving the position alone."""
+        if self.closed:
+            raise ValueError("I/O operation on closed archive.")
+        if offset < 0 or length < 0:
+            raise ValueError("Offset and length must be non-negative.")
+        end = min(offset + length, self.size)
+        pieces = []
+        pos = offset
+        number = bisect_right(self._starts, pos) - 1
+        while pos < end:
+            start = self._starts[number]
+            pieces.append(self._block(number)[pos - start:end - start])
+            pos = start + self._blocks[number][3]
+            number += 1
+        return self._empty.join(pieces)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence!r}.")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}.")
+        self._pos = position
+        return position
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(self.size - self._pos, 0)
+        data = self.read_at(self._pos, size)
+        self._pos += len(data)
+        return data
+
+    def readline(self, size=-1):
+        newline = b'\n' if self.binary else '\n'
+        limit = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        pieces = []
+        pos = self._pos
+        while pos < limit:
+            number = bisect_right(self._starts, pos) - 1
+            start = self._starts[number]
+            data = self._block(number)
+            stop = min(limit - start, len(data))
+            end = data.find(newline, pos - start, stop)
+            if end >= 0:
+                stop = end + 1
+            pieces.append(data[pos - start:stop])
+            pos = start + stop
+            if end >= 0:
+                break
+        self._pos = max(pos, self._pos)
+        return self._empty.join(pieces)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._cache.clear()
+            if self._owns_file:
+                self._file.close()
+        finally:
+            super().close()
+
+
+def open_archive(file, cache_blocks=DEFAULT_CACHE_BLOCKS):
+    """Open a block archive (a path or binary file object) for random-access reading."""
+    return ArchiveReader(file, cache_blocks)
@@ -0,0 +1,568 @@
+"""Asyncio compression service speaking HTTP/1.1 over TCP or a Unix socket.
+
+Endpoints:
+    POST /compress?method=bwt&level=normal
+        body: any bytes; response: the body as a compressed stream of bytes
+        (the stream.py format, readable by Decompressor and decompress)
+    POST /decompress
+        body: a compressed stream; response: its contents (text as UTF-8)
+    GET /stats
+        JSON request and block counters, latency percentiles, throughput
+
+Request bodies may be sent with Content-Length or chunked, and are read
+one block at a time; responses are sent chunked as the blocks finish, in
+order. Blocks are coded on a process pool of the given number of workers.
+At most 2 * workers blocks wait or run in the pool across all requests: a
+request with no room stops reading its body, so TCP flow control slows
+its client down, and a slow reader stalls its own request the same way.
+A request arriving while max_requests others are in progress is turned
+away with 503 and Retry-After.
+
+load_test() drives a running server with many concurrent clients.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from .container import FLAG_BINARY, write_varint
+from .lz77 import LEVELS
+from .parallel import _compress_block, _decompress_block
+from .pipeline import PIPELINES, PIPELINES_BY_ID
+from .stream import CHUNK_SIZE, DEFAULT_BLOCK_SIZE, STREAM_MAGIC
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8741
+
+DEFAULT_MAX_REQUESTS = 256
+
+# Connections waiting to be accepted; the kernel may lower it (somaxconn)
+BACKLOG = 1024
+
+# Seconds an idle keep-alive connection stays open
+IDLE_TIMEOUT = 30
+
+# Largest compressed frame accepted by /decompress
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Body bytes read and dropped after an error response, so that the client
+# sees the response and can reuse the connection; larger bodies close it
+DISCARD_LIMIT = 1024 * 1024
+
+MAX_HEADERS = 100
+
+# Most recent request latencies kept for the percentiles
+LATENCY_SAMPLES = 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           503: 'Service Unavailable'}
+
+
+class _RequestError(Exception):
+    """A request that gets an error response instead of being served."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_head(reader):
+    """Read a request (or status) line and its headers; return (line, {name: value}), or None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    headers = {}
+    while True:
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise _RequestError(400, "Too many headers.")
+        name, _, value = header.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return line.decode('latin-1').strip(), headers
+
+
+class _Body:
+    """Reads a message body sent with Content-Length or chunked transfer encoding."""
+
+    def __init__(self, reader, headers):
+        self._reader = reader
+        self._chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        try:
+            self._remaining = 0 if self._chunked else int(headers.get('content-length', 0))
+        except ValueError:
+            raise _RequestError(400, "Invalid Content-Length.") from None
+        if self._remaining < 0:
+            raise _RequestError(400, "Invalid Content-Length.")
+        self._done = False
+        self.size = 0
+
+    async def read(self, size):
+        """Return up to size bytes of the body, or b'' at its end."""
+        if self._done:
+            return b''
+        reader = self._reader
+        if self._chunked and not self._remaining:
+            line = await reader.readline()
+            try:
+                self._remaining = int(line.split(b';')[0], 16)
+            except ValueError:
+                raise _RequestError(400, "Invalid chunk size.") from None
+            if not self._remaining:
+                # Skip any trailers
+                while await reader.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+        if not self._remaining:
+            self._done = True
+            return b''
+        data = await reader.read(min(size, self._remaining))
+        if not data:
+            raise _RequestError(400, "Body ended early.")
+        self._remaining -= len(data)
+        if self._chunked and not self._remaining:
+            await reader.readexactly(2)
+        self.size += len(data)
+        return data
+
+    async def read_block(self, size):
+        """Return size bytes, or fewer only at the end of the body."""
+        pieces = []
+        total = 0
+        while total < size:
+            data = await self.read(min(size - total, CHUNK_SIZE))
+            if not data:
+                break
+            pieces.append(data)
+            total += len(data)
+        return b''.join(pieces)
+
+    async def read_exactly(self, size):
+        data = await self.read_block(size)
+        if len(data) != size:
+            raise _RequestError(400, "Compressed stream is truncated.")
+        return data
+
+    async def read_varint(self):
+        value = shift = 0
+        while True:
+            byte = (await self.read_exactly(1))[0]
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+            if shift > 63:
+                raise _RequestError(400, "Varint is too long.")
+
+    async def drain(self, limit=None):
+        """Read and drop the rest of the body, or no more than limit bytes; return whether it ended."""
+        start = self.size
+        while limit is None or self.size - start <= limit:
+            if not await self.read(CHUNK_SIZE):
+                return True
+        return False
+
+
+class _Response:
+    """Sends a chunked response, writing the status line and headers before the first chunk."""
+
+    def __init__(self, writer, keep_alive, content_type='application/octet-stream'):
+        self._writer = writer
+        self._keep_alive = keep_alive
+        self._content_type = content_type
+        self.started = False
+        self.size = 0
+
+    async def write(self, data):
+        writer = self._writer
+        if not self.started:
+            self.started = True
+            writer.write(_head(200, self._content_type, self._keep_alive, 'Transfer-Encoding: chunked\r\n'))
+        if data:
+            writer.write(b'%x\r\n' % len(data))
+            writer.write(data)
+            writer.write(b'\r\n')
+            self.size += len(data)
+            # Waits while the client is not reading, which holds back this request
+            await writer.drain()
+
+    async def finish(self):
+        await self.write(b'')
+        self._writer.write(b'0\r\n\r\n')
+        await self._writer.drain()
+
+
+def _head(status, content_type, keep_alive, extra=''):
+    connection = 'keep-alive' if keep_alive else 'close'
+    return (f'HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n'
+            f'Connection: {connection}\r\n{extra}\r\n').encode('latin-1')
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class ServiceStats:
+    """Counters of a running server; to_dict() is what GET /stats returns."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.active_requests = 0
+        self.queued_blocks = 0
+        self.running_blocks = 0
+        self.blocks = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def to_dict(self):
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            'uptime_s': uptime,
+            'requests': self.requests,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'active_requests': self.active_requests,
+            'queued_blocks': self.queued_blocks,
+            'running_blocks': self.running_blocks,
+            'blocks': self.blocks,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'requests_per_s': self.requests / uptime if uptime else 0.0,
+            'mb_in_per_s': self.bytes_in / uptime / 1e6 if uptime else 0.0,
+            'latency_ms': {name: 1000 * _percentile(latencies, fraction)
+                           for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+        }
+
+
+class CompressionServer:
+    """The compression service (see the module docstring); start() it inside a running event loop."""
+
+    def __init__(self, workers=None, block_size=DEFAULT_BLOCK_SIZE, max_requests=DEFAULT_MAX_REQUESTS,
+                 method='bwt', level='normal'):
+        if block_size < 1:
+            raise ValueError("Block size must be positive.")
+        if method not in PIPELINES:
+            raise ValueError(f"Unknown method {method!r}; expected one of {sorted(PIPELINES)}.")
+        self.workers = workers or os.cpu_count() or 1
+        self.block_size = block_size
+        self.max_requests = max_requests
+        self.method = method
+        self.level = level
+        self.stats = ServiceStats()
+        self._executor = None
+        self._slots = None
+        self._server = None
+        # Open connections: writer -> the task serving it
+        self._connections = {}
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Listen on host and port, or on the Unix socket path; return the asyncio server."""
+        # Imported here: the process pool machinery is slow to import and only the server needs it
+        from concurrent.futures import ProcessPoolExecutor
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(2 * self.workers)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._connection, path, backlog=BACKLOG)
+        else:
+            self._server = await asyncio.start_server(self._connection, host, port, backlog=BACKLOG)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Closed connections end their handlers, which should finish rather than be cancelled
+            for writer in list(self._connections):
+                writer.close()
+            if self._connections:
+                await asyncio.wait(list(self._connections.values()))
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Serve until cancelled or sent SIGTERM, then close the connections and the pool."""
+        await self.start(host, port, path)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal.SIGTERM, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            with contextlib.suppress(NotImplementedError):
+                loop.remove_signal_handler(signal.SIGTERM)
+            await self.close()
+
+    def _release(self, future):
+        self._slots.release()
+        self.stats.running_blocks -= 1
+        if not future.cancelled():
+            # Marks an exception as seen when its request is already gone
+            future.exception()
+
+    async def _code_blocks(self, tasks, function):
+        """Yield function(task) for an async iterable of tasks, in order, computed on the pool."""
+        loop = asyncio.get_running_loop()
+        # Futures of this request in order; bounds how far it runs ahead of its reader
+        futures = asyncio.Queue(self.workers)
+        stats = self.stats
+
+        async def submit():
+            try:
+                async for task in tasks:
+                    stats.queued_blocks += 1
+                    try:
+                        await self._slots.acquire()
+                    finally:
+                        stats.queued_blocks -= 1
+                    stats.running_blocks += 1
+                    future = loop.run_in_executor(self._executor, function, task)
+                    future.add_done_callback(self._release)
+                    await futures.put(future)
+            except Exception as e:
+                await futures.put(e)
+                return
+            await futures.put(None)
+
+        producer = asyncio.create_task(submit())
+        try:
+            while True:
+                item = await futures.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                result = await item
+                stats.blocks += 1
+                yield result
+        finally:
+            producer.cancel()
+
+    def _options(self, query):
+        method = query.get('method', [self.method])[-1]
+        level = query.get('level', [self.level])[-1]
+        if method not in PIPELINES:
+            raise _RequestError(400, f"Unknown method {method!r}; expected one of {sorted(PIPELINES)}.")
+        if level not in LEVELS:
+            raise _RequestError(400, f"Unknown level {level!r}; expected one of {sorted(LEVELS)}.")
+        return method, level
+
+    async def _compress(self, body, response, method, level):
+        async def tasks():
+            while True:
+                block = await body.read_block(self.block_size)
+                if not block:
+                    return
+                yield method, block, level
+
+        await response.write(STREAM_MAGIC + bytes([PIPELINES[method][0], FLAG_BINARY]))
+        async with contextlib.aclosing(self._code_blocks(tasks(), _compress_block)) as results:
+            async for payload, _ in results:
+                frame = bytearray()
+                write_varint(frame, len(payload))
+                frame += payload
+                await response.write(bytes(frame))
+        await response.write(b'\x00')
+
+    async def _decompress(self, body, response):
+        header = await body.read_exactly(len(STREAM_MAGIC) + 2)
+        if not header.startswith(STREAM_MAGIC):
+            raise _RequestError(400, "Not a compressed stream (bad magic number).")
+        method = PIPELINES_BY_ID.get(header[len(STREAM_MAGIC)])
+        if method is None:
+            raise _RequestError(400, f"Unknown stream method {header[len(STREAM_MAGIC)]}.")
+        binary = header[len(STREAM_MAGIC) + 1] & FLAG_BINARY
+
+        async def tasks():
+            while True:
+                length = await body.read_varint()
+                if not length:
+                    return
+                if length > MAX_FRAME_SIZE:
+                    raise _RequestError(400, f"Frame of {length} bytes is larger than {MAX_FRAME_SIZE}.")
+                yield method, await body.read_exactly(length)
+
+        async with contextlib.aclosing(self._code_blocks(tasks(), _decompress_block)) as results:
+            async for data in results:
+                await response.write(data if binary else data.encode('utf-8', 'surrogatepass'))
+        # Bytes after the end marker are ignored, as by Decompressor
+        await body.drain()
+
+    async def _request(self, line, headers, reader, writer):
+        """Serve one request; return whether the connection can take another."""
+        parts = line.split()
+        if len(parts) != 3:
+            writer.write(_head(400, 'text/plain', False, 'Content-Length: 0\r\n'))
+            return False
+        verb, target, version = parts
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        url = urlsplit(target)
+        stats = self.stats
+        body = response = None
+        start = time.perf_counter()
+        try:
+            body = _Body(reader, headers)
+            if url.path == '/stats':
+                if verb != 'GET':
+                    raise _RequestError(405, "Use GET for /stats.")
+                await body.drain()
+                data = json.dumps(stats.to_dict()).encode()
+                writer.write(_head(200, 'application/json', keep_alive, f'Content-Length: {len(data)}\r\n') + data)
+                await writer.drain()
+                return keep_alive
+            if url.path not in ('/compress', '/decompress'):
+                raise _RequestError(404, f"No such endpoint {url.path!r}.")
+            if verb != 'POST':
+                raise _RequestError(405, f"Use POST for {url.path}.")
+            if stats.active_requests >= self.max_requests:
+                stats.rejected += 1
+                raise _RequestError(503, "Too many requests in progress; retry later.")
+            response = _Response(writer, keep_alive)
+            stats.active_requests += 1
+            try:
+                if url.path == '/compress':
+                    await self._compress(body, response, *self._options(parse_qs(url.query)))
+                else:
+                    await self._decompress(body, response)
+                await response.finish()
+            finally:
+                stats.active_requests -= 1
+        except (_RequestError, ValueError) as e:
+            status = e.status if isinstance(e, _RequestError) else 400
+            if status != 503:
+                stats.errors += 1
+            if response is not None and response.started:
+                # Too late for an error status; dropping the connection tells the client
+                return False
+            if body is None or not await body.drain(DISCARD_LIMIT):
+                keep_alive = False
+            message = f'{e}\n'.encode()
+            extra = f'Content-Length: {len(message)}\r\n' + ('Retry-After: 1\r\n' if status == 503 else '')
+            writer.write(_head(status, 'text/plain', keep_alive, extra) + message)
+            await writer.drain()
+            return keep_alive
+        stats.requests += 1
+        stats.bytes_in += body.size
+        stats.bytes_out += response.size
+        stats.latencies.append(time.perf_counter() - start)
+        return keep_alive
+
+    async def _connection(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(_read_head(reader), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except _RequestError as e:
+                    writer.write(_head(e.status, 'text/plain', False, 'Content-Length: 0\r\n'))
+                    break
+                if head is None or not await self._request(*head, reader, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self._connections[writer]
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, **options):
+    """Run a CompressionServer(**options) until interrupted."""
+    asyncio.run(CompressionServer(**options).serve_forever(host, port, path))
+
+
+async def _open(host, port, path):
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+async def load_test(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, clients=32, requests=10, payload=None,
+                    endpoint='/compress?method=lz77'):
+    """Send requests POSTs of payload from each of clients concurrent connections; return a summary dict.
+
+    The default payload is 64 KB of generated log lines. Connections are
+    kept alive between requests and reopened after an error response.
+    """
+    if payload is None:
+        # Imported here: only the load test needs the benchmark corpus
+        from .benchmark import repetitive_logs
+        payload = repetitive_logs(64 * 1024).encode()
+    authority = 'localhost' if path is not None else f'{host}:{port}'
+    request = (f'POST {endpoint} HTTP/1.1\r\nHost: {authority}\r\nContent-Length: {len(payload)}\r\n'
+               f'Content-Type: application/octet-stream\r\n\r\n').encode('latin-1') + payload
+    latencies = []
+    statuses = {}
+    received = 0
+    connection_errors = 0
+
+    async def client():
+        nonlocal received, connection_errors
+        reader = writer = None
+        try:
+            for _ in range(requests):
+                try:
+                    if writer is None:
+                        reader, writer = await _open(host, port, path)
+                    start = time.perf_counter()
+                    writer.write(request)
+                    await writer.drain()
+                    head = await _read_head(reader)
+                    if head is None:
+                        raise ConnectionError("Server closed the connection.")
+                    status = int(head[0].split()[1])
+                    body = _Body(reader, head[1])
+                    while True:
+                        data = await body.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        received += len(data)
+                except (ConnectionError, asyncio.IncompleteReadError, _RequestError):
+                    connection_errors += 1
+                    status = None
+                else:
+                    latencies.append(time.perf_counter() - start)
+                    statuses[status] = statuses.get(status, 0) + 1
+                if status is None or head[1].get('connection', '').lower() == 'close':
+                    if writer is not None:
+                        writer.close()
+                    reader = writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(client() for _ in range(clients)), return_exceptions=True)
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    ok = statuses.get(200, 0)
+    return {
+        'clients': clients,
+        'requests': sum(statuses.values()),
+        'statuses': statuses,
+        'connection_errors': connection_errors,
+        'failed_clients': sum(isinstance(outcome, Exception) for outcome in outcomes),
+        'seconds': seconds,
+        'requests_per_s': ok / seconds,
+        'mb_sent_per_s': ok * len(payload) / seconds / 1e6,
+        'bytes_received': received,
+        'latency_ms': {name: 1000 * _percentile(latencies, fraction)
+                       for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+    }
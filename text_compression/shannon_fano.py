@@ -0,0 +1,69 @@
+"""Shannon-Fano coding."""
+
+from collections import Counter
+
+from .container import (FLAG_BINARY, METHOD_SHANNON_FANO, decode_code_table, decode_prefix_bits,
+                        encode_code_table, pack_codes, read_container, unpack_bits, write_container)
+from . import vectorized
+from .profiling import stage, traced
+from .symbols import byte_view, is_binary, join_symbols
+
+
+# Shannon-Fano Coding
+def build_shannon_fano_codes(freq_map):
+    """Assign Shannon-Fano codes to the symbols of a frequency map."""
+    sorted_chars = sorted(freq_map.keys(), key=lambda x: freq_map[x], reverse=True)
+
+    def split(characters, prefix=""):
+        if len(characters) == 1:
+            # A lone symbol still needs one bit per occurrence
+            return {characters[0]: prefix or "0"}
+        # Split where the two halves' total frequencies are closest to equal
+        total = sum(freq_map[char] for char in characters)
+        running = 0
+        mid = 1
+        best = total
+        for i, char in enumerate(characters[:-1], 1):
+            running += freq_map[char]
+            difference = abs(total - 2 * running)
+            if difference >= best:
+                break
+            mid, best = i, difference
+        left_codes = split(characters[:mid], prefix + "0")
+        right_codes = split(characters[mid:], prefix + "1")
+        return {**left_codes, **right_codes}
+
+    return split(sorted_chars) if sorted_chars else {}
+
+
+@traced('shannon-fano.encode')
+def shannon_fano_encode(s):
+    """Encode the input string (or bytes-like object) using Shannon-Fano coding.
+
+    Returns the packed container bytes, the code map and the frequency map.
+    """
+    flags = FLAG_BINARY if is_binary(s) else 0
+    if flags:
+        s = byte_view(s)
+    # Calculate character frequencies
+    with stage('shannon-fano.count', s) as span:
+        freq_map = vectorized.symbol_counts(s) if vectorized.enabled(len(s)) else Counter(s)
+        span.done(symbols=len(freq_map))
+    with stage('shannon-fano.codes') as span:
+        shannon_fano_codes = build_shannon_fano_codes(freq_map)
+        span.done(symbols=len(shannon_fano_codes))
+    with stage('shannon-fano.pack', s) as span:
+        payload, padding = pack_codes(s, shannon_fano_codes)
+        span.done(payload, len(s))
+    encoded_output = write_container(METHOD_SHANNON_FANO, len(s), encode_code_table(shannon_fano_codes),
+                                     payload, padding, flags)
+    return encoded_output, shannon_fano_codes, freq_map
+
+
+@traced('shannon-fano.decode')
+def shannon_fano_decode(data):
+    """Decode a container produced by shannon_fano_encode back to the original string or bytes."""
+    _, flags, count, table, payload, padding = read_container(data, METHOD_SHANNON_FANO)
+    binary = bool(flags & FLAG_BINARY)
+    decoded = decode_prefix_bits(unpack_bits(payload, padding), decode_code_table(table, binary), count)
+    return join_symbols(decoded, binary)
@@ -0,0 +1,279 @@
+"""Streaming, block-based compression over text or byte chunks and files.
+
+Stream layout:
+    magic (4 bytes) | method (1) | flags (1) | frames... | end marker
+where every frame is a varint payload length followed by one
+independently compressed block, and the end marker is a zero length.
+Flag FLAG_BINARY marks a stream of bytes rather than text.
+"""
+
+import builtins
+import io
+
+from .container import FLAG_BINARY, read_varint, write_varint
+from .pipeline import PIPELINES, PIPELINES_BY_ID, build_pipeline
+from .symbols import is_binary
+
+STREAM_MAGIC = b'TCS1'
+
+# Characters (or bytes) per block; bounds the memory used by each block transform
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+# Characters or bytes read from a source per step when copying streams
+CHUNK_SIZE = 64 * 1024
+
+
+class Compressor:
+    """Incremental compressor: feed() text or bytes, collect the returned bytes, then flush().
+
+    binary=None takes the kind of stream from the first chunk fed.
+    """
+
+    def __init__(self, method='bwt', block_size=DEFAULT_BLOCK_SIZE, level='normal', binary=None):
+        if block_size < 1:
+            raise ValueError("Block size must be positive.")
+        self.method = method
+        self.pipeline = build_pipeline(method, level)
+        self.block_size = block_size
+        self.binary = binary
+        self._chunks = []
+        self._pending = 0
+        self._header_written = False
+        self._finished = False
+
+    def _header(self):
+        if self._header_written:
+            return b''
+        self._header_written = True
+        return STREAM_MAGIC + bytes([PIPELINES[self.method][0], FLAG_BINARY if self.binary else 0])
+
+    def _frame(self, block):
+        payload = self.pipeline.encode(block)
+        out = bytearray()
+        write_varint(out, len(payload))
+        out += payload
+        return out
+
+    def feed(self, text):
+        """Buffer text (or bytes) and return the bytes of every block it completes."""
+        if self._finished:
+            raise ValueError("Compressor has already been flushed.")
+        if self.binary is None:
+            self.binary = is_binary(text)
+        elif self.binary != is_binary(text):
+            kind = 'binary' if self.binary else 'text'
+            raise TypeError(f"Cannot feed {type(text).__name__} to a {kind} stream.")
+        out = bytearray(self._header())
+        self._chunks.append(text)
+        self._pending += len(text)
+        if self._pending >= self.block_size:
+            buffered = self._join(self._chunks)
+            start = 0
+            while len(buffered) - start >= self.block_size:
+                out += self._frame(buffered[start:start + self.block_size])
+                start += self.block_size
+            self._chunks = [buffered[start:]]
+            self._pending = len(buffered) - start
+        return bytes(out)
+
+    def flush(self):
+        """Compress any buffered text and return the final bytes of the stream."""
+        if self._finished:
+            return b''
+        out = bytearray(self._header())
+        remainder = self._join(self._chunks)
+        if remainder:
+            out += self._frame(remainder)
+        out.append(0)
+        self._chunks = []
+        self._pending = 0
+        self._finished = True
+        return bytes(out)
+
+    def _join(self, chunks):
+        return b''.join(chunks) if self.binary else ''.join(chunks)
+
+
+class Decompressor:
+    """Incremental decompressor: feed() compressed bytes, get text (or bytes) back.
+
+    binary is None until the stream header has been read.
+    """
+
+    def __init__(self):
+        self.method = None
+        self.binary = None
+        self.pipeline = None
+        self.eof = False
+        self.unused_data = b''
+        self._buffer = bytearray()
+
+    def _empty(self):
+        return b'' if self.binary else ''
+
+    def feed(self, data):
+        """Buffer data and return the text (or bytes) of every block it completes."""
+        if self.eof:
+            self.unused_data += bytes(data)
+            return self._empty()
+        self._buffer += data
+        buffer = self._buffer
+        pos = 0
+        if self.method is None:
+            if len(buffer) < len(STREAM_MAGIC) + 2:
+                return ''
+            if not buffer.startswith(STREAM_MAGIC):
+                raise ValueError("Not a compressed stream (bad magic number).")
+            method_id = buffer[len(STREAM_MAGIC)]
+            if method_id not in PIPELINES_BY_ID:
+                raise ValueError(f"Unknown stream method {method_id}.")
+            self.method = PIPELINES_BY_ID[method_id]
+            self.binary = bool(buffer[len(STREAM_MAGIC) + 1] & FLAG_BINARY)
+            self.pipeline = build_pipeline(self.method)
+            pos = len(STREAM_MAGIC) + 2
+        decoded = []
+        while True:
+            try:
+                length, start = read_varint(buffer, pos)
+            except ValueError:
+                break
+            if length == 0:
+                self.eof = True
+                self.unused_data = bytes(buffer[start:])
+                pos = len(buffer)
+                break
+            if len(buffer) - start < length:
+                break
+            decoded.append(self.pipeline.decode(bytes(buffer[start:start + length])))
+            pos = start + length
+        del buffer[:pos]
+        return self._empty().join(decoded)
+
+    def flush(self):
+        """Check that the stream ended cleanly."""
+        if not self.eof:
+            raise ValueError("Compressed stream ended before its end marker.")
+        return self._empty()
+
+
+def compress_stream(source, destination, method='bwt', block_size=DEFAULT_BLOCK_SIZE, level='normal'):
+    """Compress a text or binary file object into a binary file object chunk by chunk."""
+    # read(0) returns '' or b'', which tells text and binary sources apart even when empty
+    compressor = Compressor(method, block_size, level, binary=is_binary(source.read(0)))
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        destination.write(compressor.feed(chunk))
+    destination.write(compressor.flush())
+
+
+def decompress_stream(source, destination):
+    """Decompress a binary file object into a text (or binary) file object chunk by chunk."""
+    decompressor = Decompressor()
+    while not decompressor.eof:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        decoded = decompressor.feed(chunk)
+        if decoded:
+            destination.write(decoded)
+    decompressor.flush()
+
+
+class CompressedFile(io.IOBase):
+    """File-like interface over a compressed stream, in the spirit of gzip.open.
+
+    Text modes ('rt', 'wt') read and write str; binary modes ('rb', 'wb')
+    read and write bytes.
+    """
+
+    def __init__(self, file, mode='rt', method='bwt', block_size=DEFAULT_BLOCK_SIZE, level='normal'):
+        if mode not in ('r', 'rt', 'w', 'wt', 'rb', 'wb'):
+            raise ValueError(f"Invalid mode {mode!r}.")
+        self._writing = mode[0] == 'w'
+        self._binary = mode.endswith('b')
+        if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+            self._file = builtins.open(file, mode[0] + 'b')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        if self._writing:
+            self._compressor = Compressor(method, block_size, level, binary=self._binary)
+        else:
+            self._decompressor = Decompressor()
+            self._text = b'' if self._binary else ''
+            self._pos = 0
+
+    def readable(self):
+        return not self._writing
+
+    def writable(self):
+        return self._writing
+
+    def write(self, text):
+        if not self._writing:
+            raise io.UnsupportedOperation("File not open for writing.")
+        self._file.write(self._compressor.feed(text))
+        return len(text)
+
+    def _fill(self):
+        """Decode more text into the read buffer; return False at end of stream."""
+        while not self._decompressor.eof:
+            chunk = self._file.read(CHUNK_SIZE)
+            if not chunk:
+                self._decompressor.flush()
+            text = self._decompressor.feed(chunk)
+            if self._decompressor.binary is not None and self._decompressor.binary != self._binary:
+                kind = 'binary' if self._decompressor.binary else 'text'
+                raise ValueError(f"Compressed stream holds {kind}; open it in {kind} mode.")
+            if text:
+                self._text = self._text[self._pos:] + text
+                self._pos = 0
+                return True
+        return False
+
+    def read(self, size=-1):
+        if self._writing:
+            raise io.UnsupportedOperation("File not open for reading.")
+        if size is None or size < 0:
+            while self._fill():
+                pass
+            size = len(self._text) - self._pos
+        else:
+            while len(self._text) - self._pos < size and self._fill():
+                pass
+        text = self._text[self._pos:self._pos + size]
+        self._pos += len(text)
+        return text
+
+    def readline(self, size=-1):
+        if self._writing:
+            raise io.UnsupportedOperation("File not open for reading.")
+        while True:
+            end = self._text.find(b'\n' if self._binary else '\n', self._pos)
+            if end >= 0 or not self._fill():
+                break
+        end = len(self._text) if end < 0 else end + 1
+        if size is not None and 0 <= size < end - self._pos:
+            end = self._pos + size
+        line = self._text[self._pos:end]
+        self._pos = end
+        return line
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._writing:
+                self._file.write(self._compressor.flush())
+            if self._owns_file:
+                self._file.close()
+        finally:
+            super().close()
+
+
+def open(file, mode='rt', method='bwt', block_size=DEFAULT_BLOCK_SIZE, level='normal'):
+    """Open a compressed file for reading ('rt', 'rb') or writing ('wt', 'wb')."""
+    return CompressedFile(file, mode, method, block_size, level)
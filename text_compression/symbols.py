@@ -0,0 +1,31 @@
+"""Helpers shared by codecs that accept both str and bytes-like input.
+
+Text is coded as a sequence of characters; bytes, bytearray and
+memoryview input is coded as integer symbols 0-255 and decodes back to
+bytes.
+"""
+
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+
+def is_binary(data):
+    """Return True for bytes-like input."""
+    return isinstance(data, BINARY_TYPES)
+
+
+def byte_view(data):
+    """Return a flat unsigned-byte memoryview over bytes-like data without copying."""
+    view = memoryview(data)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
+
+def symbol_value(symbol):
+    """Return the integer value of a character or byte symbol."""
+    return symbol if isinstance(symbol, int) else ord(symbol)
+
+
+def join_symbols(symbols, binary):
+    """Join decoded symbols back into bytes or str."""
+    return bytes(symbols) if binary else ''.join(symbols)
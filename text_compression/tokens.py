@@ -0,0 +1,308 @@
+"""Word and byte-pair tokens as the symbols of the entropy coders.
+
+Coding single characters caps text at its order-0 character entropy,
+around 4.5 bits per character for English. Here the input is first cut
+into tokens: whole words ('word' mode) or subword units learned by
+byte-pair merging ('bpe' mode). Each token in the vocabulary becomes one
+symbol, so the coders see fewer, more predictable symbols. Text outside
+the vocabulary is escaped as its UTF-8 bytes, which have symbols of their
+own, so any input can be coded.
+
+Symbols are ids: 0-255 stand for single bytes and FIRST_TOKEN_ID onwards
+for the vocabulary tokens in sorted order. The coders take them as the
+characters of a str (chr(id)), which they already handle. The input is
+tokenized as bytes; str input is coded as UTF-8 and decodes back to str.
+
+Layout:
+    magic (4 bytes) | flags (1) | coder (1) | token count (varint)
+    | per token, in sorted order: bytes shared with the previous token
+      (varint), remaining length (varint), remaining bytes
+    | the coder's container for the symbols
+    | CRC-32 of everything before it (4, big-endian)
+"""
+
+import heapq
+import re
+import zlib
+from collections import Counter, defaultdict
+
+from .container import FLAG_BINARY, read_varint, write_varint
+from .huffman import huffman_decode, huffman_encode
+from .profiling import stage, traced
+from .range_coder import range_decode, range_encode
+from .shannon_fano import shannon_fano_decode, shannon_fano_encode
+from .symbols import is_binary
+
+TOKEN_MAGIC = b'TCW1'
+
+MODES = ('word', 'bpe')
+
+# Coder id -> (name, encode returning the container bytes, decode)
+CODERS = {
+    1: ('huffman', lambda symbols: huffman_encode(symbols)[0], huffman_decode),
+    2: ('shannon-fano', lambda symbols: shannon_fano_encode(symbols)[0], shannon_fano_decode),
+    3: ('range', range_encode, range_decode),
+}
+CODERS_BY_NAME = {name: coder_id for coder_id, (name, _, _) in CODERS.items()}
+
+FIRST_TOKEN_ID = 256
+
+# Token ids, bytes included, stay below 2**15, so Huffman codes of the token
+# stream fit the default 15-bit limit (huffman.MAX_CODE_LENGTH)
+MAX_VOCABULARY_SIZE = (1 << 15) - FIRST_TOKEN_ID
+DEFAULT_VOCABULARY_SIZE = 4096
+
+# Tokens seen fewer times than this are left to the byte escapes
+MIN_COUNT = 2
+
+# Bytes a stored token costs besides its own, roughly its two varints
+TOKEN_OVERHEAD = 2
+
+# Words (bytes 0x80 and up count as letters, so UTF-8 words stay whole),
+# runs of punctuation, each with at most one leading space, and other whitespace
+WORD_PATTERN = re.compile(rb' ?[\w\x80-\xff]+| ?[^\s\w\x80-\xff]+|\s+')
+
+
+def _as_bytes(data):
+    return bytes(data) if is_binary(data) else data.encode('utf-8', 'surrogatepass')
+
+
+def _word_counts(data):
+    return Counter(WORD_PATTERN.findall(data))
+
+
+def _train_words(counts, size):
+    # Keep the words that cover the most bytes
+    candidates = [word for word, count in counts.items() if count >= MIN_COUNT and len(word) > 1]
+    candidates.sort(key=lambda word: (-counts[word] * (len(word) - 1), word))
+    return candidates[:size]
+
+
+def _train_bpe(counts, size):
+    """Learn up to size byte-pair merges over the words in counts; return the merged tokens."""
+    words = [[bytes([byte]) for byte in word] for word in counts]
+    weights = list(counts.values())
+    pair_counts = Counter()
+    # Pair -> indices of the words that contained it when it was counted
+    where = defaultdict(set)
+    for index, parts in enumerate(words):
+        for pair in zip(parts, parts[1:]):
+            pair_counts[pair] += weights[index]
+            where[pair].add(index)
+    # Max-heap with stale entries, skipped when their count is out of date; ties go by pair
+    heap = [(-count, pair) for pair, count in pair_counts.items()]
+    heapq.heapify(heap)
+    tokens = []
+    while heap and len(tokens) < size:
+        count, pair = heapq.heappop(heap)
+        if -count != pair_counts.get(pair, 0):
+            continue
+        if -count < MIN_COUNT:
+            break
+        merged = pair[0] + pair[1]
+        tokens.append(merged)
+        changed = set()
+        for index in where.pop(pair):
+            parts = words[index]
+            new_parts = []
+            i = 0
+            while i < len(parts):
+                if i + 1 < len(parts) and parts[i] == pair[0] and parts[i + 1] == pair[1]:
+                    new_parts.append(merged)
+                    i += 2
+                else:
+                    new_parts.append(parts[i])
+                    i += 1
+            if len(new_parts) == len(parts):
+                continue
+            weight = weights[index]
+            for old in zip(parts, parts[1:]):
+                pair_counts[old] -= weight
+                changed.add(old)
+            for new in zip(new_parts, new_parts[1:]):
+                pair_counts[new] += weight
+                where[new].add(index)
+                changed.add(new)
+            words[index] = new_parts
+        for changed_pair in changed:
+            count = pair_counts[changed_pair]
+            if count <= 0:
+                del pair_counts[changed_pair]
+            elif changed_pair != pair:
+                heapq.heappush(heap, (-count, changed_pair))
+        pair_counts.pop(pair, None)
+    return tokens
+
+
+def train_vocabulary(data, mode='word', size=DEFAULT_VOCABULARY_SIZE):
+    """Return a sorted vocabulary of at most size multi-byte tokens learned from data.
+
+    'word' keeps the frequent words as they are; 'bpe' merges frequent
+    pairs of bytes and earlier merges, so common word parts become tokens.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown tokenizer mode {mode!r}; expected one of {MODES}.")
+    if not 0 <= size <= MAX_VOCABULARY_SIZE:
+        raise ValueError(f"Vocabulary size must be between 0 and {MAX_VOCABULARY_SIZE}.")
+    counts = _word_counts(_as_bytes(data))
+    tokens = _train_words(counts, size) if mode == 'word' else _train_bpe(counts, size)
+    return sorted(set(tokens))
+
+
+class Tokenizer:
+    """Maps bytes to symbol strings and back for a fixed vocabulary (see the module docstring)."""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = sorted(set(map(bytes, vocabulary)))
+        if len(self.vocabulary) > MAX_VOCABULARY_SIZE:
+            raise ValueError(f"A vocabulary holds at most {MAX_VOCABULARY_SIZE} tokens.")
+        if any(len(token) < 2 for token in self.vocabulary):
+            raise ValueError("Vocabulary tokens must be at least two bytes long; bytes are always coded.")
+        self._ids = {token: FIRST_TOKEN_ID + index for index, token in enumerate(self.vocabulary)}
+        # Only the lengths some token has are tried, longest first, so long tokens cost no more than short ones
+        self._lengths = sorted({len(token) for token in self.vocabulary}, reverse=True)
+        # Word -> its symbols; words repeat, so each is segmented once
+        self._cache = {}
+        self._table = [bytes([byte]) for byte in range(FIRST_TOKEN_ID)] + self.vocabulary
+
+    def _segment(self, word):
+        """Split word greedily into the longest vocabulary tokens, escaping bytes no token covers."""
+        symbol = self._ids.get(word)
+        if symbol is not None:
+            return chr(symbol)
+        symbols = []
+        ids = self._ids
+        i = 0
+        while i < len(word):
+            for length in self._lengths:
+                if length > len(word) - i:
+                    continue
+                symbol = ids.get(word[i:i + length])
+                if symbol is not None:
+                    symbols.append(chr(symbol))
+                    i += length
+                    break
+            else:
+                symbols.append(chr(word[i]))
+                i += 1
+        return ''.join(symbols)
+
+    def tokenize(self, data):
+        """Return the symbol string for bytes-like data."""
+        cache = self._cache
+        pieces = []
+        for word in WORD_PATTERN.findall(bytes(data)):
+            symbols = cache.get(word)
+            if symbols is None:
+                symbols = cache[word] = self._segment(word)
+            pieces.append(symbols)
+        return ''.join(pieces)
+
+    def detokenize(self, symbols):
+        """Invert tokenize: return the bytes a symbol string stands for."""
+        table = self._table
+        try:
+            return b''.join([table[ord(symbol)] for symbol in symbols])
+        except IndexError:
+            raise ValueError("Symbol outside the vocabulary.") from None
+
+    def used_tokens(self, symbols, min_saving=0):
+        """Return the vocabulary tokens in a symbol string that replace more than min_saving bytes.
+
+        A token used n times replaces n * (length - 1) bytes' worth of
+        symbols; min_saving may be a function of the token.
+        """
+        uses = Counter(symbols)
+        used = []
+        for symbol, count in uses.items():
+            value = ord(symbol)
+            if value >= FIRST_TOKEN_ID:
+                token = self._table[value]
+                if count * (len(token) - 1) > (min_saving(token) if callable(min_saving) else min_saving):
+                    used.append(token)
+        return used
+
+
+def _write_vocabulary(out, vocabulary):
+    write_varint(out, len(vocabulary))
+    previous = b''
+    for token in vocabulary:
+        shared = 0
+        limit = min(len(previous), len(token))
+        while shared < limit and previous[shared] == token[shared]:
+            shared += 1
+        write_varint(out, shared)
+        write_varint(out, len(token) - shared)
+        out += token[shared:]
+        previous = token
+
+
+def _read_vocabulary(data, pos):
+    count, pos = read_varint(data, pos)
+    vocabulary = []
+    previous = b''
+    for _ in range(count):
+        shared, pos = read_varint(data, pos)
+        length, pos = read_varint(data, pos)
+        if shared > len(previous) or pos + length > len(data):
+            raise ValueError("Token vocabulary is truncated or corrupted.")
+        token = previous[:shared] + data[pos:pos + length]
+        pos += length
+        vocabulary.append(token)
+        previous = token
+    return vocabulary, pos
+
+
+@traced('tokens.encode')
+def token_encode(s, coder='huffman', mode='word', size=DEFAULT_VOCABULARY_SIZE, vocabulary=None):
+    """Tokenize s (str or bytes-like) and code the tokens with coder; return the bytes.
+
+    The vocabulary is learned from s with train_vocabulary(s, mode, size)
+    unless one is given; only the tokens used are stored.
+    """
+    if coder not in CODERS_BY_NAME:
+        raise ValueError(f"Unknown coder {coder!r}; expected one of {sorted(CODERS_BY_NAME)}.")
+    flags = FLAG_BINARY if is_binary(s) else 0
+    data = _as_bytes(s)
+    with stage('tokens.train', data) as span:
+        if vocabulary is None:
+            vocabulary = train_vocabulary(data, mode, size)
+        span.done(symbols=len(vocabulary))
+    with stage('tokens.tokenize', data) as span:
+        tokenizer = Tokenizer(vocabulary)
+        symbols = tokenizer.tokenize(data)
+        # Drop the tokens that save less than they cost to store, then those the rest leave unused
+        for min_saving in (lambda token: len(token) + TOKEN_OVERHEAD, 0):
+            used = tokenizer.used_tokens(symbols, min_saving)
+            if len(used) < len(tokenizer.vocabulary):
+                tokenizer = Tokenizer(used)
+                symbols = tokenizer.tokenize(data)
+        span.done(symbols, len(set(symbols)))
+    coder_id = CODERS_BY_NAME[coder]
+    out = bytearray(TOKEN_MAGIC)
+    out.append(flags)
+    out.append(coder_id)
+    _write_vocabulary(out, tokenizer.vocabulary)
+    out += CODERS[coder_id][1](symbols)
+    out += zlib.crc32(out).to_bytes(4, 'big')
+    return bytes(out)
+
+
+@traced('tokens.decode')
+def token_decode(data):
+    """Decode the output of token_encode back to the original string or bytes."""
+    data = bytes(data)
+    if len(data) < len(TOKEN_MAGIC) + 7 or not data.startswith(TOKEN_MAGIC):
+        raise ValueError("Not a token-coded stream (bad magic number).")
+    if zlib.crc32(data[:-4]) != int.from_bytes(data[-4:], 'big'):
+        raise ValueError("CRC mismatch: the token-coded stream is corrupted.")
+    pos = len(TOKEN_MAGIC)
+    flags, coder_id = data[pos], data[pos + 1]
+    if coder_id not in CODERS:
+        raise ValueError(f"Unknown coder id {coder_id}.")
+    vocabulary, pos = _read_vocabulary(data, pos + 2)
+    symbols = CODERS[coder_id][2](data[pos:-4])
+    if not isinstance(symbols, str):
+        raise ValueError("Token symbols did not decode to a symbol string.")
+    decoded = Tokenizer(vocabulary).detokenize(symbols)
+    return decoded if flags & FLAG_BINARY else decoded.decode('utf-8', 'surrogatepass')
@@ -0,0 +1,251 @@
+"""Static code tables and LZ77 preset dictionaries trained from sample messages.
+
+Short messages pay for a fresh code table (or an empty LZ77 window) every
+time they are compressed. A table trained once from typical messages is
+shared instead: messages coded against it only carry the table ID.
+Tables always work on bytes; str messages are coded as UTF-8 and decode
+back to str.
+
+Table file layout:
+    magic (4 bytes) | kind (1) | body length (varint) | body
+    | CRC-32 of everything before it (4, big-endian)
+The body is 256 code lengths (one per byte value) for 'huffman' and
+'shannon-fano' tables, or the dictionary bytes for 'lz77' tables. The
+table ID is the CRC-32 of kind and body.
+
+Message layout:
+    table ID (4 bytes, big-endian) | header (varint) | payload
+For code tables the header is the byte count shifted left by one, and the
+payload is the bit-packed codes; for dictionaries the header is 0 and the
+payload is the packed LZ77 tokens. The low header bit marks str input.
+"""
+
+import zlib
+from collections import Counter, OrderedDict
+
+from .container import pack_codes, read_varint, write_varint
+from .huffman import CanonicalDecoder, canonical_codes, huffman_code_lengths
+from .lz77 import lz77_decode, lz77_encode, pack_tokens, unpack_tokens
+from .shannon_fano import build_shannon_fano_codes
+from .symbols import is_binary
+
+TABLE_MAGIC = b'TCT1'
+
+KINDS = {'huffman': 1, 'shannon-fano': 2, 'lz77': 3}
+KINDS_BY_ID = {kind_id: kind for kind, kind_id in KINDS.items()}
+
+# Longest code in a trained code table; the smoothing keeps every byte codable
+MAX_CODE_LENGTH = 15
+
+DEFAULT_DICTIONARY_SIZE = 16 * 1024
+
+# Length of the substrings counted when choosing dictionary content
+DICTIONARY_GRAM = 8
+
+# Tables kept loaded by the default cache
+DEFAULT_CACHE_SIZE = 32
+
+
+def _as_bytes(message):
+    return bytes(message) if is_binary(message) else message.encode('utf-8', 'surrogatepass')
+
+
+class StaticTable:
+    """A trained code table or preset dictionary, identified by table_id."""
+
+    def __init__(self, kind, body):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown table kind {kind!r}; expected one of {sorted(KINDS)}.")
+        body = bytes(body)
+        if kind != 'lz77' and len(body) != 256:
+            raise ValueError("A code table needs exactly 256 code lengths.")
+        self.kind = kind
+        self.body = body
+        self.table_id = zlib.crc32(bytes([KINDS[kind]]) + body)
+        self._codes = None
+        self._decoder = None
+
+    def __repr__(self):
+        return f"StaticTable({self.kind!r}, id={self.table_id:08x}, {len(self.body)} bytes)"
+
+    @property
+    def codes(self):
+        """{byte value: code string}, built on first use."""
+        if self._codes is None:
+            self._codes = canonical_codes(dict(enumerate(self.body)))
+        return self._codes
+
+    @property
+    def decoder(self):
+        """CanonicalDecoder for the table, built on first use."""
+        if self._decoder is None:
+            self._decoder = CanonicalDecoder(dict(enumerate(self.body)))
+        return self._decoder
+
+    def to_bytes(self):
+        out = bytearray(TABLE_MAGIC)
+        out.append(KINDS[self.kind])
+        write_varint(out, len(self.body))
+        out += self.body
+        out += zlib.crc32(out).to_bytes(4, 'big')
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        if len(data) < len(TABLE_MAGIC) + 6 or not data.startswith(TABLE_MAGIC):
+            raise ValueError("Not a trained table (bad magic number).")
+        if zlib.crc32(data[:-4]) != int.from_bytes(data[-4:], 'big'):
+            raise ValueError("CRC mismatch: the table is corrupted.")
+        kind_id = data[len(TABLE_MAGIC)]
+        if kind_id not in KINDS_BY_ID:
+            raise ValueError(f"Unknown table kind {kind_id}.")
+        length, pos = read_varint(data, len(TABLE_MAGIC) + 1)
+        if pos + length != len(data) - 4:
+            raise ValueError("Table body length does not match the file.")
+        return cls(KINDS_BY_ID[kind_id], data[pos:pos + length])
+
+
+# Training
+def _limit_lengths(lengths, freq_map, max_bits):
+    """Cut code lengths to max_bits, then lengthen other codes until the lengths form a prefix code.
+
+    The longest codes below the limit are lengthened first, the rarest
+    symbol first among equal lengths.
+    """
+    lengths = {symbol: min(length, max_bits) for symbol, length in lengths.items()}
+    # Kraft sum over 1, in units of 2 ** -max_bits
+    excess = sum(1 << (max_bits - length) for length in lengths.values()) - (1 << max_bits)
+    while excess > 0:
+        symbol = max((symbol for symbol in lengths if lengths[symbol] < max_bits),
+                     key=lambda symbol: (lengths[symbol], -freq_map[symbol], -symbol))
+        lengths[symbol] += 1
+        excess -= 1 << (max_bits - lengths[symbol])
+    return lengths
+
+
+def train_code_table(samples, kind='huffman'):
+    """Train a 'huffman' or 'shannon-fano' table from the byte frequencies of samples."""
+    counts = Counter()
+    for sample in samples:
+        counts.update(_as_bytes(sample))
+    # Add-one smoothing gives bytes missing from the samples a (long) code too
+    freq_map = {value: counts[value] + 1 for value in range(256)}
+    if kind == 'huffman':
+        lengths = huffman_code_lengths(freq_map, MAX_CODE_LENGTH)
+    elif kind == 'shannon-fano':
+        # Only the lengths are kept; canonical codes of those lengths are as short
+        lengths = {value: len(code) for value, code in build_shannon_fano_codes(freq_map).items()}
+        lengths = _limit_lengths(lengths, freq_map, MAX_CODE_LENGTH)
+    else:
+        raise ValueError(f"Unknown code table kind {kind!r}.")
+    return StaticTable(kind, bytes(lengths[value] for value in range(256)))
+
+
+def train_dictionary(samples, size=DEFAULT_DICTIONARY_SIZE):
+    """Train an LZ77 preset dictionary from the substrings most samples share."""
+    counts = Counter()
+    for sample in samples:
+        sample = _as_bytes(sample)
+        # Count each substring once per sample, favouring content common to many messages
+        counts.update({sample[i:i + DICTIONARY_GRAM] for i in range(len(sample) - DICTIONARY_GRAM + 1)})
+    chosen = []
+    dictionary = b''
+    for piece, count in counts.most_common():
+        if count < 2 or len(dictionary) >= size:
+            break
+        if piece not in dictionary:
+            chosen.append(piece)
+            dictionary = b''.join(reversed(chosen))
+    # The most common content goes last, closest to the message, for the shortest offsets
+    return StaticTable('lz77', dictionary[-size:] if dictionary else b'')
+
+
+def train(samples, kind='huffman', size=DEFAULT_DICTIONARY_SIZE):
+    """Train a table of the given kind ('huffman', 'shannon-fano' or 'lz77') from samples."""
+    samples = list(samples)
+    if kind == 'lz77':
+        return train_dictionary(samples, size)
+    return train_code_table(samples, kind)
+
+
+# Loaded tables
+class TableCache:
+    """Least-recently-used cache of tables keyed by table ID."""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("Cache size must be positive.")
+        self.maxsize = maxsize
+        self._tables = OrderedDict()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __contains__(self, table_id):
+        return table_id in self._tables
+
+    def add(self, table):
+        """Add table, evicting the least recently used one when full; return table."""
+        self._tables[table.table_id] = table
+        self._tables.move_to_end(table.table_id)
+        while len(self._tables) > self.maxsize:
+            self._tables.popitem(last=False)
+        return table
+
+    def get(self, table_id):
+        """Return the table with table_id, or None if it is not loaded."""
+        table = self._tables.get(table_id)
+        if table is not None:
+            self._tables.move_to_end(table_id)
+        return table
+
+
+TABLE_CACHE = TableCache()
+
+
+def save_table(table, path):
+    with open(path, 'wb') as f:
+        f.write(table.to_bytes())
+
+
+def load_table(path, cache=TABLE_CACHE):
+    """Read a table file and add it to cache (unless cache is None)."""
+    with open(path, 'rb') as f:
+        table = StaticTable.from_bytes(f.read())
+    return cache.add(table) if cache is not None else table
+
+
+# Messages
+def encode_message(message, table):
+    """Compress a short str or bytes-like message against a trained table."""
+    text = not is_binary(message)
+    data = _as_bytes(message)
+    out = bytearray(table.table_id.to_bytes(4, 'big'))
+    if table.kind == 'lz77':
+        write_varint(out, int(text))
+        out += pack_tokens(lz77_encode(data, dictionary=table.body), True)
+    else:
+        write_varint(out, len(data) << 1 | text)
+        out += pack_codes(data, table.codes)[0]
+    return bytes(out)
+
+
+def decode_message(data, table=None, cache=TABLE_CACHE):
+    """Decode a message from encode_message; the table is looked up in cache unless given."""
+    data = bytes(data)
+    if len(data) < 5:
+        raise ValueError("Message is too short.")
+    table_id = int.from_bytes(data[:4], 'big')
+    if table is None:
+        table = cache.get(table_id)
+        if table is None:
+            raise ValueError(f"Table {table_id:08x} is not loaded.")
+    elif table.table_id != table_id:
+        raise ValueError(f"Message was coded with table {table_id:08x}, not {table.table_id:08x}.")
+    header, pos = read_varint(data, 4)
+    if table.kind == 'lz77':
+        decoded = lz77_decode(unpack_tokens(data[pos:], True), True, table.body)
+    else:
+        decoded = bytes(table.decoder.decode(data[pos:], header >> 1))
+    return decoded.decode('utf-8', 'surrogatepass') if header & 1 else decoded
@@ -0,0 +1,169 @@
+"""Optional NumPy versions of the per-symbol loops in RLE and the entropy coders.
+
+They are used automatically when NumPy is installed and the input holds
+at least MIN_VECTOR_SIZE symbols, and give exactly the same results as the
+pure-Python loops they replace. Setting the environment variable
+TEXT_COMPRESSION_BACKEND=python turns them off.
+"""
+
+import os
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .symbols import byte_view, is_binary, symbol_value
+
+HAVE_NUMPY = np is not None
+
+# Below this many symbols array setup costs more than the Python loop saves
+MIN_VECTOR_SIZE = 4096
+
+# Symbols packed at a time; bounds the temporary arrays
+CHUNK_SYMBOLS = 1 << 20
+
+# Largest code point looked up through a dense table rather than a search
+DENSE_ALPHABET = 1 << 16
+
+_DISABLED = os.environ.get('TEXT_COMPRESSION_BACKEND') == 'python'
+
+
+def enabled(size):
+    """Return True if the NumPy path should handle an input of size symbols."""
+    return HAVE_NUMPY and not _DISABLED and size >= MIN_VECTOR_SIZE
+
+
+def symbol_array(s):
+    """View bytes-like input as uint8 without copying; convert str to uint32 code points.
+
+    Any other sequence is taken as integer symbols (DEFLATE's length and
+    distance codes, for example) and converted to uint32.
+    """
+    if is_binary(s):
+        return np.frombuffer(byte_view(s), dtype=np.uint8)
+    if isinstance(s, str):
+        return np.frombuffer(s.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    return np.asarray(s, dtype=np.uint32)
+
+
+def _first_occurrence_order(symbols, count):
+    """Return the count distinct values of symbols in order of first appearance."""
+    order = []
+    seen = set()
+    start = 0
+    size = 4096
+    # Nearly always every symbol shows up early, so only a prefix is scanned
+    while len(order) < count:
+        values, first = np.unique(symbols[start:start + size], return_index=True)
+        for value in values[np.argsort(first, kind='stable')].tolist():
+            if value not in seen:
+                seen.add(value)
+                order.append(value)
+        start += size
+        size *= 2
+    return order
+
+
+def symbol_counts(s):
+    """Counter(s) computed with np.bincount, keeping Counter's first-appearance key order."""
+    symbols = symbol_array(s)
+    if symbols.dtype == np.uint8 or int(symbols.max()) < DENSE_ALPHABET:
+        counts = np.bincount(symbols)
+        present = int(np.count_nonzero(counts))
+    else:
+        values, value_counts = np.unique(symbols, return_counts=True)
+        counts = dict(zip(values.tolist(), value_counts.tolist()))
+        present = len(counts)
+    text = isinstance(s, str)
+    return Counter({chr(value) if text else value: int(counts[value])
+                    for value in _first_occurrence_order(symbols, present)})
+
+
+def pack_codes(s, codes):
+    """Pack the prefix codes of every symbol of s into bytes; return (payload, padding).
+
+    Equivalent to pack_bits(''.join(codes[c] for c in s)). Neighbouring
+    codes are merged pairwise while they fit in 64 bits, a cumulative sum
+    of the code lengths gives each merged code its bit offset, and the
+    codes are summed into big-endian 64-bit words (they never overlap, so
+    a sum is an OR). Returns None if a code is empty or too long for
+    uint64, leaving the caller to use the Python path.
+    """
+    lengths_by_value = {symbol_value(symbol): len(code) for symbol, code in codes.items()}
+    if not codes or not 0 < min(lengths_by_value.values()) <= max(lengths_by_value.values()) <= 64:
+        return None
+    keys = sorted(lengths_by_value)
+    values_by_value = {symbol_value(symbol): int(code, 2) for symbol, code in codes.items()}
+    symbols = symbol_array(s)
+    if keys[-1] < DENSE_ALPHABET:
+        # Tables indexed directly by symbol value
+        code_lengths = np.zeros(keys[-1] + 1, dtype=np.uint64)
+        code_values = np.zeros(keys[-1] + 1, dtype=np.uint64)
+        code_lengths[keys] = [lengths_by_value[key] for key in keys]
+        code_values[keys] = [values_by_value[key] for key in keys]
+        keys_array = None
+    else:
+        code_lengths = np.array([lengths_by_value[key] for key in keys], dtype=np.uint64)
+        code_values = np.array([values_by_value[key] for key in keys], dtype=np.uint64)
+        keys_array = np.array(keys, dtype=symbols.dtype)
+    max_length = max(lengths_by_value.values())
+    packed = []
+    # Bits of a partly filled word carried over from the previous chunk
+    carry_word = np.uint64(0)
+    carry_bits = 0
+    total = 0
+    for start in range(0, len(symbols), CHUNK_SYMBOLS):
+        chunk = symbols[start:start + CHUNK_SYMBOLS]
+        if keys_array is not None:
+            chunk = np.searchsorted(keys_array, chunk)
+        lengths = code_lengths[chunk]
+        values = code_values[chunk]
+        width = max_length
+        while 2 * width <= 64 and len(values) > 1:
+            if len(values) % 2:
+                values = np.append(values, np.uint64(0))
+                lengths = np.append(lengths, np.uint64(0))
+            values = (values[0::2] << lengths[1::2]) | values[1::2]
+            lengths = lengths[0::2] + lengths[1::2]
+            width *= 2
+        ends = np.cumsum(lengths) + np.uint64(carry_bits)
+        starts = ends - lengths
+        bits = int(ends[-1])
+        total += bits - carry_bits
+        word = (starts >> np.uint64(6)).astype(np.intp)
+        shift = starts & np.uint64(63)
+        # Left-align every code in 64 bits, then move it to its offset in the word
+        top = (values << (np.uint64(64) - np.maximum(lengths, np.uint64(1)))) >> shift
+        top[lengths == 0] = 0
+        words = np.zeros(bits // 64 + 2, dtype=np.uint64)
+        first = np.flatnonzero(np.diff(word, prepend=-1))
+        words[word[first]] = np.add.reduceat(top, first)
+        # Codes crossing a word boundary put their low bits at the top of the next word
+        spill = np.flatnonzero(shift + lengths > np.uint64(64))
+        words[word[spill] + 1] |= values[spill] << (np.uint64(128) - lengths[spill] - shift[spill])
+        words[0] |= carry_word
+        full = bits // 64
+        packed.append(words[:full].astype('>u8').tobytes())
+        carry_word = words[full]
+        carry_bits = bits % 64
+    if carry_bits:
+        packed.append(np.array([carry_word], dtype='>u8').tobytes()[:(carry_bits + 7) // 8])
+    return b''.join(packed), -total % 8
+
+
+def runs(s, min_length=1):
+    """Return (start, length) lists of the runs of at least min_length equal symbols in s.
+
+    Run boundaries come from np.diff and np.flatnonzero.
+    """
+    symbols = symbol_array(s)
+    if not len(symbols):
+        return [], []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(symbols)) + 1))
+    lengths = np.diff(np.append(starts, len(symbols)))
+    if min_length > 1:
+        keep = lengths >= min_length
+        starts, lengths = starts[keep], lengths[keep]
+    return starts.tolist(), lengths.tolist()